@@ -0,0 +1,602 @@
+"""Time every stage of the prediction path and the endpoints, and compare the results against a baseline.
+
+Usage: PYTHONPATH=src python -m benchmarks --output benchmark.json [--baseline baseline.json ...] [--results benchmark.json ...]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import sklearn
+from fastapi.testclient import TestClient
+
+from main import SalesData, app, pre_check_data_entry
+from model_api.arrow_io import ARROW_STREAM_MEDIA_TYPE, arrow_available
+from model_api.constants import (
+    NUMERICAL_FEATURES,
+    ORDINAL_FEATURES,
+    SALES_DATA_FIELDS,
+    STATE_HOLIDAYS,
+)
+from model_api.model_functions import (
+    classify_match,
+    classify_match_batch,
+    compute_duration,
+    compute_duration_batch,
+    scale_inputs,
+    scale_inputs_batch,
+)
+from model_api.model_pipeline import (
+    model_prediction_batch_pipeline,
+    model_prediction_pipeline,
+    reshape_inputs_batch_pipeline,
+    reshape_inputs_pipeline,
+)
+from model_api.model_utils import MODEL_REGISTRY
+from model_api.store_index import STORE_INDEX
+from model_api.validation import validate_sales_frame
+
+DEFAULT_SIZES = [1, 64, 1024]
+DEFAULT_ROUNDS = 7
+DEFAULT_MIN_TIME = 0.05
+DEFAULT_MAX_REGRESSION = 0.25
+MAX_CALLS_PER_ROUND = 100_000
+
+
+class Benchmark(NamedTuple):
+    """A timed call, setup builds the arguments of one call outside of the timing"""
+
+    name: str
+    size: int
+    setup: Callable[[], tuple]
+    func: Callable
+
+
+class Regression(NamedTuple):
+    """A benchmark slower than its baseline by more than the allowed ratio"""
+
+    name: str
+    baseline: float
+    current: float
+    ratio: float
+    limit: float
+
+
+def sales_entries(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate valid sales data entries of random known stores and dates.
+
+    :param size: number of entries
+    :type size: int
+    :param seed: random seed
+    :type seed: int
+    :return: JSON entries
+    :rtype: List[Dict[str, Any]]
+    """
+    rng = np.random.default_rng(seed)
+    store_arrays = STORE_INDEX.arrays()
+    stores = np.flatnonzero(
+        store_arrays.known & ~np.isnan(store_arrays.competition_distance)
+    )
+    dates = pd.date_range("2013-01-01", "2015-07-31", freq="D")
+
+    entries = []
+    for _ in range(size):
+        date = dates[rng.integers(len(dates))]
+        entries.append(
+            {
+                "Store": int(rng.choice(stores)),
+                "DayOfWeek": int(date.dayofweek + 1),
+                "Date": date.strftime("%Y-%m-%d"),
+                "Customers": int(rng.integers(0, 2000)),
+                "Open": int(rng.integers(0, 2)),
+                "Promo": int(rng.integers(0, 2)),
+                "StateHoliday": str(rng.choice(list(STATE_HOLIDAYS.keys()))),
+                "SchoolHoliday": int(rng.integers(0, 2)),
+            }
+        )
+
+    return entries
+
+
+def entry_series(entry: Dict[str, Any]) -> pd.Series:
+    """Build the model input series of an entry, the way /predict does before reshaping.
+
+    :param entry: JSON entry
+    :type entry: Dict[str, Any]
+    :return: model input series
+    :rtype: pd.Series
+    """
+    feature_names = MODEL_REGISTRY.get("bundle").feature_names
+    df_request = pd.Series(index=feature_names, dtype=float)
+    for field, value in entry.items():
+        if field != "StateHoliday":
+            df_request[field] = value
+
+    return classify_match(STATE_HOLIDAYS, entry["StateHoliday"], df_request)
+
+
+def entry_frame(entries: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build the model input frame of entries, the way /predict/batch does before reshaping.
+
+    :param entries: JSON entries
+    :type entries: List[Dict[str, Any]]
+    :return: model input frame
+    :rtype: pd.DataFrame
+    """
+    df_request = pd.DataFrame(entries, columns=SALES_DATA_FIELDS)
+
+    return classify_match_batch(
+        STATE_HOLIDAYS, df_request.pop("StateHoliday"), df_request
+    )
+
+
+def stage_benchmarks(sizes: Sequence[int]) -> List[Benchmark]:
+    """Benchmarks of the single entry stages and of their batch versions at every size.
+
+    :param sizes: batch sizes
+    :type sizes: Sequence[int]
+    :return: stage benchmarks
+    :rtype: List[Benchmark]
+    """
+    entry = sales_entries(1)[0]
+    series = entry_series(entry)
+    reshaped = reshape_inputs_pipeline(series.copy())
+    promo2_since = STORE_INDEX.lookup(entry["Store"]).promo2_since
+    week_year = reshaped[["Week", "Year"]].to_numpy()
+
+    benchmarks = [
+        Benchmark(
+            "stage.pre_check_data_entry",
+            1,
+            lambda: (SalesData(**entry),),
+            pre_check_data_entry,
+        ),
+        Benchmark(
+            "stage.classify_match",
+            1,
+            lambda: (STATE_HOLIDAYS, entry["StateHoliday"], series.copy()),
+            classify_match,
+        ),
+        Benchmark(
+            "stage.compute_duration",
+            1,
+            lambda: (week_year, promo2_since, "W"),
+            compute_duration,
+        ),
+        Benchmark(
+            "stage.reshape_inputs_pipeline",
+            1,
+            lambda: (series.copy(),),
+            reshape_inputs_pipeline,
+        ),
+        Benchmark(
+            "stage.scale_inputs",
+            1,
+            lambda: (reshaped, ORDINAL_FEATURES, "minmax"),
+            scale_inputs,
+        ),
+        Benchmark(
+            "stage.model_prediction_pipeline",
+            1,
+            lambda: (reshaped,),
+            model_prediction_pipeline,
+        ),
+    ]
+
+    for size in sizes:
+        entries = sales_entries(size, seed=size)
+        df_entries = pd.DataFrame(entries, columns=SALES_DATA_FIELDS)
+        frame = entry_frame(entries)
+        reshaped_frame = reshape_inputs_batch_pipeline(frame.copy())
+        week_year_frame = reshaped_frame[["Week", "Year"]].to_numpy()
+        start_frame = STORE_INDEX.arrays().promo2_since[frame["Store"]]
+        benchmarks += [
+            Benchmark(
+                f"stage.validate_sales_frame[{size}]",
+                size,
+                lambda df=df_entries: (df,),
+                validate_sales_frame,
+            ),
+            Benchmark(
+                f"stage.classify_match_batch[{size}]",
+                size,
+                lambda df=df_entries: (
+                    STATE_HOLIDAYS,
+                    df["StateHoliday"],
+                    df.drop(columns="StateHoliday"),
+                ),
+                classify_match_batch,
+            ),
+            Benchmark(
+                f"stage.compute_duration_batch[{size}]",
+                size,
+                lambda current=week_year_frame, start=start_frame: (
+                    current,
+                    start,
+                    "W",
+                ),
+                compute_duration_batch,
+            ),
+            Benchmark(
+                f"stage.reshape_inputs_batch_pipeline[{size}]",
+                size,
+                lambda df=frame: (df.copy(),),
+                reshape_inputs_batch_pipeline,
+            ),
+            Benchmark(
+                f"stage.scale_inputs_batch[{size}]",
+                size,
+                lambda df=reshaped_frame: (df, NUMERICAL_FEATURES, "standard"),
+                scale_inputs_batch,
+            ),
+            Benchmark(
+                f"stage.model_prediction_batch_pipeline[{size}]",
+                size,
+                lambda df=reshaped_frame: (df,),
+                model_prediction_batch_pipeline,
+            ),
+        ]
+
+    return benchmarks
+
+
+def arrow_stream(entries: List[Dict[str, Any]]) -> bytes:
+    """Encode sales data entries as an Arrow IPC stream of SalesData columns.
+
+    :param entries: sales data entries
+    :type entries: List[Dict[str, Any]]
+    :return: Arrow IPC stream
+    :rtype: bytes
+    """
+    import pyarrow as pa
+
+    table = pa.table(
+        {field: [entry[field] for entry in entries] for field in SALES_DATA_FIELDS}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def endpoint_benchmarks(client: TestClient, sizes: Sequence[int]) -> List[Benchmark]:
+    """Benchmarks of /predict, with and without cache hits, and of /predict/batch and, with pyarrow installed, /predict/arrow at every size.
+
+    :param client: test client of the started app
+    :type client: TestClient
+    :param sizes: batch sizes
+    :type sizes: Sequence[int]
+    :return: endpoint benchmarks
+    :rtype: List[Benchmark]
+    """
+
+    def post(url: str, payload: Any):
+        response = client.post(url, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+
+    def post_arrow(url: str, payload: bytes):
+        response = client.post(
+            url, content=payload, headers={"content-type": ARROW_STREAM_MEDIA_TYPE}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+
+    entry = sales_entries(1)[0]
+    customers = itertools.count()
+
+    benchmarks = [
+        Benchmark(
+            "e2e.predict[1]",
+            1,
+            lambda: ("/predict", {**entry, "Customers": next(customers)}),
+            post,
+        ),
+        Benchmark("e2e.predict_cached[1]", 1, lambda: ("/predict", entry), post),
+    ]
+    for size in sizes:
+        entries = sales_entries(size, seed=size)
+        benchmarks.append(
+            Benchmark(
+                f"e2e.predict_batch[{size}]",
+                size,
+                lambda payload=entries: ("/predict/batch", payload),
+                post,
+            )
+        )
+        if arrow_available():
+            benchmarks.append(
+                Benchmark(
+                    f"e2e.predict_arrow[{size}]",
+                    size,
+                    lambda payload=arrow_stream(entries): ("/predict/arrow", payload),
+                    post_arrow,
+                )
+            )
+
+    return benchmarks
+
+
+def time_round(benchmark: Benchmark, number: int) -> float:
+    """Time number calls of the benchmark, with their arguments built beforehand.
+
+    :param benchmark: benchmark to time
+    :type benchmark: Benchmark
+    :param number: number of calls
+    :type number: int
+    :return: total seconds of the calls
+    :rtype: float
+    """
+    calls = [benchmark.setup() for _ in range(number)]
+    func = benchmark.func
+    start = time.perf_counter()
+    for args in calls:
+        func(*args)
+
+    return time.perf_counter() - start
+
+
+def run_benchmark(
+    benchmark: Benchmark,
+    rounds: int = DEFAULT_ROUNDS,
+    min_time: float = DEFAULT_MIN_TIME,
+) -> Dict[str, float]:
+    """Calibrate the calls per round to last at least min_time and time several rounds.
+
+    :param benchmark: benchmark to time
+    :type benchmark: Benchmark
+    :param rounds: number of timed rounds
+    :type rounds: int
+    :param min_time: shortest duration of a round in seconds
+    :type min_time: float
+    :return: size, rounds, calls per round and min, median, mean and stdev seconds per call
+    :rtype: Dict[str, float]
+    """
+    number = 1
+    while True:
+        elapsed = time_round(benchmark, number)
+        if elapsed >= min_time or number >= MAX_CALLS_PER_ROUND:
+            break
+        number = min(
+            MAX_CALLS_PER_ROUND,
+            max(2 * number, int(number * min_time / max(elapsed, 1e-9))),
+        )
+
+    timings = [time_round(benchmark, number) / number for _ in range(rounds)]
+    median = statistics.median(timings)
+
+    return {
+        "size": benchmark.size,
+        "rounds": rounds,
+        "number": number,
+        "min": min(timings),
+        "median": median,
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if rounds > 1 else 0.0,
+        "median_per_row": median / benchmark.size,
+    }
+
+
+def run_benchmarks(
+    benchmarks: Sequence[Benchmark],
+    rounds: int = DEFAULT_ROUNDS,
+    min_time: float = DEFAULT_MIN_TIME,
+    name_filter: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Time every benchmark whose name contains the filter.
+
+    :param benchmarks: benchmarks to time
+    :type benchmarks: Sequence[Benchmark]
+    :param rounds: number of timed rounds
+    :type rounds: int
+    :param min_time: shortest duration of a round in seconds
+    :type min_time: float
+    :param name_filter: substring of the names to run, None runs all
+    :type name_filter: Optional[str]
+    :return: results by benchmark name
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    return {
+        benchmark.name: run_benchmark(benchmark, rounds, min_time)
+        for benchmark in benchmarks
+        if name_filter is None or name_filter in benchmark.name
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and library versions the benchmarks ran with.
+
+    :return: environment description
+    :rtype: Dict[str, Any]
+    """
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def compare_results(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_regression: float = DEFAULT_MAX_REGRESSION,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> List[Regression]:
+    """Find the benchmarks whose median got slower than the baseline by more than the allowed ratio.
+
+    Benchmarks missing from either side are skipped.
+
+    :param results: results by benchmark name
+    :type results: Dict[str, Dict[str, float]]
+    :param baseline: baseline results by benchmark name
+    :type baseline: Dict[str, Dict[str, float]]
+    :param max_regression: allowed slowdown ratio, 0.25 allows 25% slower medians
+    :type max_regression: float
+    :param thresholds: allowed slowdown ratio of specific benchmarks, overriding max_regression
+    :type thresholds: Optional[Dict[str, float]]
+    :return: regressions
+    :rtype: List[Regression]
+    """
+    thresholds = thresholds or {}
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limit = thresholds.get(name, max_regression)
+        ratio = result["median"] / baseline[name]["median"] - 1
+        if ratio > limit:
+            regressions.append(
+                Regression(
+                    name, baseline[name]["median"], result["median"], ratio, limit
+                )
+            )
+
+    return regressions
+
+
+def best_results(
+    runs: Sequence[Dict[str, Dict[str, float]]]
+) -> Dict[str, Dict[str, float]]:
+    """Merge the results of repeated runs, keeping the run with the lowest median of every benchmark.
+
+    Slowdowns of a shared machine only ever add time, so the best of a few interleaved runs of two versions compares them more reliably than a single run of each.
+
+    :param runs: results by benchmark name of every run
+    :type runs: Sequence[Dict[str, Dict[str, float]]]
+    :return: best result by benchmark name
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    best: Dict[str, Dict[str, float]] = {}
+    for results in runs:
+        for name, result in results.items():
+            if name not in best or result["median"] < best[name]["median"]:
+                best[name] = result
+
+    return best
+
+
+def read_results(paths: Sequence[Path]) -> Dict[str, Dict[str, float]]:
+    """Read saved benchmark outputs and merge them with best_results.
+
+    :param paths: JSON outputs of earlier runs
+    :type paths: Sequence[Path]
+    :return: best result by benchmark name
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    return best_results(
+        [json.loads(Path(path).read_text())["benchmarks"] for path in paths]
+    )
+
+
+def parse_thresholds(values: Sequence[str]) -> Dict[str, float]:
+    """Parse NAME=RATIO command line thresholds.
+
+    :param values: NAME=RATIO strings
+    :type values: Sequence[str]
+    :raises ValueError: value without =
+    :return: allowed slowdown ratio by benchmark name
+    :rtype: Dict[str, float]
+    """
+    thresholds = {}
+    for value in values:
+        name, sep, ratio = value.rpartition("=")
+        if not sep:
+            raise ValueError(f"threshold {value} is not NAME=RATIO")
+        thresholds[name] = float(ratio)
+
+    return thresholds
+
+
+def main(argv=None) -> int:
+    """Parse the command line arguments, run the benchmarks and check them against the baseline.
+
+    :return: exit code, 1 if a benchmark regressed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        nargs="+",
+        help="results of previous runs, the best median of each benchmark is used",
+    )
+    parser.add_argument(
+        "--results",
+        type=Path,
+        nargs="+",
+        help="compare these saved results against the baseline instead of running",
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=DEFAULT_MAX_REGRESSION,
+        help="allowed slowdown of the median, 0.25 allows 25%% slower",
+    )
+    parser.add_argument(
+        "--threshold",
+        action="append",
+        default=[],
+        help="NAME=RATIO allowed slowdown of one benchmark, repeatable",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument("--filter", help="only run benchmarks containing this text")
+    parser.add_argument(
+        "--stages-only", action="store_true", help="skip the endpoint benchmarks"
+    )
+    args = parser.parse_args(argv)
+    if args.results and not args.baseline:
+        parser.error("--results needs a --baseline to compare against")
+
+    if args.results:
+        results = read_results(args.results)
+    else:
+        with TestClient(app) as client:
+            benchmarks = stage_benchmarks(args.sizes)
+            if not args.stages_only:
+                benchmarks += endpoint_benchmarks(client, args.sizes)
+            results = run_benchmarks(
+                benchmarks, args.rounds, args.min_time, args.filter
+            )
+
+        args.output.write_text(
+            json.dumps({"environment": environment(), "benchmarks": results}, indent=2)
+        )
+    for name, result in results.items():
+        print(f"{name:55} {result['median'] * 1e6:12.1f} us")
+
+    if args.baseline is None:
+        return 0
+
+    baseline = read_results(args.baseline)
+    regressions = compare_results(
+        results, baseline, args.max_regression, parse_thresholds(args.threshold)
+    )
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.name}: {regression.baseline * 1e6:.1f} us -> "
+            f"{regression.current * 1e6:.1f} us ({regression.ratio:+.0%}, "
+            f"allowed {regression.limit:+.0%})"
+        )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
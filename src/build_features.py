@@ -0,0 +1,464 @@
+"""Build the processed training data from train.csv as Parquet partitions, rebuilding only the partitions whose inputs changed.
+
+Usage: PYTHONPATH=src python -m build_features [--train data/raw/train.csv] [--output data/features] [--partition-by month|store]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+import numpy as np
+import pandas as pd
+
+from model_api.constants import (
+    FEATURES_DIR,
+    SALES_DATA_FIELDS,
+    STATE_HOLIDAYS,
+    STORE_FILE,
+    TRAIN_FILE,
+)
+from model_api.model_functions import classify_match_batch
+from model_api.model_pipeline import reshape_inputs_batch_pipeline
+from model_api.model_utils import MODEL_REGISTRY
+from model_api.stage_executor import init_worker
+from model_api.validation import validate_sales_frame
+
+logger = logging.getLogger("build_features")
+
+FEATURES_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+PARTITION_BY = ("month", "store")
+DEFAULT_STORES_PER_PARTITION = 100
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class PartitionInputs:
+    """Row count, order independent hash of the train rows and the stores of one partition, accumulated chunk by chunk"""
+
+    def __init__(self):
+        """Initialize the inputs of an empty partition"""
+        self.rows = 0
+        self.row_hash = 0
+        self.stores: Set[int] = set()
+
+    def update(self, row_hashes: np.ndarray, stores: np.ndarray):
+        """Add the rows of a chunk to the partition inputs.
+
+        :param row_hashes: hash of every train row
+        :type row_hashes: np.ndarray
+        :param stores: store of every train row
+        :type stores: np.ndarray
+        """
+        self.rows += len(row_hashes)
+        self.row_hash = (self.row_hash + int(row_hashes.sum(dtype=np.uint64))) % 2**64
+        self.stores.update(np.unique(stores).tolist())
+
+    def fingerprint(
+        self, store_hashes: Dict[int, int], feature_names: Sequence[str]
+    ) -> str:
+        """Fingerprint the train rows, the store.csv rows of their stores and the feature layout of the partition.
+
+        :param store_hashes: hash of every store.csv row, by store
+        :type store_hashes: Dict[int, int]
+        :param feature_names: model features written to the partition
+        :type feature_names: Sequence[str]
+        :return: hex digest that changes whenever one of the inputs of the partition changes
+        :rtype: str
+        """
+        inputs = [
+            FEATURES_FORMAT_VERSION,
+            list(feature_names),
+            self.rows,
+            self.row_hash,
+            [store_hashes.get(store) for store in sorted(self.stores)],
+        ]
+        return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()[:16]
+
+
+class BuildSummary(NamedTuple):
+    """Partitions written, kept and removed by a build, the rows written and the rows of the train file dropped as invalid"""
+
+    built: List[str]
+    unchanged: List[str]
+    removed: List[str]
+    rows: int
+    dropped: int
+
+
+def partition_rows(
+    df_chunk: pd.DataFrame, partition_by: str, stores_per_partition: int
+) -> Dict[str, np.ndarray]:
+    """Group the rows of a chunk by partition, a range of stores or a month of dates.
+
+    Only the distinct dates or stores of the chunk are named, the rows are grouped by their integer codes.
+
+    :param df_chunk: train.csv rows
+    :type df_chunk: pd.DataFrame
+    :param partition_by: partitioning, month or store
+    :type partition_by: str
+    :param stores_per_partition: number of consecutive store ids per store partition
+    :type stores_per_partition: int
+    :return: positions of the rows of every partition, by partition name, e.g. month=2015-07 or store=0001-0100
+    :rtype: Dict[str, np.ndarray]
+    """
+    if partition_by == "month":
+        codes, dates = pd.factorize(df_chunk["Date"].astype(str))
+        keys = [f"month={date[:7]}" for date in dates]
+    else:
+        stores = pd.to_numeric(df_chunk["Store"], errors="coerce").fillna(1)
+        first = (
+            np.maximum(stores.to_numpy(dtype=np.int64), 1) - 1
+        ) // stores_per_partition
+        codes, starts = pd.factorize(first * stores_per_partition + 1)
+        keys = [
+            f"store={start:04d}-{start + stores_per_partition - 1:04d}"
+            for start in starts.tolist()
+        ]
+
+    names = list(dict.fromkeys(keys))
+    name_codes = np.array([names.index(key) for key in keys], dtype=np.int64)[codes]
+    order = np.argsort(name_codes, kind="stable")
+    bounds = np.cumsum(np.bincount(name_codes, minlength=len(names)))[:-1]
+
+    return dict(zip(names, np.split(order, bounds)))
+
+
+def valid_rows(df_train: pd.DataFrame) -> np.ndarray:
+    """Flag the train rows passing the /predict/batch validation.
+
+    :param df_train: train.csv rows
+    :type df_train: pd.DataFrame
+    :return: whether each row is valid
+    :rtype: np.ndarray
+    """
+    df_request = df_train[SALES_DATA_FIELDS].reset_index(drop=True)
+    df_request["StateHoliday"] = df_request["StateHoliday"].astype(str)
+
+    return validate_sales_frame(df_request).valid
+
+
+def engineer_features(
+    df_train: pd.DataFrame, feature_names: Sequence[str]
+) -> pd.DataFrame:
+    """Derive the model features of train rows with the same pipeline as /predict/batch.
+
+    Rows failing the /predict/batch validation are dropped. The features are int32 columns like the processed data of the feature engineering notebook.
+
+    :param df_train: train.csv rows with Sales
+    :type df_train: pd.DataFrame
+    :param feature_names: model features, in output order
+    :type feature_names: Sequence[str]
+    :return: Id, the model features and Sales of the valid rows
+    :rtype: pd.DataFrame
+    """
+    valid = valid_rows(df_train)
+    df_request = df_train.loc[valid, SALES_DATA_FIELDS].reset_index(drop=True)
+    df_request["StateHoliday"] = df_request["StateHoliday"].astype(str)
+
+    ids = "(" + df_request["Store"].astype(str) + ", '" + df_request["Date"] + "')"
+    df_request = classify_match_batch(
+        STATE_HOLIDAYS, df_request.pop("StateHoliday"), df_request
+    )
+    reshaped_inputs = reshape_inputs_batch_pipeline(df_request)
+
+    df_features = reshaped_inputs[list(feature_names)].astype(np.int32)
+    df_features.insert(0, "Id", ids)
+    df_features["Sales"] = df_train["Sales"].to_numpy()[valid].astype(np.int32)
+
+    return df_features
+
+
+def build_partition(
+    name: str, df_train: pd.DataFrame, feature_names: Sequence[str], output_dir: Path
+) -> int:
+    """Engineer the features of one partition and atomically replace its Parquet file.
+
+    :param name: partition name
+    :type name: str
+    :param df_train: train.csv rows of the partition
+    :type df_train: pd.DataFrame
+    :param feature_names: model features, in output order
+    :type feature_names: Sequence[str]
+    :param output_dir: directory of the partition files
+    :type output_dir: Path
+    :return: number of rows written
+    :rtype: int
+    """
+    df_features = engineer_features(df_train, feature_names)
+    tmp_file = output_dir / f"{name}.parquet.tmp"
+    df_features.to_parquet(tmp_file, index=False)
+    os.replace(tmp_file, output_dir / f"{name}.parquet")
+
+    return len(df_features)
+
+
+def read_manifest(manifest_file: Path) -> Dict:
+    """Read the partitions recorded by a previous build.
+
+    :param manifest_file: filepath of the manifest
+    :type manifest_file: Path
+    :return: manifest contents, without partitions if there is none
+    :rtype: Dict
+    """
+    if not manifest_file.exists():
+        return {"partitions": {}}
+
+    return json.loads(manifest_file.read_text())
+
+
+def write_manifest(manifest_file: Path, manifest: Dict):
+    """Atomically replace the manifest with the current partitions.
+
+    :param manifest_file: filepath of the manifest
+    :type manifest_file: Path
+    :param manifest: partitions to record
+    :type manifest: Dict
+    """
+    tmp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    tmp_file.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_file, manifest_file)
+
+
+def read_train_chunks(train_file: Path, chunksize: int):
+    """Stream train.csv in chunks, StateHoliday read as strings.
+
+    :param train_file: train.csv-format file with Sales
+    :type train_file: Path
+    :param chunksize: number of rows per chunk
+    :type chunksize: int
+    :return: chunks of train rows
+    :rtype: Iterator[pd.DataFrame]
+    """
+    return pd.read_csv(train_file, chunksize=chunksize, dtype={"StateHoliday": str})
+
+
+def read_valid_chunks(
+    train_file: Path, chunksize: int
+) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """Stream the valid rows of train.csv in chunks, so that rows failing the /predict/batch validation never reach a partition.
+
+    :param train_file: train.csv-format file with Sales
+    :type train_file: Path
+    :param chunksize: number of rows read at once
+    :type chunksize: int
+    :return: valid rows of every chunk and the number of invalid rows left out
+    :rtype: Iterator[Tuple[pd.DataFrame, int]]
+    """
+    for df_chunk in read_train_chunks(train_file, chunksize):
+        valid = valid_rows(df_chunk)
+        yield df_chunk[valid].reset_index(drop=True), int((~valid).sum())
+
+
+def build_features(
+    train_file: Path = TRAIN_FILE,
+    output_dir: Path = FEATURES_DIR,
+    partition_by: str = "month",
+    stores_per_partition: int = DEFAULT_STORES_PER_PARTITION,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    workers: Optional[int] = None,
+) -> BuildSummary:
+    """Build the processed training data as one Parquet file per partition, on a process pool.
+
+    Rows failing the /predict/batch validation, e.g. with a blank Date, are dropped before partitioning. A first pass over train.csv fingerprints every partition from its rows, the store.csv rows of its stores and the feature layout of the model bundle. Partitions whose fingerprint matches the manifest of the previous build are kept. A second pass collects the rows of the changed partitions, each partition is submitted to the pool as soon as all its rows are read and written by the worker. Partitions without rows any more are removed.
+
+    :param train_file: train.csv-format file with Sales
+    :type train_file: Path
+    :param output_dir: directory of the partition files and the manifest
+    :type output_dir: Path
+    :param partition_by: partitioning, store or month
+    :type partition_by: str
+    :param stores_per_partition: number of consecutive store ids per store partition
+    :type stores_per_partition: int
+    :param chunksize: number of train rows read at once
+    :type chunksize: int
+    :param workers: number of worker processes, 1 builds in the current process. Defaults to the CPU count
+    :type workers: Optional[int]
+    :raises ValueError: unknown partitioning
+    :return: partitions built, kept and removed, the rows written and the rows dropped as invalid
+    :rtype: BuildSummary
+    """
+    if partition_by not in PARTITION_BY:
+        raise ValueError(f"partition_by must be one of {', '.join(PARTITION_BY)}")
+    train_file, output_dir = Path(train_file), Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = output_dir / MANIFEST_FILE
+    workers = workers or os.cpu_count() or 1
+    feature_names = list(MODEL_REGISTRY.get("bundle").feature_names)
+
+    df_store = pd.read_csv(STORE_FILE)
+    store_hashes = dict(
+        zip(
+            df_store["Store"].tolist(),
+            pd.util.hash_pandas_object(df_store, index=False).tolist(),
+        )
+    )
+
+    inputs: Dict[str, PartitionInputs] = {}
+    rows_dropped = 0
+    for df_chunk, invalid in read_valid_chunks(train_file, chunksize):
+        rows_dropped += invalid
+        partitions = partition_rows(df_chunk, partition_by, stores_per_partition)
+        row_hashes = pd.util.hash_pandas_object(
+            df_chunk[SALES_DATA_FIELDS + ["Sales"]], index=False
+        ).to_numpy()
+        stores = pd.to_numeric(df_chunk["Store"], errors="coerce").fillna(-1)
+        stores = stores.to_numpy(dtype=np.int64)
+        for name, rows in partitions.items():
+            inputs.setdefault(name, PartitionInputs()).update(
+                row_hashes[rows], stores[rows]
+            )
+
+    manifest = read_manifest(manifest_file)
+    recorded = manifest["partitions"]
+    fingerprints = {
+        name: partition.fingerprint(store_hashes, feature_names)
+        for name, partition in inputs.items()
+    }
+    changed = {
+        name
+        for name, fingerprint in fingerprints.items()
+        if recorded.get(name, {}).get("fingerprint") != fingerprint
+        or not (output_dir / f"{name}.parquet").exists()
+    }
+    removed = sorted(set(recorded) - set(inputs))
+    for name in removed:
+        (output_dir / f"{name}.parquet").unlink(missing_ok=True)
+        del recorded[name]
+    manifest["format_version"] = FEATURES_FORMAT_VERSION
+    write_manifest(manifest_file, manifest)
+
+    executor: Optional[Executor] = None
+    if workers > 1 and changed:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+    collected: Dict[str, List[pd.DataFrame]] = {name: [] for name in changed}
+    remaining = {name: inputs[name].rows for name in changed}
+    pending: Deque = deque()
+    rows_written = 0
+    start = time.perf_counter()
+
+    def record_partition(name: str, rows: int):
+        nonlocal rows_written, rows_dropped
+        rows_written += rows
+        rows_dropped += inputs[name].rows - rows
+        recorded[name] = {
+            "fingerprint": fingerprints[name],
+            "rows": rows,
+            "dropped": inputs[name].rows - rows,
+        }
+        write_manifest(manifest_file, manifest)
+        logger.info(
+            "partition %s built, %d rows, %d dropped, %.1fs",
+            name,
+            rows,
+            inputs[name].rows - rows,
+            time.perf_counter() - start,
+        )
+
+    def submit_partition(name: str):
+        df_train = pd.concat(collected.pop(name), ignore_index=True)
+        if executor is None:
+            record_partition(
+                name, build_partition(name, df_train, feature_names, output_dir)
+            )
+            return
+
+        pending.append(
+            (
+                name,
+                executor.submit(
+                    build_partition, name, df_train, feature_names, output_dir
+                ),
+            )
+        )
+        while len(pending) >= 2 * workers:
+            done_name, future = pending.popleft()
+            record_partition(done_name, future.result())
+
+    try:
+        if changed:
+            for df_chunk, _ in read_valid_chunks(train_file, chunksize):
+                partitions = partition_rows(
+                    df_chunk, partition_by, stores_per_partition
+                )
+                for name, rows in partitions.items():
+                    if name not in collected:
+                        continue
+                    collected[name].append(df_chunk.iloc[rows])
+                    remaining[name] -= len(rows)
+                    if remaining[name] == 0:
+                        submit_partition(name)
+
+        while pending:
+            done_name, future = pending.popleft()
+            record_partition(done_name, future.result())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown()
+
+    return BuildSummary(
+        built=sorted(changed),
+        unchanged=sorted(set(inputs) - changed),
+        removed=removed,
+        rows=rows_written,
+        dropped=rows_dropped,
+    )
+
+
+def main(argv=None):
+    """Parse the command line arguments and build the feature partitions"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--train", type=Path, default=TRAIN_FILE)
+    parser.add_argument("--output", type=Path, default=FEATURES_DIR)
+    parser.add_argument("--partition-by", choices=PARTITION_BY, default="month")
+    parser.add_argument(
+        "--stores-per-partition", type=int, default=DEFAULT_STORES_PER_PARTITION
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes, default CPU count"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    start = time.perf_counter()
+    summary = build_features(
+        args.train,
+        args.output,
+        args.partition_by,
+        args.stores_per_partition,
+        args.chunksize,
+        args.workers,
+    )
+    logger.info(
+        "%d partitions built, %d unchanged, %d removed: %d rows written, %d dropped in %.1fs",
+        len(summary.built),
+        len(summary.unchanged),
+        len(summary.removed),
+        summary.rows,
+        summary.dropped,
+        time.perf_counter() - start,
+    )
+
+
+if __name__ == "__main__":
+    main()
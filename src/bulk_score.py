@@ -0,0 +1,226 @@
+"""Score train.csv-format files in chunks on a process pool, writing predictions in input order.
+
+Usage: PYTHONPATH=src python -m bulk_score data/raw/train.csv predictions.csv [--resume]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from model_api.constants import SALES_DATA_FIELDS, STATE_HOLIDAYS
+from model_api.model_functions import classify_match_batch
+from model_api.model_pipeline import (
+    model_prediction_batch_pipeline,
+    reshape_inputs_batch_pipeline,
+)
+from model_api.stage_executor import init_worker
+from model_api.validation import validate_sales_frame
+
+logger = logging.getLogger("bulk_score")
+
+PREDICTION_COLUMN = "PredictedSales"
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def score_chunk(df_chunk: pd.DataFrame) -> np.ndarray:
+    """Predict the sales of a chunk of train.csv rows.
+
+    Rows failing validation get NaN instead of failing the chunk.
+
+    :param df_chunk: train.csv rows
+    :type df_chunk: pd.DataFrame
+    :return: predicted sales, one per row
+    :rtype: np.ndarray
+    """
+    df_request = df_chunk[SALES_DATA_FIELDS].reset_index(drop=True)
+    df_request["StateHoliday"] = df_request["StateHoliday"].astype(str)
+    valid = validate_sales_frame(df_request).valid
+
+    sales = np.full(len(df_request), np.nan)
+    if valid.any():
+        df_request = df_request[valid].reset_index(drop=True)
+        df_request = classify_match_batch(
+            STATE_HOLIDAYS, df_request.pop("StateHoliday"), df_request
+        )
+        reshaped_inputs = reshape_inputs_batch_pipeline(df_request)
+        sales[valid] = model_prediction_batch_pipeline(reshaped_inputs)
+
+    return sales
+
+
+def read_checkpoint(checkpoint_file: Path) -> Dict:
+    """Read the progress of a previous run.
+
+    :param checkpoint_file: filepath of the checkpoint
+    :type checkpoint_file: Path
+    :return: checkpoint contents, empty if there is none
+    :rtype: Dict
+    """
+    if not checkpoint_file.exists():
+        return {}
+
+    return json.loads(checkpoint_file.read_text())
+
+
+def write_checkpoint(checkpoint_file: Path, checkpoint: Dict):
+    """Atomically replace the checkpoint with the current progress.
+
+    :param checkpoint_file: filepath of the checkpoint
+    :type checkpoint_file: Path
+    :param checkpoint: progress to record
+    :type checkpoint: Dict
+    """
+    tmp_file = checkpoint_file.with_name(checkpoint_file.name + ".tmp")
+    tmp_file.write_text(json.dumps(checkpoint))
+    os.replace(tmp_file, checkpoint_file)
+
+
+def bulk_score(
+    input_file: Path,
+    output_file: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    workers: Optional[int] = None,
+    resume: bool = False,
+) -> int:
+    """Stream the input file in chunks, score them on a process pool and append the predictions in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded regardless of the file size. After every written chunk the output size and row count are recorded in <output_file>.checkpoint, a resumed run truncates the output to the last recorded chunk and skips the rows already scored.
+
+    :param input_file: train.csv-format file to score
+    :type input_file: Path
+    :param output_file: csv file receiving the input rows and the PredictedSales column
+    :type output_file: Path
+    :param chunksize: number of rows per chunk
+    :type chunksize: int
+    :param workers: number of worker processes, 1 scores in the current process. Defaults to the CPU count
+    :type workers: Optional[int]
+    :param resume: continue from the last finished chunk of a previous run
+    :type resume: bool
+    :raises ValueError: checkpoint from a run with different input or chunksize
+    :return: number of rows scored by this run
+    :rtype: int
+    """
+    input_file, output_file = Path(input_file), Path(output_file)
+    checkpoint_file = output_file.with_name(output_file.name + ".checkpoint")
+    workers = workers or os.cpu_count() or 1
+
+    checkpoint = read_checkpoint(checkpoint_file) if resume else {}
+    if checkpoint and (
+        checkpoint["input"] != str(input_file) or checkpoint["chunksize"] != chunksize
+    ):
+        raise ValueError("checkpoint was written for a different input or chunksize")
+    checkpoint = checkpoint or {
+        "input": str(input_file),
+        "chunksize": chunksize,
+        "chunks_done": 0,
+        "rows_done": 0,
+        "output_bytes": 0,
+    }
+
+    output = open(output_file, "r+b" if checkpoint["chunks_done"] else "wb")
+    output.truncate(checkpoint["output_bytes"])
+    output.seek(checkpoint["output_bytes"])
+
+    chunks = pd.read_csv(
+        input_file,
+        chunksize=chunksize,
+        dtype={"StateHoliday": str},
+        skiprows=(
+            range(1, checkpoint["rows_done"] + 1) if checkpoint["chunks_done"] else None
+        ),
+    )
+
+    executor: Optional[Executor] = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+
+    pending: Deque = deque()
+    rows_scored = rows_invalid = 0
+    start = time.perf_counter()
+
+    def write_result(df_chunk: pd.DataFrame, sales: np.ndarray):
+        nonlocal rows_scored, rows_invalid
+        df_chunk[PREDICTION_COLUMN] = sales
+        header = checkpoint["chunks_done"] == 0
+        output.write(df_chunk.to_csv(index=False, header=header).encode())
+        output.flush()
+
+        rows_scored += len(df_chunk)
+        rows_invalid += int(np.isnan(sales).sum())
+        checkpoint["chunks_done"] += 1
+        checkpoint["rows_done"] += len(df_chunk)
+        checkpoint["output_bytes"] = output.tell()
+        write_checkpoint(checkpoint_file, checkpoint)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "chunk %d done, %d rows total, %d invalid rows left unscored, %.0f rows/s",
+            checkpoint["chunks_done"],
+            checkpoint["rows_done"],
+            rows_invalid,
+            rows_scored / elapsed if elapsed else 0.0,
+        )
+
+    try:
+        for df_chunk in chunks:
+            if executor is None:
+                write_result(df_chunk, score_chunk(df_chunk))
+                continue
+
+            pending.append((df_chunk, executor.submit(score_chunk, df_chunk)))
+            while len(pending) >= 2 * workers:
+                done_chunk, future = pending.popleft()
+                write_result(done_chunk, future.result())
+
+        while pending:
+            done_chunk, future = pending.popleft()
+            write_result(done_chunk, future.result())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown()
+        output.close()
+
+    return rows_scored
+
+
+def main(argv=None):
+    """Parse the command line arguments and run the bulk scoring"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input_file", type=Path, help="train.csv-format file to score")
+    parser.add_argument("output_file", type=Path, help="csv file for the predictions")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes, default CPU count"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="continue from the last finished chunk"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    start = time.perf_counter()
+    rows = bulk_score(
+        args.input_file, args.output_file, args.chunksize, args.workers, args.resume
+    )
+    elapsed = time.perf_counter() - start
+    logger.info(
+        "scored %d rows in %.1fs, %.0f rows/s",
+        rows,
+        elapsed,
+        rows / elapsed if elapsed else 0.0,
+    )
+
+
+if __name__ == "__main__":
+    main()
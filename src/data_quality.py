@@ -0,0 +1,356 @@
+"""Check a raw train.csv-format file against the data-quality rules in one streaming pass on a process pool.
+
+Usage: PYTHONPATH=src python -m data_quality [data/raw/train.csv] [--report report.json] [--workers 4]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_api.calendar_table import CALENDAR
+from model_api.constants import (
+    BINARY_FIELDS,
+    SALES_DATA_FIELDS,
+    STATE_HOLIDAYS,
+    TRAIN_FILE,
+)
+from model_api.store_index import STORE_INDEX
+
+logger = logging.getLogger("data_quality")
+
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_SAMPLES = 5
+
+
+class QualityRule(NamedTuple):
+    """Data-quality rule checked on one column of the raw training data"""
+
+    field: str
+    description: str
+
+
+QUALITY_RULES = {
+    "store_range": QualityRule("Store", "Store must be a store of store.csv"),
+    "state_holiday_vocabulary": QualityRule(
+        "StateHoliday", f"StateHoliday must be one of {', '.join(STATE_HOLIDAYS)}"
+    ),
+    "date_parseable": QualityRule("Date", "Date must be a parseable date"),
+    **{
+        f"{field}_binary": QualityRule(field, f"{field} entry must be binary")
+        for field in BINARY_FIELDS
+    },
+    "customers_non_negative": QualityRule(
+        "Customers", "Number of customers must be greater than or equal to 0"
+    ),
+    "day_of_week_range": QualityRule(
+        "DayOfWeek", "Number of days in a week should be between 1 to 7"
+    ),
+}
+
+
+class BlockResult(NamedTuple):
+    """Row count, violation counts and first offending rows of one block of the file, rows numbered within the block"""
+
+    rows: int
+    violations: Dict[str, int]
+    samples: Dict[str, List[Dict]]
+
+
+def rule_violations(
+    df_block: pd.DataFrame, known_stores: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """Evaluate every data-quality rule on whole columns of raw rows.
+
+    Values that are not numbers fail the numeric rules instead of failing the check, blank, "NaT" and other unparseable dates fail date_parseable.
+
+    :param df_block: raw train.csv rows
+    :type df_block: pd.DataFrame
+    :param known_stores: whether each store id is in store.csv, indexed by store id
+    :type known_stores: np.ndarray
+    :return: mask of the offending rows, by rule name
+    :rtype: Dict[str, np.ndarray]
+    """
+    numbers = {
+        field: pd.to_numeric(df_block[field], errors="coerce").to_numpy(
+            dtype=np.float64
+        )
+        for field in ["Store", "DayOfWeek", "Customers"] + BINARY_FIELDS
+    }
+    stores = numbers["Store"]
+    in_range = (stores >= 0) & (stores < len(known_stores)) & (stores % 1 == 0)
+    known = in_range.copy()
+    known[in_range] = known_stores[stores[in_range].astype(np.int64)]
+
+    violations = {
+        "store_range": ~known,
+        "state_holiday_vocabulary": ~df_block["StateHoliday"]
+        .astype(str)
+        .isin(list(STATE_HOLIDAYS))
+        .to_numpy(),
+        "date_parseable": df_block["Date"].isna().to_numpy()
+        | ~CALENDAR.features(df_block["Date"].astype(str)).parsed,
+        "customers_non_negative": ~(numbers["Customers"] >= 0),
+        "day_of_week_range": ~np.isin(numbers["DayOfWeek"], np.arange(1, 8)),
+    }
+    for field in BINARY_FIELDS:
+        violations[f"{field}_binary"] = ~np.isin(numbers[field], [0, 1])
+
+    return violations
+
+
+def check_block(
+    data_file: Path,
+    start: int,
+    end: int,
+    columns: List[str],
+    known_stores: np.ndarray,
+    max_samples: int,
+) -> BlockResult:
+    """Read one block of whole lines of the file and check its rows against every rule.
+
+    :param data_file: train.csv-format file
+    :type data_file: Path
+    :param start: byte offset of the first line of the block
+    :type start: int
+    :param end: byte offset after the last line of the block
+    :type end: int
+    :param columns: column names of the file header
+    :type columns: List[str]
+    :param known_stores: whether each store id is in store.csv, indexed by store id
+    :type known_stores: np.ndarray
+    :param max_samples: number of offending rows kept per rule
+    :type max_samples: int
+    :return: rows, violations and samples of the block
+    :rtype: BlockResult
+    """
+    with open(data_file, "rb") as data:
+        data.seek(start)
+        block = data.read(end - start)
+    try:
+        df_block = pd.read_csv(
+            io.BytesIO(block),
+            header=None,
+            names=columns,
+            dtype={"StateHoliday": str, "Date": str},
+        )
+    except pd.errors.EmptyDataError:
+        df_block = pd.DataFrame(columns=columns)
+
+    violations = rule_violations(df_block, known_stores)
+    counts = {rule: int(invalid.sum()) for rule, invalid in violations.items()}
+    samples: Dict[str, List[Dict]] = {rule: [] for rule in violations}
+    if any(counts.values()):
+        lines = block.split(b"\n")
+        if b"" in lines[:-1] or b"\r" in lines:
+            lines = [line for line in lines if line.strip(b"\r")]
+        for rule, invalid in violations.items():
+            rows = np.flatnonzero(invalid)[:max_samples].tolist()
+            samples[rule] = [
+                {"row": row, **raw_record(lines[row], columns)} for row in rows
+            ]
+
+    return BlockResult(len(df_block), counts, samples)
+
+
+def raw_record(line: bytes, columns: List[str]) -> Dict[str, str]:
+    """Split one csv line into its raw field texts, so that samples show values as they are written in the file.
+
+    :param line: csv line without the newline
+    :type line: bytes
+    :param columns: column names of the file header
+    :type columns: List[str]
+    :return: field text by column
+    :rtype: Dict[str, str]
+    """
+    df_line = pd.read_csv(
+        io.BytesIO(line), header=None, names=columns, dtype=str, keep_default_na=False
+    )
+    return df_line.iloc[0].to_dict()
+
+
+def line_blocks(
+    data_file: Path, block_size: int
+) -> Tuple[List[str], Iterator[Tuple[int, int]]]:
+    """Split the file after its header into byte ranges of about block_size that end at line boundaries.
+
+    Quoted fields spanning several lines are not supported, train.csv has none.
+
+    :param data_file: csv file with a header line
+    :type data_file: Path
+    :param block_size: approximate number of bytes per block
+    :type block_size: int
+    :return: header columns and the start and end offsets of the blocks
+    :rtype: Tuple[List[str], Iterator[Tuple[int, int]]]
+    """
+    with open(data_file, "rb") as data:
+        header = data.readline()
+        header_end = data.tell()
+    columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    size = os.path.getsize(data_file)
+
+    def blocks() -> Iterator[Tuple[int, int]]:
+        with open(data_file, "rb") as data:
+            start = header_end
+            while start < size:
+                data.seek(min(start + block_size, size))
+                data.readline()
+                end = min(data.tell(), size)
+                yield start, end
+                start = end
+
+    return columns, blocks()
+
+
+def check_data_quality(
+    data_file: Path = TRAIN_FILE,
+    workers: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> Dict:
+    """Check every row of a raw training file against every data-quality rule in one pass.
+
+    The file is cut into blocks of whole lines, each block is read and checked by a worker process, so the csv parsing runs in parallel as well. At most two blocks per worker are in flight, so memory stays bounded regardless of the file size. The block results are merged in file order.
+
+    :param data_file: train.csv-format file
+    :type data_file: Path
+    :param workers: number of worker processes, 1 checks in the current process. Defaults to the CPU count
+    :type workers: Optional[int]
+    :param block_size: approximate number of bytes per block
+    :type block_size: int
+    :param max_samples: number of offending rows reported per rule
+    :type max_samples: int
+    :raises ValueError: file without the sales data columns
+    :return: row count and, per rule, the field, description, number of violations and the raw field texts of the first offending rows with their 0-based row number
+    :rtype: Dict
+    """
+    data_file = Path(data_file)
+    workers = workers or os.cpu_count() or 1
+    columns, blocks = line_blocks(data_file, block_size)
+    missing = [field for field in SALES_DATA_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    known_stores = STORE_INDEX.arrays().known
+
+    report = {
+        "file": str(data_file),
+        "rows": 0,
+        "rules": {
+            rule: {
+                "field": quality_rule.field,
+                "description": quality_rule.description,
+                "violations": 0,
+                "samples": [],
+            }
+            for rule, quality_rule in QUALITY_RULES.items()
+        },
+    }
+    start = time.perf_counter()
+
+    def merge_result(result: BlockResult):
+        for rule, count in result.violations.items():
+            rule_report = report["rules"][rule]
+            rule_report["violations"] += count
+            for sample in result.samples[rule]:
+                if len(rule_report["samples"]) < max_samples:
+                    rule_report["samples"].append(
+                        {**sample, "row": sample["row"] + report["rows"]}
+                    )
+        report["rows"] += result.rows
+        logger.info(
+            "%d rows checked, %.0f rows/s",
+            report["rows"],
+            report["rows"] / (time.perf_counter() - start),
+        )
+
+    executor: Optional[Executor] = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    pending: Deque = deque()
+    try:
+        for block_start, block_end in blocks:
+            arguments = (
+                data_file,
+                block_start,
+                block_end,
+                columns,
+                known_stores,
+                max_samples,
+            )
+            if executor is None:
+                merge_result(check_block(*arguments))
+                continue
+
+            pending.append(executor.submit(check_block, *arguments))
+            while len(pending) >= 2 * workers:
+                merge_result(pending.popleft().result())
+
+        while pending:
+            merge_result(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown()
+
+    return report
+
+
+def main(argv=None) -> int:
+    """Parse the command line arguments, check the file and write the report.
+
+    :return: exit status, 1 if any rule is violated
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_file", type=Path, nargs="?", default=TRAIN_FILE)
+    parser.add_argument(
+        "--report", type=Path, default=None, help="JSON report file, default stdout"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes, default CPU count"
+    )
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--samples", type=int, default=DEFAULT_MAX_SAMPLES)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    report = check_data_quality(
+        args.data_file, args.workers, args.block_size, args.samples
+    )
+    text = json.dumps(report, indent=2)
+    if args.report is None:
+        print(text)
+    else:
+        args.report.write_text(text)
+
+    failed = [
+        rule
+        for rule, rule_report in report["rules"].items()
+        if rule_report["violations"]
+    ]
+    for rule in failed:
+        logger.info("%s: %d violations", rule, report["rules"][rule]["violations"])
+    logger.info(
+        "%d rows, %d of %d rules violated",
+        report["rows"],
+        len(failed),
+        len(QUALITY_RULES),
+    )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
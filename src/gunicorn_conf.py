@@ -0,0 +1,22 @@
+"""Gunicorn settings of the multi-worker serving mode.
+
+Usage: PYTHONPATH=src gunicorn -c src/gunicorn_conf.py src.main:app
+
+The master imports the application and loads the model bundle, store index and duration table once before forking, the workers share that memory copy-on-write and serve the same API as a single uvicorn process.
+"""
+
+import os
+
+from model_api.workers import preload_shared_data, worker_count
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 80)}"
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = 30
+
+
+def when_ready(server):
+    """Load the shared read-only data in the master, after the application was imported and before the workers are forked"""
+    preload_shared_data()
+    server.log.info("Preloaded shared serving data for %s workers", server.num_workers)
@@ -0,0 +1,661 @@
+"""Measure the throughput, tail latency and error rate of the API under concurrent load, against a local server or a URL.
+
+Usage: PYTHONPATH=src python -m load_test --duration 30 --concurrency 32 [--url http://host:port | --server gunicorn --workers 4] --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from model_api.constants import BASE_DIR, STATE_HOLIDAYS, STORE_FILE
+
+SRC_DIR = Path(__file__).resolve().parent
+TRAIN_FIRST_DATE = "2013-01-01"
+TRAIN_LAST_DATE = "2015-07-31"
+ENDPOINTS = {
+    "predict": "/predict",
+    "batch": "/predict/batch",
+    "horizon": "/predict/horizon",
+    "snapshot": "/predict/snapshot",
+}
+SERVERS = ("uvicorn", "gunicorn")
+DEFAULT_MIX = ["predict=1"]
+DEFAULT_DURATION = 30.0
+DEFAULT_WARMUP = 5.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_HORIZON_DAYS = 14
+DEFAULT_TIMEOUT = 30.0
+PAYLOADS_PER_ENDPOINT = 1000
+READY_TIMEOUT = 60.0
+
+
+class Sample(NamedTuple):
+    """Outcome of one request, status 0 when no response was received"""
+
+    endpoint: str
+    start: float
+    latency: float
+    status: int
+
+
+class RequestFactory:
+    """Realistic request bodies of every endpoint, with stores sampled from store.csv and dates from the train.csv range"""
+
+    def __init__(
+        self,
+        store_file: Path = STORE_FILE,
+        seed: int = 0,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+    ):
+        """Read the stores and prepare the random generator.
+
+        Stores without a CompetitionDistance are left out, the service rejects them.
+
+        :param store_file: store.csv-format file
+        :type store_file: Path
+        :param seed: random seed, the same seed generates the same requests
+        :type seed: int
+        :param batch_size: number of entries of a /predict/batch request
+        :type batch_size: int
+        :param horizon_days: number of days of a /predict/horizon request
+        :type horizon_days: int
+        """
+        df_store = pd.read_csv(store_file, usecols=["Store", "CompetitionDistance"])
+        self.stores = df_store.loc[
+            df_store["CompetitionDistance"].notna(), "Store"
+        ].to_numpy()
+        self.dates = pd.date_range(TRAIN_FIRST_DATE, TRAIN_LAST_DATE, freq="D")
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.horizon_days = horizon_days
+
+    def scenario(self) -> Dict[str, Any]:
+        """Draw the sales data values shared by the entries of a request, mostly open days without holidays.
+
+        :return: Customers, Open, Promo, StateHoliday and SchoolHoliday
+        :rtype: Dict[str, Any]
+        """
+        is_open = int(self.rng.random() < 0.83)
+        return {
+            "Customers": max(int(self.rng.normal(760, 300)), 0) * is_open,
+            "Open": is_open,
+            "Promo": int(self.rng.random() < 0.38),
+            "StateHoliday": str(
+                self.rng.choice(list(STATE_HOLIDAYS), p=[0.97, 0.02, 0.005, 0.005])
+            ),
+            "SchoolHoliday": int(self.rng.random() < 0.18),
+        }
+
+    def entry(self) -> Dict[str, Any]:
+        """Draw one /predict entry.
+
+        :return: sales data entry
+        :rtype: Dict[str, Any]
+        """
+        date = self.dates[self.rng.integers(len(self.dates))]
+        return {
+            "Store": int(self.rng.choice(self.stores)),
+            "DayOfWeek": int(date.dayofweek + 1),
+            "Date": date.strftime("%Y-%m-%d"),
+            **self.scenario(),
+        }
+
+    def body(self, endpoint: str) -> Any:
+        """Draw the JSON body of one request.
+
+        :param endpoint: endpoint name, one of ENDPOINTS
+        :type endpoint: str
+        :return: request body
+        :rtype: Any
+        """
+        if endpoint == "predict":
+            return self.entry()
+        if endpoint == "batch":
+            return [self.entry() for _ in range(self.batch_size)]
+
+        entry = self.entry()
+        scenario = {
+            field: entry[field]
+            for field in ["Customers", "Open", "Promo", "StateHoliday", "SchoolHoliday"]
+        }
+        if endpoint == "snapshot":
+            return {"Date": entry["Date"], **scenario}
+
+        start = pd.Timestamp(entry["Date"])
+        end = start + pd.Timedelta(days=self.horizon_days - 1)
+        return {
+            "Store": entry["Store"],
+            "StartDate": entry["Date"],
+            "EndDate": end.strftime("%Y-%m-%d"),
+            **scenario,
+        }
+
+    def payloads(
+        self, endpoint: str, count: int = PAYLOADS_PER_ENDPOINT
+    ) -> List[bytes]:
+        """Encode request bodies ahead of the run, so that the load generator only sends bytes.
+
+        :param endpoint: endpoint name, one of ENDPOINTS
+        :type endpoint: str
+        :param count: number of distinct bodies, replayed in turn
+        :type count: int
+        :return: JSON encoded bodies
+        :rtype: List[bytes]
+        """
+        return [json.dumps(self.body(endpoint)).encode() for _ in range(count)]
+
+
+def parse_mix(values: Sequence[str]) -> Dict[str, float]:
+    """Parse ENDPOINT=WEIGHT request mix arguments.
+
+    :param values: arguments like predict=8 or batch=1
+    :type values: Sequence[str]
+    :raises ValueError: unknown endpoint or weight that is not a positive number
+    :return: relative weight by endpoint name
+    :rtype: Dict[str, float]
+    """
+    mix = {}
+    for value in values:
+        endpoint, _, weight = value.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise ValueError(
+                f"unknown endpoint {endpoint}, expected one of {', '.join(ENDPOINTS)}"
+            )
+        try:
+            mix[endpoint] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f"weight of {endpoint} must be a number") from None
+        if mix[endpoint] <= 0:
+            raise ValueError(f"weight of {endpoint} must be positive")
+
+    return mix
+
+
+async def run_load(
+    url: str,
+    payloads: Dict[str, List[bytes]],
+    mix: Dict[str, float],
+    duration: float,
+    concurrency: int,
+    rate: Optional[float] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    seed: int = 0,
+) -> List[Sample]:
+    """Send requests of the mix to the service for the given duration.
+
+    Without a rate, concurrency clients send their next request as soon as the previous one is answered (closed loop). With a rate, requests are started on a fixed schedule of rate per second with at most concurrency in flight (open loop). Their latency is measured from the scheduled start, so time spent waiting for a free slot while the service falls behind counts as latency.
+
+    :param url: base URL of the service
+    :type url: str
+    :param payloads: encoded request bodies by endpoint name
+    :type payloads: Dict[str, List[bytes]]
+    :param mix: relative weight by endpoint name
+    :type mix: Dict[str, float]
+    :param duration: seconds to send requests for
+    :type duration: float
+    :param concurrency: largest number of requests in flight
+    :type concurrency: int
+    :param rate: requests started per second, None for a closed loop
+    :type rate: Optional[float]
+    :param timeout: seconds before a request counts as failed
+    :type timeout: float
+    :param seed: random seed of the endpoint choice
+    :type seed: int
+    :return: outcome of every request, start times relative to the start of the run
+    :rtype: List[Sample]
+    """
+    chooser = random.Random(seed)
+    endpoints = list(mix)
+    weights = list(mix.values())
+    sent = {endpoint: 0 for endpoint in endpoints}
+    samples: List[Sample] = []
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(
+        base_url=url, timeout=timeout, limits=limits
+    ) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + duration
+
+        async def send(scheduled: float):
+            endpoint = chooser.choices(endpoints, weights)[0]
+            bodies = payloads[endpoint]
+            body = bodies[sent[endpoint] % len(bodies)]
+            sent[endpoint] += 1
+            try:
+                response = await client.post(
+                    ENDPOINTS[endpoint],
+                    content=body,
+                    headers={"content-type": "application/json"},
+                )
+                await response.aread()
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            samples.append(
+                Sample(endpoint, scheduled - start, loop.time() - scheduled, status)
+            )
+
+        if rate is None:
+
+            async def client_loop():
+                while loop.time() < end:
+                    await send(loop.time())
+
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+            return samples
+
+        slots = asyncio.Semaphore(concurrency)
+        tasks = set()
+
+        async def scheduled_send(scheduled: float):
+            try:
+                await send(scheduled)
+            finally:
+                slots.release()
+
+        index = 0
+        while True:
+            scheduled = start + index / rate
+            if scheduled >= end:
+                break
+            await asyncio.sleep(max(scheduled - loop.time(), 0))
+            await slots.acquire()
+            task = asyncio.ensure_future(scheduled_send(scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            index += 1
+        await asyncio.gather(*tasks)
+
+    return samples
+
+
+def latency_summary(samples: Sequence[Sample], window: float) -> Dict[str, Any]:
+    """Summarize the requests of a measurement window.
+
+    :param samples: requests started in the window
+    :type samples: Sequence[Sample]
+    :param window: length of the window in seconds
+    :type window: float
+    :return: request count, achieved requests per second, error count and rate, status counts and latency statistics in milliseconds
+    :rtype: Dict[str, Any]
+    """
+    latencies = np.array([sample.latency for sample in samples]) * 1000
+    statuses = [sample.status for sample in samples]
+    errors = sum(1 for status in statuses if not 200 <= status < 400)
+    summary = {
+        "requests": len(samples),
+        "rps": len(samples) / window if window else 0.0,
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "status": {
+            str(status): statuses.count(status) for status in sorted(set(statuses))
+        },
+    }
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary["latency_ms"] = {
+            "mean": float(latencies.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencies.max()),
+        }
+
+    return summary
+
+
+def summarize(samples: Sequence[Sample], warmup: float, duration: float) -> Dict:
+    """Summarize the requests started after the warm-up, overall and per endpoint.
+
+    :param samples: outcome of every request of the run
+    :type samples: Sequence[Sample]
+    :param warmup: seconds at the start of the run left out
+    :type warmup: float
+    :param duration: seconds the run sent requests for
+    :type duration: float
+    :return: overall summary with an endpoints entry holding the summary of every endpoint
+    :rtype: Dict
+    """
+    measured = [sample for sample in samples if sample.start >= warmup]
+    window = duration - warmup
+    summary = latency_summary(measured, window)
+    summary["endpoints"] = {
+        endpoint: latency_summary(
+            [sample for sample in measured if sample.endpoint == endpoint], window
+        )
+        for endpoint in sorted({sample.endpoint for sample in measured})
+    }
+
+    return summary
+
+
+def free_port() -> int:
+    """Find a free local TCP port.
+
+    :return: port number
+    :rtype: int
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = READY_TIMEOUT):
+    """Wait until the service answers its readiness probe.
+
+    :param url: base URL of the service
+    :type url: str
+    :param process: server process
+    :type process: subprocess.Popen
+    :param timeout: seconds to wait
+    :type timeout: float
+    :raises RuntimeError: server process exited or did not become ready in time
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    raise RuntimeError(f"server at {url} not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def local_server(
+    server: str, workers: int, port: Optional[int] = None
+) -> Iterator[str]:
+    """Start the API on this machine for the duration of a load test.
+
+    :param server: uvicorn, or gunicorn with the preloaded workers of gunicorn_conf.py
+    :type server: str
+    :param workers: number of worker processes
+    :type workers: int
+    :param port: port to listen on, a free port if not given
+    :type port: Optional[int]
+    :raises ValueError: unknown server
+    :return: base URL of the ready server, which is stopped on exit
+    :rtype: Iterator[str]
+    """
+    if server not in SERVERS:
+        raise ValueError(f"server must be one of {', '.join(SERVERS)}")
+    port = port or free_port()
+    env = {**os.environ, "PYTHONPATH": str(SRC_DIR)}
+    if server == "uvicorn":
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ]
+    else:
+        env["WEB_CONCURRENCY"] = str(workers)
+        command = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn_conf.py",
+            "main:app",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--log-level",
+            "warning",
+        ]
+
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(command, cwd=SRC_DIR, env=env)
+    try:
+        wait_ready(url, process)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the machine and the API version the load test ran with.
+
+    :return: environment description
+    :rtype: Dict[str, Any]
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    version: Dict[str, str] = {}
+    version_file = BASE_DIR / "__version__.py"
+    if version_file.exists():
+        exec(version_file.read_text(), version)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "version": version.get("version"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_test(
+    url: Optional[str] = None,
+    server: str = "uvicorn",
+    workers: int = 1,
+    mix: Optional[Dict[str, float]] = None,
+    duration: float = DEFAULT_DURATION,
+    warmup: float = DEFAULT_WARMUP,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rate: Optional[float] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    horizon_days: int = DEFAULT_HORIZON_DAYS,
+    timeout: float = DEFAULT_TIMEOUT,
+    seed: int = 0,
+) -> Dict:
+    """Run a load test against a URL, or against a server started locally, and summarize it.
+
+    :param url: base URL of a running service, None to start one locally
+    :type url: Optional[str]
+    :param server: server started locally, uvicorn or gunicorn
+    :type server: str
+    :param workers: number of worker processes of the local server
+    :type workers: int
+    :param mix: relative weight by endpoint name, defaults to /predict only
+    :type mix: Optional[Dict[str, float]]
+    :param duration: seconds to send requests for, including the warm-up
+    :type duration: float
+    :param warmup: seconds at the start of the run left out of the results
+    :type warmup: float
+    :param concurrency: largest number of requests in flight
+    :type concurrency: int
+    :param rate: requests started per second, None to send as fast as the service answers
+    :type rate: Optional[float]
+    :param batch_size: number of entries of a /predict/batch request
+    :type batch_size: int
+    :param horizon_days: number of days of a /predict/horizon request
+    :type horizon_days: int
+    :param timeout: seconds before a request counts as failed
+    :type timeout: float
+    :param seed: random seed of the requests
+    :type seed: int
+    :raises ValueError: warm-up not shorter than the duration
+    :return: configuration, environment and results of the run
+    :rtype: Dict
+    """
+    if warmup >= duration:
+        raise ValueError("warmup must be shorter than duration")
+    mix = mix or parse_mix(DEFAULT_MIX)
+    factory = RequestFactory(
+        seed=seed, batch_size=batch_size, horizon_days=horizon_days
+    )
+    payloads = {endpoint: factory.payloads(endpoint) for endpoint in mix}
+    config = {
+        "url": url,
+        "server": None if url else server,
+        "workers": None if url else workers,
+        "mix": mix,
+        "duration": duration,
+        "warmup": warmup,
+        "concurrency": concurrency,
+        "rate": rate,
+        "batch_size": batch_size,
+        "horizon_days": horizon_days,
+        "seed": seed,
+    }
+
+    def run(target: str) -> List[Sample]:
+        return asyncio.run(
+            run_load(target, payloads, mix, duration, concurrency, rate, timeout, seed)
+        )
+
+    if url is None:
+        with local_server(server, workers) as local_url:
+            samples = run(local_url)
+    else:
+        samples = run(url.rstrip("/"))
+
+    return {
+        "config": config,
+        "environment": environment(),
+        "results": summarize(samples, warmup, duration),
+    }
+
+
+def compare_runs(runs: Sequence[Dict], labels: Sequence[str]) -> str:
+    """Tabulate the throughput and latency of saved runs side by side.
+
+    :param runs: saved load test results
+    :type runs: Sequence[Dict]
+    :param labels: name of every run, e.g. its file name
+    :type labels: Sequence[str]
+    :return: one line per run
+    :rtype: str
+    """
+    lines = [
+        f"{'run':30} {'version':>8} {'server':>9} {'workers':>7} {'conc':>5} "
+        f"{'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    ]
+    for label, run in zip(labels, runs):
+        config, results = run["config"], run["results"]
+        latency = results.get("latency_ms", {})
+        lines.append(
+            f"{label:30} {str(run['environment'].get('version')):>8} "
+            f"{str(config['server'] or 'url'):>9} {str(config['workers'] or '-'):>7} "
+            f"{config['concurrency']:>5} {results['rps']:>9.1f} "
+            f"{latency.get('p50', float('nan')):>8.2f} "
+            f"{latency.get('p95', float('nan')):>8.2f} "
+            f"{latency.get('p99', float('nan')):>8.2f} "
+            f"{results['error_rate']:>7.2%}"
+        )
+
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    """Parse the command line arguments, run the load test or compare saved runs.
+
+    :return: exit code, 1 if any request failed
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running service")
+    parser.add_argument("--server", choices=SERVERS, default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=DEFAULT_MIX,
+        help=f"ENDPOINT=WEIGHT, endpoints: {', '.join(ENDPOINTS)}",
+    )
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument(
+        "--rate", type=float, help="requests per second, default as fast as answered"
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--horizon-days", type=int, default=DEFAULT_HORIZON_DAYS)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("load_test.json"))
+    parser.add_argument(
+        "--compare", type=Path, nargs="+", help="only tabulate these saved runs"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        runs = [json.loads(path.read_text()) for path in args.compare]
+        print(compare_runs(runs, [path.name for path in args.compare]))
+        return 0
+
+    run = load_test(
+        url=args.url,
+        server=args.server,
+        workers=args.workers,
+        mix=parse_mix(args.mix),
+        duration=args.duration,
+        warmup=args.warmup,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        batch_size=args.batch_size,
+        horizon_days=args.horizon_days,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+    args.output.write_text(json.dumps(run, indent=2))
+    print(compare_runs([run], [args.output.name]))
+    for endpoint, summary in run["results"]["endpoints"].items():
+        latency = summary.get("latency_ms", {})
+        print(
+            f"  {endpoint:10} {summary['requests']:>8} requests "
+            f"{summary['rps']:>9.1f} rps p99 {latency.get('p99', float('nan')):.2f} ms "
+            f"errors {summary['error_rate']:.2%}"
+        )
+
+    return 1 if run["results"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,162 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import functools
 
+import json
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, ValidationError
+
+import numpy as np
 import pandas as pd
 
-from typing import Dict, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from model_api.constants import (
+    STATE_HOLIDAYS,
+    MICRO_BATCH_MAX_SIZE,
+    MICRO_BATCH_MAX_WAIT,
+    SALES_DATA_FIELDS,
+    PROFILING_ENABLED,
+)
+
+from model_api.arrow_io import (
+    ARROW_STREAM_MEDIA_TYPE,
+    arrow_available,
+    read_arrow_batch,
+    write_arrow_predictions,
+)
+from model_api.calendar_table import CALENDAR, CalendarFeatures
+from model_api.compiled_model import compiled_predictor
+from model_api.duration_table import DURATION_INDEX
+from model_api.horizon import (
+    HORIZON_FIELDS,
+    date_ordinal,
+    horizon_frame,
+    horizon_ordinals,
+)
+from model_api.metrics import (
+    METRICS,
+    VALIDATION_REJECTIONS,
+    RequestMetricsMiddleware,
+)
+from model_api.model_functions import classify_match, classify_match_batch
+from model_api.model_pipeline import (
+    reshape_inputs_pipeline,
+    model_prediction_pipeline,
+    reshape_inputs_batch_pipeline,
+    model_prediction_batch_pipeline,
+)
+from model_api.model_utils import MODEL_REGISTRY
+from model_api.ndjson_stream import (
+    NDJSONRecord,
+    RequestStreamingResponse,
+    ndjson_chunks,
+)
+from model_api.prediction_cache import PREDICTION_CACHE, sales_data_key
+from model_api.profiling import (
+    REQUEST_PROFILER,
+    ProfilingMiddleware,
+    profiling_active,
+)
+from model_api.snapshot import SNAPSHOT_CACHE, Scenario
+from model_api.stage_executor import STAGE_EXECUTOR
+from model_api.startup import STARTUP
+from model_api.workers import MEMORY_TRACKER
+from model_api.validation import validate_sales_frame
+from model_api.store_index import STORE_INDEX
 
-from model_api.constants import STATE_HOLIDAYS, BASE_DIR
 
-from pandas._libs.tslibs.parsing import DateParseError
+app = FastAPI()
+app.add_middleware(RequestMetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=REQUEST_PROFILER)
+STARTUP.mark("imported")
+
+FIELD_VALIDATORS = {
+    "Store": "check_store_entry",
+    "DayOfWeek": "check_week_day_entry",
+    "Customers": "check_customer_entry",
+    "Open": "check_binary_entry",
+    "Promo": "check_binary_entry",
+    "SchoolHoliday": "check_binary_entry",
+    "Date": "check_date_period",
+    "StateHoliday": "check_stateholidays",
+}
+
+
+WARMUP_ENTRY = {
+    "Store": 2,
+    "DayOfWeek": 1,
+    "Date": "2013-12-30",
+    "Customers": 500,
+    "Open": 1,
+    "Promo": 1,
+    "StateHoliday": "0",
+    "SchoolHoliday": 0,
+}
+
+
+@app.on_event("startup")
+async def load_artifacts():
+    """Start the stage pools and the watchers of the artifact files, and warm up the service in the background.
+
+    The server accepts connections right away, /ready reports ready once the warm-up completed. Requests arriving earlier load the artifacts they need on first use. The memory of the worker at this point is the baseline of its reported memory growth.
+    """
+    MEMORY_TRACKER.mark_baseline()
+    MODEL_REGISTRY.start_watcher()
+    STORE_INDEX.start_watcher()
+    STAGE_EXECUTOR.start()
+    STARTUP.start(warm_up_steps())
 
-from model_api.model_functions import classify_match
-from model_api.model_pipeline import reshape_inputs_pipeline, model_prediction_pipeline
 
+def warm_up_steps() -> Dict[str, Callable[[], object]]:
+    """List the warm-up steps: load the model bundle, store index and duration table, compile the predictor and run a first prediction.
 
-app = FastAPI()
+    :return: warm-up callables by step name
+    :rtype: Dict[str, Callable[[], object]]
+    """
+    return {
+        "model": MODEL_REGISTRY.snapshot,
+        "store_index": STORE_INDEX.arrays,
+        "duration_table": lambda: DURATION_INDEX.table(STORE_INDEX.arrays()),
+        "compiled_predictor": compiled_predictor,
+        "first_prediction": warm_up_prediction,
+    }
+
+
+def warm_up_prediction() -> float:
+    """Predict a fixed entry through the validation, reshape and predict stages of the serving path.
+
+    :return: predicted sales of the warm-up entry
+    :rtype: float
+    """
+    sales_data = pre_check_data_entry(SalesData(**WARMUP_ENTRY))
+    if not PREDICTION_BATCHER.enabled:
+        return float(model_prediction_pipeline(reshape_sales_entry(sales_data))[0])
+
+    df_request = sales_frame([sales_data])
+    validate_sales_frame(df_request)
+
+    return float(model_prediction_batch_pipeline(reshape_sales_frame(df_request))[0])
+
+
+@app.on_event("shutdown")
+async def stop_artifact_watcher():
+    """Stop the background reload of the model artifacts and store index, and the stage pools."""
+    MODEL_REGISTRY.stop_watcher()
+    STORE_INDEX.stop_watcher()
+    STAGE_EXECUTOR.shutdown()
 
 
 class SalesData(BaseModel):
@@ -29,28 +172,247 @@ class SalesData(BaseModel):
     SchoolHoliday: int
 
 
+SALES_DATA_TYPES = {name: field.type_ for name, field in SalesData.__fields__.items()}
+
+
 class PredictionOut(BaseModel):
     """Standard format and data type of predicted output"""
 
     sales: float
 
 
+class RowError(BaseModel):
+    """Validation error of a single batch entry"""
+
+    row: int
+    field: str
+    detail: str
+
+
+class BatchPredictionOut(BaseModel):
+    """Standard format and data type of predicted batch output"""
+
+    sales: List[Optional[float]]
+    errors: List[RowError]
+    warnings: List[RowError]
+
+
+class HorizonDay(BaseModel):
+    """Values of a single day of a forecast horizon, fields left out take the request defaults"""
+
+    Date: str
+    Customers: Optional[int] = None
+    Open: Optional[int] = None
+    Promo: Optional[int] = None
+    StateHoliday: Optional[str] = None
+    SchoolHoliday: Optional[int] = None
+
+
+class HorizonRequest(BaseModel):
+    """Store and date range of a forecast horizon, with the default and per day values of the generated entries"""
+
+    Store: int
+    StartDate: str
+    EndDate: str
+    Customers: int
+    Open: int = 1
+    Promo: int = 0
+    StateHoliday: str = "0"
+    SchoolHoliday: int = 0
+    Days: List[HorizonDay] = []
+
+
+class HorizonPredictionOut(BaseModel):
+    """Standard format and data type of predicted horizon output"""
+
+    Store: int
+    dates: List[str]
+    sales: List[Optional[float]]
+    errors: List[RowError]
+
+
+class SnapshotRequest(BaseModel):
+    """Date and scenario of a chain-wide snapshot, the sales data values shared by every store"""
+
+    Date: str
+    Customers: int
+    Open: int = 1
+    Promo: int = 0
+    StateHoliday: str = "0"
+    SchoolHoliday: int = 0
+
+
+class SnapshotOut(BaseModel):
+    """Standard format and data type of a chain-wide snapshot, one column entry per store"""
+
+    Date: str
+    DayOfWeek: int
+    model_version: int
+    cached: bool
+    Store: List[int]
+    sales: List[Optional[float]]
+
+
+class PredictionBatcher:
+    """Merge concurrent single entry predictions into vectorized batches.
+
+    Validated entries are queued and flushed once max_batch_size entries are waiting or max_wait seconds passed since the first one. Every flush runs one vectorized reshape and predict pass and resolves the future of each caller with its own prediction.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = MICRO_BATCH_MAX_SIZE,
+        max_wait: float = MICRO_BATCH_MAX_WAIT,
+    ):
+        """Initialize an empty queue.
+
+        :param max_batch_size: number of queued entries that triggers a flush
+        :type max_batch_size: int
+        :param max_wait: longest time in seconds an entry waits for a flush, 0 disables batching
+        :type max_wait: float
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple["SalesData", asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.flushes = 0
+        self.batched_entries = 0
+        self.largest_batch = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether entries are merged into batches at all"""
+        return self.max_wait > 0 and self.max_batch_size > 1
+
+    async def predict(self, sales_data: "SalesData") -> float:
+        """Queue a validated entry and wait for its prediction.
+
+        :param sales_data: validated JSON response input
+        :type sales_data: SalesData
+        :return: predicted sales
+        :rtype: float
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((sales_data, future))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+
+        return await future
+
+    def flush(self):
+        """Start predicting every queued entry in a background task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        self.flushes += 1
+        self.batched_entries += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        task = asyncio.get_running_loop().create_task(self._predict_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _predict_batch(self, batch: List[Tuple["SalesData", asyncio.Future]]):
+        """Predict a flushed batch and resolve the waiting futures.
+
+        If the vectorized pass fails, the entries are predicted one by one so that only the failing callers receive the error.
+
+        :param batch: queued entries and their futures
+        :type batch: List[Tuple[SalesData, asyncio.Future]]
+        """
+        try:
+            sales = await predict_sales(
+                sales_frame([sales_data for sales_data, _ in batch])
+            )
+        except Exception:
+            for sales_data, future in batch:
+                if future.done():
+                    continue
+                try:
+                    prediction = await predict_sales(sales_frame([sales_data]))
+                    future.set_result(float(prediction[0]))
+                except Exception as exc:
+                    future.set_exception(exc)
+            return
+
+        for (_, future), prediction in zip(batch, sales):
+            if not future.done():
+                future.set_result(float(prediction))
+
+    def stats(self) -> Dict[str, float]:
+        """Return the batching counters.
+
+        :return: configuration, flush count and batch sizes
+        :rtype: Dict[str, float]
+        """
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait": self.max_wait,
+            "queued": len(self._pending),
+            "flushes": self.flushes,
+            "batched_entries": self.batched_entries,
+            "largest_batch": self.largest_batch,
+        }
+
+
+PREDICTION_BATCHER = PredictionBatcher()
+
+
 @app.post("/predict", response_model=PredictionOut)
 async def process_data(sales_data: SalesData) -> Dict[str, float]:
     """Predict the sales based on incoming JSON response values.
 
-    This function will process the incoming POST request, validate the entry, clean/reshape the inputs into corresponding model features, and predict the sales output based on the trained model.
+    This function will process the incoming POST request, validate the entry, clean/reshape the inputs into corresponding model features, and predict the sales output based on the trained model. Repeated entries are answered from the prediction cache until the model or store data changes. Profiled requests take the vectorized pass of the batcher without waiting in its queue.
 
     :param sales_data: JSON response input
     :type sales_data: StoreData
     :return: predicted sales data
     :rtype: Dict[str, float]
     """
-    df = pd.read_csv(BASE_DIR / "data" / "processed_data.csv", nrows=1).drop(
-        ["Id", "Sales"], axis=1
+    cache_key = sales_data_key(sales_data)
+    cache_token = (MODEL_REGISTRY.version, STORE_INDEX.version)
+    cached_sales = PREDICTION_CACHE.get(cache_key, cache_token)
+    if cached_sales is not None:
+        return {"sales": cached_sales}
+
+    sales_data = await STAGE_EXECUTOR.run(
+        "validation", pre_check_data_entry, sales_data, allow_process=False
     )
-    df_request = pd.Series(index=df.columns)
-    sales_data = await pre_check_data_entry(sales_data)
+    if PREDICTION_BATCHER.enabled and not profiling_active():
+        sales = await PREDICTION_BATCHER.predict(sales_data)
+    elif PREDICTION_BATCHER.enabled:
+        sales = float((await predict_sales(sales_frame([sales_data])))[0])
+    else:
+        reshaped_inputs = await STAGE_EXECUTOR.run(
+            "reshape", reshape_sales_entry, sales_data
+        )
+        prediction = await STAGE_EXECUTOR.run(
+            "predict", model_prediction_pipeline, reshaped_inputs
+        )
+        sales = float(prediction[0])
+    PREDICTION_CACHE.put(cache_key, sales, cache_token)
+    STARTUP.mark("first_prediction")
+
+    return {"sales": sales}
+
+
+def reshape_sales_entry(sales_data: SalesData) -> pd.Series:
+    """Reshape a validated entry into the model features, laid out in the feature order of the model bundle.
+
+    :param sales_data: validated JSON response input
+    :type sales_data: SalesData
+    :return: reshaped model inputs
+    :rtype: pd.Series
+    """
+    df_request = pd.Series(index=MODEL_REGISTRY.get("bundle").feature_names)
     df_request["Store"] = sales_data.Store
     df_request["DayOfWeek"] = sales_data.DayOfWeek
     df_request["Customers"] = sales_data.Customers
@@ -64,13 +426,451 @@ async def process_data(sales_data: SalesData) -> Dict[str, float]:
         df_request,
     )
 
-    reshaped_inputs = reshape_inputs_pipeline(df_request)
-    sales = model_prediction_pipeline(reshaped_inputs=reshaped_inputs)
+    return reshape_inputs_pipeline(df_request)
 
-    return {"sales": sales}
 
+@app.get("/ready")
+async def readiness() -> JSONResponse:
+    """Report whether the startup warm-up completed, with the process milestones and warm-up timings.
+
+    :return: readiness report, status 200 when ready and 503 before
+    :rtype: JSONResponse
+    """
+    report = STARTUP.report()
+
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/stats")
+async def service_stats() -> Dict[str, Dict]:
+    """Report the runtime counters of the service components.
+
+    :return: counters per component
+    :rtype: Dict[str, Dict]
+    """
+    return {
+        "cache": PREDICTION_CACHE.stats(),
+        "batching": PREDICTION_BATCHER.stats(),
+        "execution": STAGE_EXECUTOR.stats(),
+        "snapshots": SNAPSHOT_CACHE.stats(),
+        "memory": MEMORY_TRACKER.report(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def service_metrics() -> PlainTextResponse:
+    """Expose the request, stage, validation and artifact metrics in the Prometheus text format.
+
+    :return: metrics in text exposition format
+    :rtype: PlainTextResponse
+    """
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/profiles/summary")
+def profiles_summary(
+    top: int = Query(20, ge=1), sort: str = Query("cumulative")
+) -> Dict[str, List]:
+    """Summarize the kept request profiles: their requests, top functions and top allocation sites.
+
+    :param top: number of functions and allocation sites to report
+    :type top: int
+    :param sort: function ordering, cumulative or tottime
+    :type sort: str
+    :raises HTTPException: unknown sort key
+    :return: captures, top functions and top allocation sites
+    :rtype: Dict[str, List]
+    """
+    try:
+        return REQUEST_PROFILER.summary(top=top, sort=sort)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+
+@app.post("/predict/batch", response_model=BatchPredictionOut)
+async def process_batch(sales_batch: List[SalesData]) -> Dict[str, List]:
+    """Predict the sales of a list of JSON entries in one vectorized pass.
+
+    The entries are validated column-wise with the same rules as /predict. Invalid entries get a null prediction and one error record per failed rule, entries whose DayOfWeek contradicts the Date get a warning record. The valid ones are reshaped column-wise and predicted with a single model call. Predictions are returned in input order.
+
+    :param sales_batch: JSON response inputs
+    :type sales_batch: List[SalesData]
+    :return: predicted sales data, one per entry, and the per entry errors
+    :rtype: Dict[str, List]
+    """
+    if not sales_batch:
+        return {"sales": [], "errors": [], "warnings": []}
+
+    df_request = sales_frame(sales_batch)
+    validation = await STAGE_EXECUTOR.run(
+        "validation", validate_sales_frame, df_request, allow_process=False
+    )
+
+    for error in validation.errors:
+        VALIDATION_REJECTIONS.inc("/predict/batch", FIELD_VALIDATORS[error["field"]])
+
+    sales = np.full(len(df_request), np.nan)
+    if validation.valid.any():
+        sales[validation.valid] = await predict_sales(
+            df_request[validation.valid].reset_index(drop=True)
+        )
+
+    STARTUP.mark("first_prediction")
+
+    return {
+        "sales": [None if np.isnan(value) else value for value in sales.tolist()],
+        "errors": validation.errors,
+        "warnings": validation.warnings,
+    }
 
-async def pre_check_data_entry(sales_data: SalesData) -> SalesData:
+
+@app.post("/predict/arrow", response_class=Response)
+async def process_arrow(request: Request) -> Response:
+    """Predict the sales of an Arrow IPC stream of sales data columns in one vectorized pass.
+
+    The columns are decoded into arrays without a Python object per entry and validated and predicted like /predict/batch. The response is an Arrow IPC stream with one row per entry: the predicted sales, null for invalid entries, and the error and warning messages of the entry.
+
+    :param request: request with an Arrow IPC stream body holding the SalesData columns
+    :type request: Request
+    :raises HTTPException: pyarrow is not installed, or the body is not a valid stream of the SalesData columns
+    :return: Arrow IPC stream of the predictions
+    :rtype: Response
+    """
+    if not arrow_available():
+        raise HTTPException(status_code=501, detail="pyarrow is not installed")
+
+    body = await request.body()
+    try:
+        batch = await STAGE_EXECUTOR.run(
+            "validation", read_arrow_batch, body, allow_process=False
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+
+    validation = await STAGE_EXECUTOR.run(
+        "validation",
+        validate_sales_frame,
+        batch.df_request,
+        None,
+        batch.calendar_features,
+        allow_process=False,
+    )
+    for error in validation.errors:
+        VALIDATION_REJECTIONS.inc("/predict/arrow", FIELD_VALIDATORS[error["field"]])
+
+    valid = validation.valid
+    sales = np.full(len(valid), np.nan)
+    if valid.any():
+        sales[valid] = await predict_sales(
+            batch.df_request[valid].reset_index(drop=True),
+            CalendarFeatures(*(values[valid] for values in batch.calendar_features)),
+        )
+    STARTUP.mark("first_prediction")
+
+    content = await STAGE_EXECUTOR.run(
+        "predict",
+        write_arrow_predictions,
+        sales,
+        validation.errors,
+        validation.warnings,
+        allow_process=False,
+    )
+    return Response(content, media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+@app.post("/predict/horizon", response_model=HorizonPredictionOut)
+async def process_horizon(horizon: HorizonRequest) -> Dict[str, Any]:
+    """Predict the sales of one store for every day of a date range in one vectorized pass.
+
+    One entry per day is generated from the request defaults and the per day values, with the DayOfWeek derived from the date. The calendar features of the whole range are looked up as arrays, the generated entries are validated column-wise like /predict/batch and the valid ones are predicted with a single model call. Days with invalid values get a null prediction and one error record per failed rule.
+
+    :param horizon: store, date range and entry values
+    :type horizon: HorizonRequest
+    :raises HTTPException: unknown Store, or an invalid, too long or out of range date range
+    :return: dates and predicted sales of the horizon, and the per day errors
+    :rtype: Dict[str, Any]
+    """
+    if not STORE_INDEX.contains(horizon.Store):
+        VALIDATION_REJECTIONS.inc("/predict/horizon", "check_store_entry")
+        store_arrays = STORE_INDEX.arrays()
+        raise HTTPException(
+            status_code=422,
+            detail=f"Store number must be from {store_arrays.first_store} to {store_arrays.last_store}",
+        )
+
+    try:
+        ordinals = horizon_ordinals(horizon.StartDate, horizon.EndDate)
+        overrides = {
+            date_ordinal(day.Date, "Days Date"): day.dict(
+                exclude={"Date"}, exclude_none=True
+            )
+            for day in horizon.Days
+        }
+        frame = horizon_frame(
+            horizon.Store,
+            ordinals,
+            horizon.dict(include=set(HORIZON_FIELDS)),
+            overrides,
+        )
+    except ValueError as error:
+        VALIDATION_REJECTIONS.inc("/predict/horizon", "check_date_period")
+        raise HTTPException(status_code=422, detail=str(error))
+
+    validation = await STAGE_EXECUTOR.run(
+        "validation",
+        validate_sales_frame,
+        frame.df_request,
+        None,
+        frame.calendar_features,
+        allow_process=False,
+    )
+    for error in validation.errors:
+        VALIDATION_REJECTIONS.inc("/predict/horizon", FIELD_VALIDATORS[error["field"]])
+
+    valid = validation.valid
+    sales = np.full(len(ordinals), np.nan)
+    if valid.any():
+        sales[valid] = await predict_sales(
+            frame.df_request[valid].reset_index(drop=True),
+            CalendarFeatures(*(values[valid] for values in frame.calendar_features)),
+        )
+    STARTUP.mark("first_prediction")
+
+    return {
+        "Store": horizon.Store,
+        "dates": frame.dates.tolist(),
+        "sales": [None if np.isnan(value) else value for value in sales.tolist()],
+        "errors": validation.errors,
+    }
+
+
+@app.post("/predict/snapshot", response_model=SnapshotOut)
+async def process_snapshot(request: SnapshotRequest) -> JSONResponse:
+    """Predict the sales of every known store for one date and scenario in one vectorized pass.
+
+    The scenario values are validated with the /predict rules. The store-by-feature matrix is built from the preloaded store attributes and predicted with a single matrix-vector product, and the snapshot is memoized per date, scenario, model version and store data version, so only the first request computes it. Stores that cannot be predicted get a null prediction. The columns are returned as a JSONResponse, the SnapshotOut validation of thousands of values would cost more than the cached snapshot.
+
+    :param request: date and scenario values
+    :type request: SnapshotRequest
+    :raises HTTPException: scenario values breaking a validation rule, or a date outside the calendar table
+    :return: columnar Store ids and predicted sales, with the model version and whether the snapshot was cached
+    :rtype: JSONResponse
+    """
+    entry = pd.DataFrame(
+        [{"Store": STORE_INDEX.arrays().first_store, "DayOfWeek": 1, **request.dict()}],
+        columns=SALES_DATA_FIELDS,
+    )
+    errors = [
+        error
+        for error in validate_sales_frame(entry).errors
+        if error["field"] not in ("Store", "DayOfWeek")
+    ]
+    if errors:
+        VALIDATION_REJECTIONS.inc(
+            "/predict/snapshot", FIELD_VALIDATORS[errors[0]["field"]]
+        )
+        raise HTTPException(status_code=422, detail=errors[0]["detail"])
+
+    scenario = Scenario(**request.dict(exclude={"Date"}))
+    try:
+        snapshot, cached = await STAGE_EXECUTOR.run(
+            "predict", SNAPSHOT_CACHE.get, request.Date, scenario, allow_process=False
+        )
+    except ValueError as error:
+        VALIDATION_REJECTIONS.inc("/predict/snapshot", "check_date_period")
+        raise HTTPException(status_code=422, detail=str(error))
+    STARTUP.mark("first_prediction")
+
+    return JSONResponse(
+        {
+            "Date": snapshot.date,
+            "DayOfWeek": snapshot.day_of_week,
+            "model_version": snapshot.model_version,
+            "cached": cached,
+            "Store": snapshot.stores.tolist(),
+            "sales": [None if np.isnan(value) else value for value in snapshot.sales],
+        }
+    )
+
+
+@app.post("/predict/stream", response_class=RequestStreamingResponse)
+async def process_stream(request: Request) -> RequestStreamingResponse:
+    """Predict the sales of a newline-delimited JSON body of entries, streaming one NDJSON result line per entry.
+
+    The body is read incrementally and scored in chunks of STREAM_CHUNK_SIZE entries with the same validation and pipeline as /predict/batch, the results of a chunk are sent as soon as it is scored. Every result carries the line number of its entry, invalid lines get a null prediction and their errors inline instead of aborting the stream, so the server memory is bounded by the chunk size rather than the body size.
+
+    :param request: request with a newline-delimited JSON body of SalesData entries
+    :type request: Request
+    :return: newline-delimited JSON results in input order
+    :rtype: RequestStreamingResponse
+    """
+    return RequestStreamingResponse(score_ndjson(request.stream()))
+
+
+async def score_ndjson(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Score a streamed newline-delimited JSON body chunk by chunk.
+
+    :param body: body bytes as they are received
+    :type body: AsyncIterator[bytes]
+    :return: newline-delimited JSON results of every chunk
+    :rtype: AsyncIterator[bytes]
+    """
+    async for chunk in ndjson_chunks(body):
+        results = await score_stream_chunk(chunk)
+        yield "".join(json.dumps(result) + "\n" for result in results).encode()
+
+
+def sales_data_entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Check a decoded JSON entry against SalesData.
+
+    Entries whose fields already have the SalesData types are taken as they are, only the others are parsed by pydantic, which coerces their values or reports why it cannot.
+
+    :param record: decoded JSON entry
+    :type record: Dict[str, Any]
+    :raises ValidationError: entry that does not fit SalesData
+    :return: entry with the SalesData fields and types
+    :rtype: Dict[str, Any]
+    """
+    for name, field_type in SALES_DATA_TYPES.items():
+        if type(record.get(name)) is not field_type:
+            return SalesData(**record).dict()
+
+    return record
+
+
+async def score_stream_chunk(chunk: List[NDJSONRecord]) -> List[Dict[str, Any]]:
+    """Validate and predict one chunk of decoded NDJSON records.
+
+    :param chunk: decoded records, or their decoding errors
+    :type chunk: List[NDJSONRecord]
+    :return: one result per record with its line number, prediction and any errors or warnings
+    :rtype: List[Dict[str, Any]]
+    """
+    results = [{"line": record.line, "sales": None} for record in chunk]
+    entries: List[Dict[str, Any]] = []
+    positions: List[int] = []
+    for position, record in enumerate(chunk):
+        if record.error is not None:
+            results[position]["errors"] = [{"field": "line", "detail": record.error}]
+            VALIDATION_REJECTIONS.inc("/predict/stream", "pre_check_data_entry")
+            continue
+        try:
+            entries.append(sales_data_entry(record.record))
+        except ValidationError as error:
+            results[position]["errors"] = [
+                {"field": str(detail["loc"][0]), "detail": detail["msg"]}
+                for detail in error.errors()
+            ]
+            VALIDATION_REJECTIONS.inc("/predict/stream", "pre_check_data_entry")
+            continue
+        positions.append(position)
+
+    if not entries:
+        return results
+
+    df_request = pd.DataFrame(
+        {field: [entry[field] for entry in entries] for field in SALES_DATA_FIELDS}
+    )
+    validation = await STAGE_EXECUTOR.run(
+        "validation", validate_sales_frame, df_request, allow_process=False
+    )
+    for kind in ("errors", "warnings"):
+        for record in getattr(validation, kind):
+            results[positions[record["row"]]].setdefault(kind, []).append(
+                {"field": record["field"], "detail": record["detail"]}
+            )
+            if kind == "errors":
+                VALIDATION_REJECTIONS.inc(
+                    "/predict/stream", FIELD_VALIDATORS[record["field"]]
+                )
+
+    if validation.valid.any():
+        sales = await predict_sales(df_request[validation.valid].reset_index(drop=True))
+        valid_positions = np.asarray(positions)[validation.valid]
+        for position, value in zip(valid_positions.tolist(), sales.tolist()):
+            results[position]["sales"] = value
+    STARTUP.mark("first_prediction")
+
+    return results
+
+
+def sales_frame(sales_batch: List[SalesData]) -> pd.DataFrame:
+    """Collect JSON entries into a frame with one row per entry.
+
+    :param sales_batch: JSON response inputs
+    :type sales_batch: List[SalesData]
+    :return: sales data entries
+    :rtype: pd.DataFrame
+    """
+    return pd.DataFrame(
+        [sales_data.dict() for sales_data in sales_batch], columns=SALES_DATA_FIELDS
+    )
+
+
+async def predict_sales(
+    df_request: pd.DataFrame, calendar_features: Optional[CalendarFeatures] = None
+) -> np.ndarray:
+    """Reshape validated entries column-wise and predict them with a single model call, off the event loop.
+
+    :param df_request: validated sales data entries
+    :type df_request: pd.DataFrame
+    :param calendar_features: calendar features of the entries, looked up from their dates if not given
+    :type calendar_features: Optional[CalendarFeatures]
+    :return: predicted sales, one per entry
+    :rtype: np.ndarray
+    """
+    reshaped_inputs = await STAGE_EXECUTOR.run(
+        "reshape", reshape_sales_frame, df_request, calendar_features
+    )
+
+    return await STAGE_EXECUTOR.run(
+        "predict", model_prediction_batch_pipeline, reshaped_inputs
+    )
+
+
+def reshape_sales_frame(
+    df_request: pd.DataFrame, calendar_features: Optional[CalendarFeatures] = None
+) -> pd.DataFrame:
+    """Reshape validated entries column-wise into the model features.
+
+    :param df_request: validated sales data entries
+    :type df_request: pd.DataFrame
+    :param calendar_features: calendar features of the entries, looked up from their dates if not given
+    :type calendar_features: Optional[CalendarFeatures]
+    :return: reshaped model inputs, one row per entry
+    :rtype: pd.DataFrame
+    """
+    df_request = df_request.copy()
+    df_request = classify_match_batch(
+        STATE_HOLIDAYS,
+        df_request.pop("StateHoliday"),
+        df_request,
+    )
+
+    return reshape_inputs_batch_pipeline(df_request, calendar_features)
+
+
+def count_rejections(check: Callable) -> Callable:
+    """Count the entries a /predict validator rejects, by validator name.
+
+    :param check: validator raising HTTPException on invalid entries
+    :type check: Callable
+    :return: validator counting its rejections
+    :rtype: Callable
+    """
+
+    @functools.wraps(check)
+    def counted_check(*args, **kwargs):
+        try:
+            return check(*args, **kwargs)
+        except HTTPException:
+            VALIDATION_REJECTIONS.inc("/predict", check.__name__)
+            raise
+
+    return counted_check
+
+
+def pre_check_data_entry(sales_data: SalesData) -> SalesData:
     """Check the validity of the sales data entry.
 
     :param sales_data: JSON response input
@@ -78,19 +878,22 @@ async def pre_check_data_entry(sales_data: SalesData) -> SalesData:
     :return: validated model input
     :rtype: SalesData
     """
-    sales_data = await check_store_entry(sales_data)
-    sales_data = await check_week_day_entry(sales_data)
-    sales_data = await check_customer_entry(sales_data)
-    sales_data = await check_binary_entry(sales_data, sales_data.Open, "Open")
-    sales_data = await check_binary_entry(sales_data, sales_data.Promo, "Promo")
-    sales_data = await check_binary_entry(sales_data, sales_data.Promo, "SchoolHoliday")
-    sales_data = await check_date_period(sales_data)
-    sales_data = await check_stateholidays(sales_data)
+    sales_data = check_store_entry(sales_data)
+    sales_data = check_week_day_entry(sales_data)
+    sales_data = check_customer_entry(sales_data)
+    sales_data = check_binary_entry(sales_data, sales_data.Open, "Open")
+    sales_data = check_binary_entry(sales_data, sales_data.Promo, "Promo")
+    sales_data = check_binary_entry(
+        sales_data, sales_data.SchoolHoliday, "SchoolHoliday"
+    )
+    sales_data = check_date_period(sales_data)
+    sales_data = check_stateholidays(sales_data)
 
     return sales_data
 
 
-async def check_stateholidays(sales_data: SalesData) -> SalesData:
+@count_rejections
+def check_stateholidays(sales_data: SalesData) -> SalesData:
     """Validate if the StateHolidays entry has correct inputs.
 
     Checks if the StateHoliday entry has values of 0, a, b, c based on the specification.
@@ -106,7 +909,8 @@ async def check_stateholidays(sales_data: SalesData) -> SalesData:
     return sales_data
 
 
-async def check_date_period(sales_data: SalesData) -> SalesData:
+@count_rejections
+def check_date_period(sales_data: SalesData) -> SalesData:
     """Validate if the Date entry is of valid format.
 
     Checks if the entry can be converted into date format.
@@ -118,14 +922,15 @@ async def check_date_period(sales_data: SalesData) -> SalesData:
     :rtype: SalesData
     """
     try:
-        pd.Period(sales_data.Date)
-    except DateParseError:
+        CALENDAR.date_features(sales_data.Date)
+    except ValueError:
         raise HTTPException(status_code=422, detail="incorrect Date entry")
 
     return sales_data
 
 
-async def check_binary_entry(
+@count_rejections
+def check_binary_entry(
     sales_data: SalesData, entry: Union[int, float], params: str
 ) -> SalesData:
     """Validate if the entry is binary. Either 1 or 0 only.
@@ -146,7 +951,8 @@ async def check_binary_entry(
     return sales_data
 
 
-async def check_customer_entry(sales_data: SalesData) -> SalesData:
+@count_rejections
+def check_customer_entry(sales_data: SalesData) -> SalesData:
     """Check if the number of customer is not negative.
 
     :param sales_data: JSON response input
@@ -164,7 +970,8 @@ async def check_customer_entry(sales_data: SalesData) -> SalesData:
     return sales_data
 
 
-async def check_week_day_entry(sales_data: SalesData) -> SalesData:
+@count_rejections
+def check_week_day_entry(sales_data: SalesData) -> SalesData:
     """Checks if DayofWeek is between 1 to 7, corresponding to Sunday to Saturday.
 
     :param sales_data: JSON response input
@@ -181,23 +988,26 @@ async def check_week_day_entry(sales_data: SalesData) -> SalesData:
     return sales_data
 
 
-async def check_store_entry(sales_data: SalesData) -> SalesData:
-    """Checks if the Store entry is within the store.csv information.
+@count_rejections
+def check_store_entry(sales_data: SalesData) -> SalesData:
+    """Checks if the Store entry is within the store.csv information and has a CompetitionDistance to predict with.
 
     :param sales_data: JSON response input
     :type sales_data: SalesData
-    :raises HTTPException: Store Number is not on the list
+    :raises HTTPException: Store Number is not on the list, or the store has no CompetitionDistance
     :return: Validated Store input
     :rtype: SalesData
     """
-    df_store_info = pd.read_csv(
-        BASE_DIR / "data" / "raw" / "store.csv", usecols=["Store"]
-    ).drop_duplicates()
-    store_list = df_store_info["Store"].to_list()
-    if sales_data.Store not in store_list:
+    store_arrays = STORE_INDEX.arrays()
+    store = sales_data.Store
+    if not (0 <= store < len(store_arrays.known) and store_arrays.known[store]):
         raise HTTPException(
             status_code=422,
-            detail=f"Store number must be from {store_list[0]} to {store_list[-1]}",
+            detail=f"Store number must be from {store_arrays.first_store} to {store_arrays.last_store}",
+        )
+    if np.isnan(store_arrays.competition_distance[store]):
+        raise HTTPException(
+            status_code=422, detail="Store has no CompetitionDistance to predict with"
         )
 
     return sales_data
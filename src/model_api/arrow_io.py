@@ -0,0 +1,228 @@
+import importlib.util
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .calendar_table import CALENDAR, CalendarFeatures
+from .constants import SALES_DATA_FIELDS
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+INTEGER_FIELDS = [
+    field for field in SALES_DATA_FIELDS if field not in ("Date", "StateHoliday")
+]
+
+
+class ArrowBatch(NamedTuple):
+    """Sales data entries decoded from an Arrow IPC stream, with the calendar features of their dates"""
+
+    df_request: pd.DataFrame
+    calendar_features: CalendarFeatures
+
+
+def arrow_available() -> bool:
+    """Check whether the optional pyarrow dependency is installed.
+
+    :return: whether pyarrow can be imported
+    :rtype: bool
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def dictionary_codes(array) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary encode a string array into integer codes and its distinct values.
+
+    :param array: pyarrow string array
+    :type array: pyarrow.Array
+    :return: code of every row, -1 for nulls, and the distinct values
+    :rtype: Tuple[np.ndarray, List[str]]
+    """
+    import pyarrow.compute as pc
+
+    encoded = pc.dictionary_encode(array)
+    codes = encoded.indices.to_numpy(zero_copy_only=False)
+    if encoded.null_count:
+        codes = np.where(encoded.is_valid().to_numpy(zero_copy_only=False), codes, -1)
+
+    return codes.astype(np.int64), encoded.dictionary.to_pylist()
+
+
+def date_codes(array) -> Tuple[np.ndarray, List[str]]:
+    """Encode a string or date array into integer codes and its distinct YYYY-MM-DD dates.
+
+    Dictionary arrays, e.g. from pandas categoricals, are encoded through their dictionary values, so each distinct value is converted once.
+
+    :param array: pyarrow string, date or timestamp array, or dictionary array of those
+    :type array: pyarrow.Array
+    :raises ValueError: array of another type
+    :return: code of every row, -1 for nulls, and the distinct dates
+    :rtype: Tuple[np.ndarray, List[str]]
+    """
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(array.type):
+        value_codes, dates = date_codes(array.dictionary)
+        valid = array.is_valid().to_numpy(zero_copy_only=False)
+        indices = array.indices.fill_null(0).to_numpy(zero_copy_only=False)
+        return np.where(valid, value_codes[indices], -1), dates
+
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        return dictionary_codes(array)
+
+    try:
+        days = array.cast(pa.date32()).cast(pa.int32())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise ValueError(
+            f"column Date must hold strings, dates or timestamps, not {array.type}"
+        ) from None
+    valid = days.is_valid().to_numpy(zero_copy_only=False)
+    days = days.fill_null(0).to_numpy(zero_copy_only=False)
+    unique_days, codes = np.unique(days, return_inverse=True)
+    dates = np.datetime_as_string(unique_days.astype("datetime64[D]")).tolist()
+
+    return np.where(valid, codes, -1), dates
+
+
+def take_values(values: List[str], codes: np.ndarray) -> np.ndarray:
+    """Expand distinct values to every row, the rows reference the distinct value objects instead of copies.
+
+    :param values: distinct values
+    :type values: List[str]
+    :param codes: distinct value of every row, -1 for nulls
+    :type codes: np.ndarray
+    :return: object array with the value of every row, None for nulls
+    :rtype: np.ndarray
+    """
+    lookup = np.empty(len(values) + 1, dtype=object)
+    lookup[:-1] = values
+
+    return lookup[codes]
+
+
+def take_calendar_features(
+    features: CalendarFeatures, codes: np.ndarray
+) -> CalendarFeatures:
+    """Expand the calendar features of the distinct dates to every row.
+
+    :param features: calendar features of the distinct dates
+    :type features: CalendarFeatures
+    :param codes: distinct date of every row, -1 for nulls
+    :type codes: np.ndarray
+    :return: calendar features of every row, NaN and parsed False for nulls
+    :rtype: CalendarFeatures
+    """
+    missing = codes < 0
+    rows = np.where(missing, 0, codes)
+    taken = [np.where(missing, np.nan, values[rows]) for values in features[:4]]
+
+    return CalendarFeatures(*taken, parsed=~missing & features.parsed[rows])
+
+
+def read_arrow_batch(body: bytes) -> ArrowBatch:
+    """Decode an Arrow IPC stream of sales data columns into a frame, without a Python object per row.
+
+    Integer columns are converted to int64 arrays, nulls become -1 so that the validation rules reject their rows. Date and StateHoliday are dictionary encoded and only their distinct values are parsed, the Date column may hold YYYY-MM-DD strings, dates or timestamps.
+
+    :param body: Arrow IPC stream with the SalesData columns
+    :type body: bytes
+    :raises ValueError: body that is not an Arrow IPC stream, or missing or non-integer columns
+    :return: sales data entries and the calendar features of their dates
+    :rtype: ArrowBatch
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as error:
+        raise ValueError(f"body is not an Arrow IPC stream: {error}") from None
+
+    missing = [field for field in SALES_DATA_FIELDS if field not in table.column_names]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    columns: Dict[str, object] = {}
+    for field in INTEGER_FIELDS:
+        column = table.column(field)
+        if not pa.types.is_integer(column.type):
+            raise ValueError(f"column {field} must hold integers")
+        columns[field] = (
+            column.combine_chunks()
+            .cast(pa.int64())
+            .fill_null(-1)
+            .to_numpy(zero_copy_only=False)
+        )
+
+    codes, dates = date_codes(table.column("Date").combine_chunks())
+    columns["Date"] = take_values(dates, codes)
+    calendar_features = take_calendar_features(CALENDAR.features(dates), codes)
+
+    holiday_column = table.column("StateHoliday").combine_chunks()
+    try:
+        holiday_column = holiday_column.cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        raise ValueError(
+            f"column StateHoliday must hold strings, not {holiday_column.type}"
+        ) from None
+    holiday_codes, holidays = dictionary_codes(holiday_column)
+    columns["StateHoliday"] = take_values(holidays, holiday_codes)
+
+    return ArrowBatch(
+        pd.DataFrame(columns, columns=SALES_DATA_FIELDS), calendar_features
+    )
+
+
+def row_messages(size: int, records: List[Dict]):
+    """Collect per row error or warning records into a dictionary encoded string column.
+
+    :param size: number of rows
+    :type size: int
+    :param records: error or warning records with row, field and detail
+    :type records: List[Dict]
+    :return: "field: detail" messages of every row, joined by "; ", null for rows without records
+    :rtype: pyarrow.DictionaryArray
+    """
+    import pyarrow as pa
+
+    messages: Dict[int, List[str]] = {}
+    for record in records:
+        messages.setdefault(record["row"], []).append(
+            f"{record['field']}: {record['detail']}"
+        )
+    texts: Dict[str, int] = {}
+    indices = np.full(size, -1, dtype=np.int32)
+    for row, row_records in messages.items():
+        indices[row] = texts.setdefault("; ".join(row_records), len(texts))
+
+    return pa.DictionaryArray.from_arrays(
+        pa.array(indices, mask=indices < 0), pa.array(list(texts), type=pa.string())
+    )
+
+
+def write_arrow_predictions(
+    sales: np.ndarray, errors: List[Dict], warnings: List[Dict]
+) -> bytes:
+    """Encode the predictions of a batch as an Arrow IPC stream.
+
+    :param sales: predicted sales, NaN for invalid rows
+    :type sales: np.ndarray
+    :param errors: per row error records
+    :type errors: List[Dict]
+    :param warnings: per row warning records
+    :type warnings: List[Dict]
+    :return: Arrow IPC stream with a nullable float64 sales column and string error and warning columns
+    :rtype: bytes
+    """
+    import pyarrow as pa
+
+    table = pa.table(
+        {
+            "sales": pa.array(sales, mask=np.isnan(sales)),
+            "error": row_messages(len(sales), errors),
+            "warning": row_messages(len(sales), warnings),
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
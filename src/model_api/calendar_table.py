@@ -0,0 +1,173 @@
+import datetime
+from typing import NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .constants import CALENDAR_FIRST_YEAR, CALENDAR_LAST_YEAR
+
+DateFeatures = Tuple[float, float, float, float]
+
+
+class CalendarFeatures(NamedTuple):
+    """Calendar features of many dates, NaN where a date cannot be parsed"""
+
+    year: np.ndarray
+    month: np.ndarray
+    week: np.ndarray
+    day_of_week: np.ndarray
+    parsed: np.ndarray
+
+
+class CalendarTable:
+    """Lookup table of the calendar features of every day in the supported date range.
+
+    Maps a date ordinal to its Year, Month, ISO Week and DayOfWeek (1 = Monday), the same values pd.Period gives. Date strings in YYYY-MM-DD form take a fast path through the table, any other spelling falls back to pd.Period.
+    """
+
+    def __init__(
+        self, first_year: int = CALENDAR_FIRST_YEAR, last_year: int = CALENDAR_LAST_YEAR
+    ):
+        """Precompute the table from January 1st of first_year to December 31st of last_year.
+
+        :param first_year: first year of the table
+        :type first_year: int
+        :param last_year: last year of the table
+        :type last_year: int
+        """
+        self.first_ordinal = datetime.date(first_year, 1, 1).toordinal()
+        self.last_ordinal = datetime.date(last_year, 12, 31).toordinal()
+
+        days = pd.date_range(
+            datetime.date(first_year, 1, 1), datetime.date(last_year, 12, 31), freq="D"
+        )
+        self.year = days.year.to_numpy(dtype=np.int16)
+        self.month = days.month.to_numpy(dtype=np.int8)
+        self.week = days.isocalendar().week.to_numpy(dtype=np.int8)
+        self.day_of_week = (days.dayofweek + 1).to_numpy(dtype=np.int8)
+
+    @staticmethod
+    def fast_ordinal(date: str) -> int:
+        """Parse a YYYY-MM-DD date string into its ordinal without pandas.
+
+        :param date: date entry
+        :type date: str
+        :raises ValueError: date is not a valid YYYY-MM-DD string
+        :return: date ordinal
+        :rtype: int
+        """
+        if len(date) != 10 or date[4] != "-" or date[7] != "-":
+            raise ValueError(date)
+
+        return datetime.date(int(date[:4]), int(date[5:7]), int(date[8:])).toordinal()
+
+    def ordinal_features(self, ordinal: int) -> DateFeatures:
+        """Return the calendar features of a date ordinal.
+
+        :param ordinal: date ordinal
+        :type ordinal: int
+        :return: Year, Month, Week and DayOfWeek
+        :rtype: DateFeatures
+        """
+        if self.first_ordinal <= ordinal <= self.last_ordinal:
+            idx = ordinal - self.first_ordinal
+            return (
+                int(self.year[idx]),
+                int(self.month[idx]),
+                int(self.week[idx]),
+                int(self.day_of_week[idx]),
+            )
+
+        day = datetime.date.fromordinal(ordinal)
+        return (day.year, day.month, day.isocalendar()[1], day.isoweekday())
+
+    def date_features(self, date: str) -> DateFeatures:
+        """Return the calendar features of a date string.
+
+        :param date: date entry
+        :type date: str
+        :raises ValueError: date cannot be converted into date format, including empty, "NaT" and "nan" entries that pd.Period turns into NaT
+        :return: Year, Month, Week and DayOfWeek
+        :rtype: DateFeatures
+        """
+        try:
+            return self.ordinal_features(self.fast_ordinal(date))
+        except ValueError:
+            period = pd.Period(date)
+        if period is pd.NaT:
+            raise ValueError(f"incorrect date {date!r}")
+
+        return (period.year, period.month, period.week, period.dayofweek + 1)
+
+    def features(self, dates: Union[pd.Series, Sequence[str]]) -> CalendarFeatures:
+        """Return the calendar features of many date strings, parsing each distinct date once.
+
+        :param dates: date entries
+        :type dates: Union[pd.Series, Sequence[str]]
+        :return: calendar features, NaN and parsed False where a date cannot be parsed
+        :rtype: CalendarFeatures
+        """
+        date_codes, unique_dates = pd.factorize(pd.Series(dates, dtype=object))
+        table = np.full((len(unique_dates), 4), np.nan)
+        parsed = np.ones(len(unique_dates), dtype=bool)
+        for idx, date in enumerate(unique_dates):
+            try:
+                table[idx] = self.date_features(str(date))
+            except ValueError:
+                parsed[idx] = False
+                continue
+            if not np.isfinite(table[idx]).all():
+                table[idx] = np.nan
+                parsed[idx] = False
+
+        rows = table[date_codes]
+        return CalendarFeatures(
+            year=rows[:, 0],
+            month=rows[:, 1],
+            week=rows[:, 2],
+            day_of_week=rows[:, 3],
+            parsed=parsed[date_codes],
+        )
+
+    def ordinals_features(self, ordinals: np.ndarray) -> CalendarFeatures:
+        """Return the calendar features of an array of date ordinals within the table range.
+
+        :param ordinals: date ordinals
+        :type ordinals: np.ndarray
+        :raises IndexError: ordinal outside the table range
+        :return: calendar features
+        :rtype: CalendarFeatures
+        """
+        idx = np.asarray(ordinals, dtype=np.int64) - self.first_ordinal
+        if len(idx) and (
+            idx.min() < 0 or idx.max() > self.last_ordinal - self.first_ordinal
+        ):
+            raise IndexError("date ordinal outside of the calendar table")
+
+        return CalendarFeatures(
+            year=self.year[idx].astype(np.float64),
+            month=self.month[idx].astype(np.float64),
+            week=self.week[idx].astype(np.float64),
+            day_of_week=self.day_of_week[idx].astype(np.float64),
+            parsed=np.ones(len(idx), dtype=bool),
+        )
+
+
+def day_of_week_mismatch(
+    calendar_features: CalendarFeatures, day_of_week: np.ndarray
+) -> np.ndarray:
+    """Flag entries whose DayOfWeek contradicts their parsed Date.
+
+    :param calendar_features: calendar features of the entries
+    :type calendar_features: CalendarFeatures
+    :param day_of_week: DayOfWeek entries, 1 = Monday
+    :type day_of_week: np.ndarray
+    :return: True where the date parsed and falls on another day of the week
+    :rtype: np.ndarray
+    """
+    return calendar_features.parsed & (
+        calendar_features.day_of_week != np.asarray(day_of_week)
+    )
+
+
+CALENDAR = CalendarTable()
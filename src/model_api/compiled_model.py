@@ -0,0 +1,212 @@
+import threading
+import weakref
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .constants import NUMERICAL_FEATURES, ORDINAL_FEATURES
+from .model_bundle import ModelBundle, bundle_arrays, bundle_from_arrays
+from .model_functions import scale_inputs_batch
+from .model_utils import MODEL_REGISTRY, ModelRegistry
+
+PARITY_SAMPLE_SIZE = 1000
+PARITY_TOLERANCE = 1e-6
+
+
+class PredictorParityError(RuntimeError):
+    """Raised when the compiled predictor disagrees with the sklearn scaler and model chain"""
+
+
+class CompiledPredictor(NamedTuple):
+    """Ridge model with the MinMax and Standard scalers folded into its coefficients.
+
+    Takes unscaled features in feature_names order, a prediction is a single dot product.
+    """
+
+    version: int
+    feature_names: np.ndarray
+    coef: np.ndarray
+    intercept: float
+
+    def predict(self, features: np.ndarray) -> Union[float, np.ndarray]:
+        """Predict the sales of one row or a matrix of rows of unscaled features.
+
+        :param features: feature vector, or matrix with one row per prediction
+        :type features: np.ndarray
+        :raises ValueError: features contain NaN, like the sklearn model
+        :return: predicted sales, float for a single vector, array for a matrix
+        :rtype: Union[float, np.ndarray]
+        """
+        sales = features @ self.coef + self.intercept
+        if np.isnan(sales).any():
+            raise ValueError("Input contains NaN.")
+
+        return sales
+
+    def predict_frame(self, reshaped_inputs: pd.DataFrame) -> np.ndarray:
+        """Predict the sales of reshaped model inputs in any column order.
+
+        :param reshaped_inputs: reshaped model inputs, one row per prediction
+        :type reshaped_inputs: pd.DataFrame
+        :return: predicted sales, one per row
+        :rtype: np.ndarray
+        """
+        features = reshaped_inputs[self.feature_names].to_numpy(dtype=np.float64)
+        return self.predict(features)
+
+
+def compile_predictor(bundle: ModelBundle, version: int = 0) -> CompiledPredictor:
+    """Fold the fitted MinMax and Standard scalers of a model bundle into the Ridge coefficients.
+
+    MinMax scaling is x * scale + min and Standard scaling is (x - mean) / scale, so both are absorbed into per feature coefficients and a single intercept.
+
+    :param bundle: model bundle
+    :type bundle: ModelBundle
+    :param version: artifact version the predictor is compiled from
+    :type version: int
+    :return: compiled predictor
+    :rtype: CompiledPredictor
+    """
+    feature_names = bundle.feature_names
+    position = {feature: idx for idx, feature in enumerate(feature_names)}
+    coef = bundle.coef.copy()
+    intercept = bundle.intercept
+
+    for idx, feature in enumerate(bundle.minmax_features):
+        pos = position[feature]
+        intercept += coef[pos] * bundle.minmax_min[idx]
+        coef[pos] = coef[pos] * bundle.minmax_scale[idx]
+
+    for idx, feature in enumerate(bundle.standard_features):
+        pos = position[feature]
+        coef[pos] = coef[pos] / bundle.standard_scale[idx]
+        intercept -= coef[pos] * bundle.standard_mean[idx]
+
+    return CompiledPredictor(version, feature_names, coef, intercept)
+
+
+def parity_sample(bundle: ModelBundle, size: int = PARITY_SAMPLE_SIZE) -> pd.DataFrame:
+    """Generate deterministic unscaled model inputs spanning the fitted scaler ranges.
+
+    :param bundle: model bundle
+    :type bundle: ModelBundle
+    :param size: number of rows
+    :type size: int
+    :return: reshaped model inputs
+    :rtype: pd.DataFrame
+    """
+    rng = np.random.default_rng(0)
+    sample = pd.DataFrame(
+        rng.integers(0, 2, size=(size, len(bundle.feature_names))).astype(np.float64),
+        columns=bundle.feature_names,
+    )
+
+    sample[list(bundle.minmax_features)] = rng.uniform(
+        bundle.minmax_data_min,
+        bundle.minmax_data_max,
+        size=(size, len(bundle.minmax_features)),
+    ).round()
+
+    sample[list(bundle.standard_features)] = np.abs(
+        rng.normal(
+            bundle.standard_mean,
+            3 * bundle.standard_scale,
+            size=(size, len(bundle.standard_features)),
+        )
+    ).round()
+
+    return sample
+
+
+def sklearn_prediction(
+    reshaped_inputs: pd.DataFrame, artifacts: Dict[str, Any]
+) -> np.ndarray:
+    """Predict the sales with the original scaler and model chain, as reference for the compiled predictor.
+
+    :param reshaped_inputs: reshaped model inputs, one row per prediction
+    :type reshaped_inputs: pd.DataFrame
+    :param artifacts: loaded minmax, standard and model artifacts
+    :type artifacts: Dict[str, Any]
+    :return: predicted sales, one per row
+    :rtype: np.ndarray
+    """
+    model = artifacts["model"]
+    scaled_data = scale_inputs_batch(
+        df_to_scale=reshaped_inputs[model.feature_names_in_],
+        feature_list=ORDINAL_FEATURES,
+        scaler_type="minmax",
+        scaler=artifacts["minmax"],
+    )
+    scaled_data = scale_inputs_batch(
+        df_to_scale=scaled_data,
+        feature_list=NUMERICAL_FEATURES,
+        scaler_type="standard",
+        scaler=artifacts["standard"],
+    )
+
+    return model.predict(scaled_data)
+
+
+def check_parity(
+    predictor: CompiledPredictor,
+    artifacts: Dict[str, Any],
+    reshaped_inputs: Optional[pd.DataFrame] = None,
+    tolerance: float = PARITY_TOLERANCE,
+) -> float:
+    """Compare the compiled predictor against the sklearn scaler and model chain.
+
+    :param predictor: compiled predictor to check
+    :type predictor: CompiledPredictor
+    :param artifacts: loaded minmax, standard and model artifacts the predictor was compiled from
+    :type artifacts: Dict[str, Any]
+    :param reshaped_inputs: model inputs to compare on, defaults to the parity sample
+    :type reshaped_inputs: Optional[pd.DataFrame]
+    :param tolerance: largest allowed absolute difference in predicted sales
+    :type tolerance: float
+    :raises PredictorParityError: predictions differ by more than the tolerance
+    :return: largest absolute difference in predicted sales
+    :rtype: float
+    """
+    if reshaped_inputs is None:
+        reshaped_inputs = parity_sample(bundle_from_arrays(bundle_arrays(artifacts)))
+
+    expected = sklearn_prediction(reshaped_inputs, artifacts)
+    results = predictor.predict_frame(reshaped_inputs)
+    max_diff = float(np.max(np.abs(results - expected), initial=0.0))
+    if not max_diff <= tolerance:
+        raise PredictorParityError(
+            f"compiled predictor differs from the sklearn model by {max_diff}"
+        )
+
+    return max_diff
+
+
+_compile_lock = threading.Lock()
+_compiled: "weakref.WeakKeyDictionary[ModelRegistry, CompiledPredictor]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def compiled_predictor(registry: ModelRegistry = MODEL_REGISTRY) -> CompiledPredictor:
+    """Return the compiled predictor of the current registry snapshot.
+
+    The predictor is compiled once per artifact version from the model bundle, which was parity checked against the sklearn model when it was converted.
+
+    :param registry: model registry holding the model bundle
+    :type registry: ModelRegistry
+    :return: compiled predictor
+    :rtype: CompiledPredictor
+    """
+    snapshot = registry.snapshot()
+    predictor = _compiled.get(registry)
+    if predictor is None or predictor.version != snapshot.version:
+        with _compile_lock:
+            predictor = _compiled.get(registry)
+            if predictor is None or predictor.version != snapshot.version:
+                predictor = compile_predictor(
+                    snapshot.artifacts["bundle"], snapshot.version
+                )
+                _compiled[registry] = predictor
+
+    return predictor
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 STATE_HOLIDAYS = {
@@ -33,3 +34,63 @@ PROMO_TWO_WEEKYEAR = ["Promo2SinceWeek", "Promo2SinceYear"]
 COMPET_OPEN_MONTHYEAR = ["CompetitionOpenSinceMonth", "CompetitionOpenSinceYear"]
 
 BASE_DIR = Path(__file__).resolve(strict=True).parents[2]
+
+MODEL_DIR = BASE_DIR / "models"
+MODEL_FILES = {
+    "minmax": "transform_minmax.pkl",
+    "standard": "transform_std.pkl",
+    "model": "tuned_model.pkl",
+}
+MODEL_BUNDLE_FILE = "model_bundle.bin"
+SERVING_MODEL_FILES = {"bundle": MODEL_BUNDLE_FILE}
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 5.0))
+
+STORE_FILE = BASE_DIR / "data" / "raw" / "store.csv"
+TRAIN_FILE = BASE_DIR / "data" / "raw" / "train.csv"
+STORE_RELOAD_INTERVAL = float(os.environ.get("STORE_RELOAD_INTERVAL", 5.0))
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300.0))
+
+MICRO_BATCH_MAX_SIZE = int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64))
+MICRO_BATCH_MAX_WAIT = float(os.environ.get("MICRO_BATCH_MAX_WAIT", 0.002))
+
+EXECUTION_MODE = os.environ.get("EXECUTION_MODE", "thread")
+EXECUTION_WORKERS = int(
+    os.environ.get("EXECUTION_WORKERS", min(4, os.cpu_count() or 1))
+)
+
+WEB_CONCURRENCY = (
+    int(os.environ["WEB_CONCURRENCY"]) if os.environ.get("WEB_CONCURRENCY") else None
+)
+WORKERS_PER_CPU = float(os.environ.get("WORKERS_PER_CPU", 1.0))
+
+SALES_DATA_FIELDS = [
+    "Store",
+    "DayOfWeek",
+    "Date",
+    "Customers",
+    "Open",
+    "Promo",
+    "StateHoliday",
+    "SchoolHoliday",
+]
+BINARY_FIELDS = ["Open", "Promo", "SchoolHoliday"]
+
+HORIZON_MAX_DAYS = int(os.environ.get("HORIZON_MAX_DAYS", 366))
+SNAPSHOT_CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", 256))
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 1000))
+STREAM_MAX_LINE_BYTES = int(os.environ.get("STREAM_MAX_LINE_BYTES", 65536))
+
+CALENDAR_FIRST_YEAR = 2010
+CALENDAR_LAST_YEAR = 2035
+
+DURATION_TABLE_DIR = BASE_DIR / "data" / "processed"
+PROCESSED_DATA_FILE = BASE_DIR / "data" / "processed_data.csv"
+FEATURES_DIR = BASE_DIR / "data" / "features"
+
+PROFILING_ENABLED = bool(int(os.environ.get("PROFILING_ENABLED", 0)))
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_DIR = Path(os.environ.get("PROFILING_DIR", BASE_DIR / "profiles"))
+PROFILING_MAX_CAPTURES = int(os.environ.get("PROFILING_MAX_CAPTURES", 50))
+PROFILING_HEADER = "x-profile"
@@ -0,0 +1,377 @@
+"""Precompute the Promo2SinceDuration and CompetitionOpenSinceDuration of every store into a memory-mapped table.
+
+Usage: PYTHONPATH=src python -m model_api.duration_table [--store-file data/raw/store.csv]
+"""
+
+import argparse
+import os
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from .constants import (
+    CALENDAR_FIRST_YEAR,
+    CALENDAR_LAST_YEAR,
+    DURATION_TABLE_DIR,
+    STORE_FILE,
+)
+from .metrics import ARTIFACT_LOAD_SECONDS
+from .model_functions import compute_duration_batch
+from .store_index import StoreArrays, StoreIndex
+
+WEEKS_PER_YEAR = 53
+MONTHS_PER_YEAR = 12
+
+Durations = Tuple[float, float]
+
+
+class DurationTable(NamedTuple):
+    """Durations of every store for every week and month of the supported years.
+
+    values has one row per Store id, like the store arrays. Its first years * 53 columns hold Promo2SinceDuration by (Year, Week), the remaining years * 12 columns CompetitionOpenSinceDuration by (Year, Month).
+    """
+
+    digest: str
+    first_year: int
+    last_year: int
+    values: np.ndarray
+
+    @property
+    def years(self) -> int:
+        """Number of years covered by the table"""
+        return self.last_year - self.first_year + 1
+
+    def store_durations(
+        self, store: int, year: int, month: int, week: int
+    ) -> Optional[Durations]:
+        """Return the durations of one store at one date.
+
+        :param store: Store id, must be known
+        :type store: int
+        :param year: Year of the date
+        :type year: int
+        :param month: Month of the date
+        :type month: int
+        :param week: ISO Week of the date
+        :type week: int
+        :return: Promo2SinceDuration and CompetitionOpenSinceDuration, None if the date is outside the table
+        :rtype: Optional[Durations]
+        """
+        if not (
+            self.first_year <= year <= self.last_year
+            and 1 <= week <= WEEKS_PER_YEAR
+            and 1 <= month <= MONTHS_PER_YEAR
+        ):
+            return None
+
+        row = self.values[store]
+        year_idx = int(year) - self.first_year
+        week_col = year_idx * WEEKS_PER_YEAR + int(week) - 1
+        month_col = (
+            self.years * WEEKS_PER_YEAR + year_idx * MONTHS_PER_YEAR + int(month) - 1
+        )
+
+        return float(row[week_col]), float(row[month_col])
+
+    def lookup(
+        self,
+        stores: np.ndarray,
+        year: np.ndarray,
+        month: np.ndarray,
+        week: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the durations of many rows.
+
+        :param stores: Store ids, must be known
+        :type stores: np.ndarray
+        :param year: Year of every row
+        :type year: np.ndarray
+        :param month: Month of every row
+        :type month: np.ndarray
+        :param week: ISO Week of every row
+        :type week: np.ndarray
+        :return: Promo2SinceDuration, CompetitionOpenSinceDuration and a mask of the rows inside the table, durations of the other rows are NaN
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        year = np.asarray(year, dtype=np.float64)
+        month = np.asarray(month, dtype=np.float64)
+        week = np.asarray(week, dtype=np.float64)
+        in_table = (
+            (year >= self.first_year)
+            & (year <= self.last_year)
+            & (week >= 1)
+            & (week <= WEEKS_PER_YEAR)
+            & (month >= 1)
+            & (month <= MONTHS_PER_YEAR)
+        )
+
+        year_idx = np.where(in_table, year - self.first_year, 0).astype(np.int64)
+        week_col = year_idx * WEEKS_PER_YEAR + np.where(in_table, week, 1) - 1
+        month_col = (
+            self.years * WEEKS_PER_YEAR
+            + year_idx * MONTHS_PER_YEAR
+            + np.where(in_table, month, 1)
+            - 1
+        )
+        stores = np.asarray(stores, dtype=np.int64)
+
+        promo2 = self.values[stores, week_col.astype(np.int64)].astype(np.float64)
+        competition = self.values[stores, month_col.astype(np.int64)].astype(np.float64)
+        promo2[~in_table] = np.nan
+        competition[~in_table] = np.nan
+
+        return promo2, competition, in_table
+
+
+def build_duration_table(
+    store_arrays: StoreArrays,
+    first_year: int = CALENDAR_FIRST_YEAR,
+    last_year: int = CALENDAR_LAST_YEAR,
+) -> DurationTable:
+    """Compute the durations of every store for every week and month from first_year to last_year.
+
+    :param store_arrays: store arrays holding the Promo2 and competition start dates
+    :type store_arrays: StoreArrays
+    :param first_year: first year of the table
+    :type first_year: int
+    :param last_year: last year of the table
+    :type last_year: int
+    :return: duration table
+    :rtype: DurationTable
+    """
+    years = np.arange(first_year, last_year + 1)
+    stores = len(store_arrays.known)
+
+    week_year = np.column_stack(
+        [
+            np.tile(np.arange(1, WEEKS_PER_YEAR + 1), len(years)),
+            np.repeat(years, WEEKS_PER_YEAR),
+        ]
+    )
+    promo2 = compute_duration_batch(
+        current_date=np.tile(week_year, (stores, 1)),
+        start_date=np.repeat(store_arrays.promo2_since, len(week_year), axis=0),
+        freq="W",
+    )
+
+    month_year = np.column_stack(
+        [
+            np.tile(np.arange(1, MONTHS_PER_YEAR + 1), len(years)),
+            np.repeat(years, MONTHS_PER_YEAR),
+        ]
+    )
+    competition = compute_duration_batch(
+        current_date=np.tile(month_year, (stores, 1)),
+        start_date=np.repeat(
+            store_arrays.competition_open_since, len(month_year), axis=0
+        ),
+        freq="M",
+    )
+
+    values = np.hstack(
+        [promo2.reshape(stores, -1), competition.reshape(stores, -1)]
+    ).astype(np.float32)
+
+    return DurationTable(store_arrays.digest, first_year, last_year, values)
+
+
+def table_file(
+    table_dir: Union[str, Path], digest: str, first_year: int, last_year: int
+) -> Path:
+    """Filepath of the table built from the store.csv contents with the given digest.
+
+    :param table_dir: directory of the table files
+    :type table_dir: Union[str, Path]
+    :param digest: sha256 of the store.csv contents
+    :type digest: str
+    :param first_year: first year of the table
+    :type first_year: int
+    :param last_year: last year of the table
+    :type last_year: int
+    :return: table filepath
+    :rtype: Path
+    """
+    return Path(table_dir) / f"durations_{digest[:16]}_{first_year}_{last_year}.npy"
+
+
+def write_duration_table(table: DurationTable, table_dir: Union[str, Path]) -> Path:
+    """Atomically write the table to its file in table_dir.
+
+    :param table: duration table built from a store.csv file
+    :type table: DurationTable
+    :param table_dir: directory of the table files
+    :type table_dir: Union[str, Path]
+    :raises ValueError: table not built from a store.csv file
+    :return: table filepath
+    :rtype: Path
+    """
+    if not table.digest:
+        raise ValueError("only tables built from a store.csv file can be written")
+
+    path = table_file(table_dir, table.digest, table.first_year, table.last_year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, "wb") as f:
+        np.save(f, table.values)
+    os.replace(tmp_file, path)
+
+    return path
+
+
+def load_duration_table(
+    table_dir: Union[str, Path],
+    store_arrays: StoreArrays,
+    first_year: int = CALENDAR_FIRST_YEAR,
+    last_year: int = CALENDAR_LAST_YEAR,
+) -> DurationTable:
+    """Memory map the table written for the store arrays, so that all processes share its pages.
+
+    :param table_dir: directory of the table files
+    :type table_dir: Union[str, Path]
+    :param store_arrays: store arrays the table must belong to
+    :type store_arrays: StoreArrays
+    :param first_year: first year of the table
+    :type first_year: int
+    :param last_year: last year of the table
+    :type last_year: int
+    :raises OSError: table file missing or unreadable
+    :raises ValueError: table file does not match the store arrays
+    :return: memory-mapped duration table
+    :rtype: DurationTable
+    """
+    path = table_file(table_dir, store_arrays.digest, first_year, last_year)
+    values = np.load(path, mmap_mode="r")
+    columns = (last_year - first_year + 1) * (WEEKS_PER_YEAR + MONTHS_PER_YEAR)
+    if values.shape != (len(store_arrays.known), columns):
+        raise ValueError(f"{path} does not match the store arrays")
+
+    return DurationTable(store_arrays.digest, first_year, last_year, values)
+
+
+class DurationIndex:
+    """Duration table of the current store arrays, memory mapped from disk.
+
+    The table file is named after the store.csv digest. It is built and written on first use if no file exists for the current store.csv, so a store.csv change leads to a new table. Store arrays not built from a file, or a read-only table directory, get a table kept in memory instead.
+    """
+
+    def __init__(
+        self,
+        table_dir: Union[str, Path] = DURATION_TABLE_DIR,
+        first_year: int = CALENDAR_FIRST_YEAR,
+        last_year: int = CALENDAR_LAST_YEAR,
+    ):
+        """Initialize the index without loading any table yet.
+
+        :param table_dir: directory of the table files
+        :type table_dir: Union[str, Path]
+        :param first_year: first year of the tables
+        :type first_year: int
+        :param last_year: last year of the tables
+        :type last_year: int
+        """
+        self.table_dir = Path(table_dir)
+        self.first_year = first_year
+        self.last_year = last_year
+        self._current: Optional[Tuple[StoreArrays, DurationTable]] = None
+        self._lock = threading.Lock()
+
+    def _load_or_build(self, store_arrays: StoreArrays) -> DurationTable:
+        """Load the table file of the store arrays, building and writing it if missing.
+
+        :param store_arrays: store arrays the table belongs to
+        :type store_arrays: StoreArrays
+        :return: duration table
+        :rtype: DurationTable
+        """
+        if store_arrays.digest:
+            try:
+                return load_duration_table(
+                    self.table_dir, store_arrays, self.first_year, self.last_year
+                )
+            except (OSError, ValueError):
+                pass
+
+        table = build_duration_table(store_arrays, self.first_year, self.last_year)
+        if store_arrays.digest:
+            try:
+                write_duration_table(table, self.table_dir)
+                return load_duration_table(
+                    self.table_dir, store_arrays, self.first_year, self.last_year
+                )
+            except (OSError, ValueError):
+                pass
+
+        return table
+
+    def table(self, store_arrays: StoreArrays) -> DurationTable:
+        """Return the duration table of the store arrays.
+
+        :param store_arrays: current store arrays
+        :type store_arrays: StoreArrays
+        :return: duration table
+        :rtype: DurationTable
+        """
+        current = self._current
+        if current is not None and current[0] is store_arrays:
+            return current[1]
+
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] is store_arrays:
+                return current[1]
+
+            if (
+                store_arrays.digest
+                and current is not None
+                and current[1].digest == store_arrays.digest
+            ):
+                table = current[1]
+            else:
+                with ARTIFACT_LOAD_SECONDS.time("duration_table"):
+                    table = self._load_or_build(store_arrays)
+            self._current = (store_arrays, table)
+
+            return table
+
+    def store_durations(
+        self, store_arrays: StoreArrays, store: int, year: int, month: int, week: int
+    ) -> Optional[Durations]:
+        """Return the durations of one store at one date.
+
+        :param store_arrays: store arrays the store was looked up in
+        :type store_arrays: StoreArrays
+        :param store: Store id, must be known
+        :type store: int
+        :param year: Year of the date
+        :type year: int
+        :param month: Month of the date
+        :type month: int
+        :param week: ISO Week of the date
+        :type week: int
+        :return: Promo2SinceDuration and CompetitionOpenSinceDuration, None if the date is outside the table
+        :rtype: Optional[Durations]
+        """
+        return self.table(store_arrays).store_durations(store, year, month, week)
+
+
+DURATION_INDEX = DurationIndex()
+
+
+def main(argv=None):
+    """Parse the command line arguments and write the duration table of store.csv"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store-file", type=Path, default=STORE_FILE)
+    parser.add_argument("--table-dir", type=Path, default=DURATION_TABLE_DIR)
+    parser.add_argument("--first-year", type=int, default=CALENDAR_FIRST_YEAR)
+    parser.add_argument("--last-year", type=int, default=CALENDAR_LAST_YEAR)
+    args = parser.parse_args(argv)
+
+    store_arrays = StoreIndex(store_file=args.store_file).load()
+    table = build_duration_table(store_arrays, args.first_year, args.last_year)
+    print(write_duration_table(table, args.table_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from typing import Any, Dict, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .calendar_table import CALENDAR, CalendarFeatures
+from .constants import HORIZON_MAX_DAYS, SALES_DATA_FIELDS
+
+HORIZON_FIELDS = ["Customers", "Open", "Promo", "StateHoliday", "SchoolHoliday"]
+
+
+class HorizonFrame(NamedTuple):
+    """Generated sales data rows of one store, one row per day of the horizon"""
+
+    dates: np.ndarray
+    df_request: pd.DataFrame
+    calendar_features: CalendarFeatures
+
+
+def date_ordinal(date: str, field: str) -> int:
+    """Parse a YYYY-MM-DD date of the horizon request into its ordinal.
+
+    :param date: date entry
+    :type date: str
+    :param field: request field of the date, used in the error message
+    :type field: str
+    :raises ValueError: date is not a valid YYYY-MM-DD string
+    :return: date ordinal
+    :rtype: int
+    """
+    try:
+        return CALENDAR.fast_ordinal(date)
+    except ValueError:
+        raise ValueError(f"incorrect {field} entry, expected YYYY-MM-DD") from None
+
+
+def horizon_ordinals(
+    start_date: str, end_date: str, max_days: int = HORIZON_MAX_DAYS
+) -> np.ndarray:
+    """List the date ordinals from start_date to end_date, both included.
+
+    :param start_date: first date, YYYY-MM-DD
+    :type start_date: str
+    :param end_date: last date, YYYY-MM-DD
+    :type end_date: str
+    :param max_days: longest allowed horizon in days
+    :type max_days: int
+    :raises ValueError: dates that cannot be parsed, lie outside the calendar table, are in the wrong order or span more than max_days
+    :return: date ordinals, one per day
+    :rtype: np.ndarray
+    """
+    first = date_ordinal(start_date, "StartDate")
+    last = date_ordinal(end_date, "EndDate")
+    if last < first:
+        raise ValueError("EndDate must not be before StartDate")
+    if last - first + 1 > max_days:
+        raise ValueError(f"horizon must not be longer than {max_days} days")
+    if first < CALENDAR.first_ordinal or last > CALENDAR.last_ordinal:
+        raise ValueError("horizon must lie within the supported calendar years")
+
+    return np.arange(first, last + 1, dtype=np.int64)
+
+
+def horizon_frame(
+    store: int,
+    ordinals: np.ndarray,
+    defaults: Dict[str, Any],
+    overrides: Dict[int, Dict[str, Any]],
+) -> HorizonFrame:
+    """Generate the sales data rows of one store over a horizon, with the calendar features looked up as arrays.
+
+    Every day takes the default values, except for the fields overridden for that day. The DayOfWeek of each row is derived from its date.
+
+    :param store: Store id
+    :type store: int
+    :param ordinals: date ordinals of the horizon, consecutive and ascending
+    :type ordinals: np.ndarray
+    :param defaults: Customers, Open, Promo, StateHoliday and SchoolHoliday of every day
+    :type defaults: Dict[str, Any]
+    :param overrides: per day values by date ordinal, only the given fields replace the defaults
+    :type overrides: Dict[int, Dict[str, Any]]
+    :raises ValueError: override of a day outside the horizon
+    :return: dates, sales data rows and calendar features
+    :rtype: HorizonFrame
+    """
+    calendar_features = CALENDAR.ordinals_features(ordinals)
+    dates = np.datetime_as_string(
+        np.datetime64("0001-01-01") + (ordinals - 1).astype("timedelta64[D]")
+    )
+
+    columns = {
+        field: np.full(len(ordinals), defaults[field], dtype=object)
+        for field in HORIZON_FIELDS
+    }
+    for ordinal, values in overrides.items():
+        row = ordinal - int(ordinals[0]) if len(ordinals) else -1
+        if not 0 <= row < len(ordinals):
+            raise ValueError("per day values must lie within the horizon")
+        for field, value in values.items():
+            columns[field][row] = value
+
+    df_request = pd.DataFrame(
+        {
+            "Store": np.full(len(ordinals), store, dtype=np.int64),
+            "DayOfWeek": calendar_features.day_of_week.astype(np.int64),
+            "Date": dates.astype(object),
+            **columns,
+        },
+        columns=SALES_DATA_FIELDS,
+    )
+    for field in HORIZON_FIELDS:
+        if field != "StateHoliday":
+            df_request[field] = df_request[field].astype(np.int64)
+
+    return HorizonFrame(dates, df_request, calendar_features)
@@ -0,0 +1,480 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+def escape_label_value(value: str) -> str:
+    """Escape a label value for the text exposition format.
+
+    :param value: label value
+    :type value: str
+    :return: escaped label value
+    :rtype: str
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(
+    labelnames: Sequence[str], labels: LabelValues, extra: str = ""
+) -> str:
+    """Format label names and values as a {name="value",...} block.
+
+    :param labelnames: label names
+    :type labelnames: Sequence[str]
+    :param labels: label values, in labelnames order
+    :type labels: LabelValues
+    :param extra: preformatted label appended at the end, e.g. le="0.1"
+    :type extra: str
+    :return: label block, empty if there are no labels
+    :rtype: str
+    """
+    pairs = [
+        f'{name}="{escape_label_value(str(value))}"'
+        for name, value in zip(labelnames, labels)
+    ]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    """Format a sample value, integers without a decimal point.
+
+    :param value: sample value
+    :type value: float
+    :return: formatted value
+    :rtype: str
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+
+    return repr(float(value))
+
+
+class Metric:
+    """Named metric with a fixed set of label names, one series per combination of label values"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize a metric without any series.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: HELP text
+        :type documentation: str
+        :param labelnames: label names
+        :type labelnames: Sequence[str]
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """Return the current samples of every series.
+
+        :return: sample name suffix, formatted labels and value
+        :rtype: Iterable[Tuple[str, str, float]]
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the text exposition format.
+
+        :return: HELP, TYPE and sample lines
+        :rtype: str
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(
+            f"{self.name}{suffix}{labels} {format_value(value)}"
+            for suffix, labels, value in self.samples()
+        )
+
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """Monotonically increasing count per label values"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """Increase the count of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :param amount: increment, must not be negative
+        :type amount: float
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Return the count of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :return: current count
+        :rtype: float
+        """
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [
+            ("", format_labels(self.labelnames, labels), value)
+            for labels, value in values
+        ]
+
+
+class Gauge(Metric):
+    """Value per label values that goes up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        """Set the value of the label values.
+
+        :param value: new value
+        :type value: float
+        :param labels: label values, in labelnames order
+        :type labels: str
+        """
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """Increase the value of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :param amount: increment, negative to decrease
+        :type amount: float
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        """Decrease the value of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :param amount: decrement
+        :type amount: float
+        """
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        """Return the value of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :return: current value
+        :rtype: float
+        """
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [
+            ("", format_labels(self.labelnames, labels), value)
+            for labels, value in values
+        ]
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter whose series are read from a callback when the metrics are rendered.
+
+    Exposes state other components already track, e.g. queue depths, cache counters or versions, without touching their hot path.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = (),
+        metric_type: str = "gauge",
+    ):
+        """Initialize the metric.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: HELP text
+        :type documentation: str
+        :param callback: returns the label values and value of every series
+        :type callback: Callable[[], Iterable[Tuple[LabelValues, float]]]
+        :param labelnames: label names
+        :type labelnames: Sequence[str]
+        :param metric_type: exposed metric type, gauge or counter
+        :type metric_type: str
+        """
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        return [
+            ("", format_labels(self.labelnames, labels), value)
+            for labels, value in sorted(self.callback())
+        ]
+
+
+class Histogram(Metric):
+    """Distribution of observed values per label values, counted into fixed buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """Initialize a histogram without any series.
+
+        :param name: metric name
+        :type name: str
+        :param documentation: HELP text
+        :type documentation: str
+        :param labelnames: label names
+        :type labelnames: Sequence[str]
+        :param buckets: increasing upper bounds of the buckets, +Inf is added
+        :type buckets: Sequence[float]
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str):
+        """Count one observed value.
+
+        :param value: observed value, e.g. seconds
+        :type value: float
+        :param labels: label values, in labelnames order
+        :type labels: str
+        """
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = 0.0
+            counts[idx] += 1
+            self._sums[labels] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the seconds spent in the with block, also when it raises.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        """Return the number of observations of the label values.
+
+        :param labels: label values, in labelnames order
+        :type labels: str
+        :return: number of observations
+        :rtype: int
+        """
+        return sum(self._counts.get(labels, ()))
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        with self._lock:
+            series = [
+                (labels, list(counts), self._sums[labels])
+                for labels, counts in sorted(self._counts.items())
+            ]
+
+        samples = []
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                samples.append(
+                    ("_bucket", format_labels(self.labelnames, labels, le), cumulative)
+                )
+            samples.append(("_sum", format_labels(self.labelnames, labels), total))
+            samples.append(
+                ("_count", format_labels(self.labelnames, labels), cumulative)
+            )
+
+        return samples
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric to the registry.
+
+        :param metric: metric to add
+        :type metric: Metric
+        :raises ValueError: another metric with the same name is registered
+        :return: the registered metric
+        :rtype: Metric
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        """Return the registered metric of the name.
+
+        :param name: metric name
+        :type name: str
+        :return: metric, None if not registered
+        :rtype: Optional[Metric]
+        """
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every registered metric in the text exposition format.
+
+        :return: exposition text
+        :rtype: str
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        return "".join(metric.render() for metric in metrics)
+
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = METRICS.register(
+    Histogram(
+        "sales_api_stage_duration_seconds",
+        "Seconds spent in a request stage, including the wait for a pool worker",
+        ["stage"],
+    )
+)
+ARTIFACT_LOAD_SECONDS = METRICS.register(
+    Histogram(
+        "sales_api_artifact_load_duration_seconds",
+        "Seconds spent loading the model artifacts, store.csv or the duration table",
+        ["artifact"],
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    )
+)
+VALIDATION_REJECTIONS = METRICS.register(
+    Counter(
+        "sales_api_validation_rejections_total",
+        "Entries rejected by a validator",
+        ["endpoint", "validator"],
+    )
+)
+REQUESTS = METRICS.register(
+    Counter(
+        "sales_api_requests_total",
+        "HTTP requests by endpoint, method and status code",
+        ["endpoint", "method", "status"],
+    )
+)
+REQUEST_SECONDS = METRICS.register(
+    Histogram(
+        "sales_api_request_duration_seconds",
+        "Seconds from receiving an HTTP request to sending its response",
+        ["endpoint"],
+    )
+)
+REQUESTS_IN_FLIGHT = METRICS.register(
+    Gauge("sales_api_requests_in_flight", "HTTP requests currently being handled")
+)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware counting and timing every HTTP request.
+
+    Requests answered with 404 are labelled as unmatched, so unknown paths cannot grow the number of series.
+    """
+
+    def __init__(self, app: Callable):
+        """Wrap an ASGI application.
+
+        :param app: ASGI application
+        :type app: Callable
+        """
+        self.app = app
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Dict):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            endpoint = scope["path"] if status != 404 else "unmatched"
+            REQUEST_SECONDS.observe(elapsed, endpoint)
+            REQUESTS.inc(endpoint, scope["method"], str(status))
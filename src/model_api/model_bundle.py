@@ -0,0 +1,353 @@
+"""Convert the pickled scalers and Ridge model into a pickle-free model bundle of NumPy arrays.
+
+Usage: PYTHONPATH=src python -m model_api.model_bundle [--model-dir models] [--output models/model_bundle.bin]
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from .constants import (
+    ASSORT_TYPE,
+    MODEL_BUNDLE_FILE,
+    MODEL_DIR,
+    MODEL_FILES,
+    PROMO_INTERVAL_LIST,
+    STATE_HOLIDAYS,
+    STORE_TYPE,
+)
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_MAGIC = b"SALESMB\x00"
+BUNDLE_ALIGNMENT = 16
+
+VOCABULARIES: Dict[str, Union[Dict[str, str], List[str]]] = {
+    "state_holidays": STATE_HOLIDAYS,
+    "store_type": STORE_TYPE,
+    "assort_type": ASSORT_TYPE,
+    "promo_interval": PROMO_INTERVAL_LIST,
+}
+
+
+class AffineScaler(NamedTuple):
+    """Fitted feature scaling reduced to x * scale + offset, a drop-in for the transform of the sklearn scalers"""
+
+    scale: np.ndarray
+    offset: np.ndarray
+
+    def transform(self, features: Any) -> np.ndarray:
+        """Scale one row per entry of unscaled features.
+
+        :param features: unscaled features in the order of the fitted scaler
+        :type features: Any
+        :return: scaled features
+        :rtype: np.ndarray
+        """
+        return np.asarray(features, dtype=np.float64) * self.scale + self.offset
+
+
+class ModelBundle(NamedTuple):
+    """Ridge model, scaler parameters, ordered feature names and one-hot vocabularies loaded from a bundle file.
+
+    MinMax scaling is x * minmax_scale + minmax_min and Standard scaling is (x - standard_mean) / standard_scale, the data ranges are kept for generating parity samples.
+    """
+
+    format_version: int
+    feature_names: np.ndarray
+    coef: np.ndarray
+    intercept: float
+    minmax_features: np.ndarray
+    minmax_scale: np.ndarray
+    minmax_min: np.ndarray
+    minmax_data_min: np.ndarray
+    minmax_data_max: np.ndarray
+    standard_features: np.ndarray
+    standard_mean: np.ndarray
+    standard_scale: np.ndarray
+    vocabularies: Dict[str, Union[Dict[str, str], List[str]]]
+
+    def scaler(self, scaler_type: str) -> AffineScaler:
+        """Return the fitted scaling of the ordinal or numerical features.
+
+        :param scaler_type: scaling type, either standardscaling or minmax
+        :type scaler_type: str
+        :return: scaler with a transform method
+        :rtype: AffineScaler
+        """
+        if scaler_type == "minmax":
+            return AffineScaler(self.minmax_scale, self.minmax_min)
+
+        return AffineScaler(
+            1 / self.standard_scale, -self.standard_mean / self.standard_scale
+        )
+
+
+def bundle_arrays(artifacts: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Extract the arrays of a bundle from the fitted sklearn scalers and Ridge model.
+
+    :param artifacts: loaded minmax, standard and model artifacts
+    :type artifacts: Dict[str, Any]
+    :raises ValueError: clipped MinMax scaling, which is not affine
+    :return: bundle arrays by name
+    :rtype: Dict[str, np.ndarray]
+    """
+    minmax = artifacts["minmax"]
+    standard = artifacts["standard"]
+    model = artifacts["model"]
+    if minmax.clip:
+        raise ValueError("clipped MinMax scaling cannot be stored in a model bundle")
+
+    numerical_count = standard.n_features_in_
+    return fitted_bundle_arrays(
+        feature_names=model.feature_names_in_,
+        coef=np.asarray(model.coef_, dtype=np.float64).ravel(),
+        intercept=float(np.asarray(model.intercept_, dtype=np.float64).ravel()[0]),
+        minmax_features=minmax.feature_names_in_,
+        minmax_scale=minmax.scale_,
+        minmax_min=minmax.min_,
+        minmax_data_min=minmax.data_min_,
+        minmax_data_max=minmax.data_max_,
+        standard_features=standard.feature_names_in_,
+        standard_mean=(
+            standard.mean_ if standard.mean_ is not None else np.zeros(numerical_count)
+        ),
+        standard_scale=(
+            standard.scale_ if standard.scale_ is not None else np.ones(numerical_count)
+        ),
+    )
+
+
+def fitted_bundle_arrays(
+    feature_names: Sequence[str],
+    coef: np.ndarray,
+    intercept: float,
+    minmax_features: Sequence[str],
+    minmax_scale: np.ndarray,
+    minmax_min: np.ndarray,
+    minmax_data_min: np.ndarray,
+    minmax_data_max: np.ndarray,
+    standard_features: Sequence[str],
+    standard_mean: np.ndarray,
+    standard_scale: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Assemble the arrays of a bundle from fitted scaler parameters and Ridge coefficients.
+
+    The parameters follow the sklearn attributes, MinMax scaling is x * minmax_scale + minmax_min and Standard scaling is (x - standard_mean) / standard_scale.
+
+    :param feature_names: model features in coefficient order
+    :type feature_names: Sequence[str]
+    :param coef: Ridge coefficients of the scaled features
+    :type coef: np.ndarray
+    :param intercept: Ridge intercept
+    :type intercept: float
+    :param minmax_features: features scaled by MinMax scaling
+    :type minmax_features: Sequence[str]
+    :param minmax_scale: MinMax scale of every feature
+    :type minmax_scale: np.ndarray
+    :param minmax_min: MinMax offset of every feature
+    :type minmax_min: np.ndarray
+    :param minmax_data_min: smallest training value of every feature
+    :type minmax_data_min: np.ndarray
+    :param minmax_data_max: largest training value of every feature
+    :type minmax_data_max: np.ndarray
+    :param standard_features: features scaled by Standard scaling
+    :type standard_features: Sequence[str]
+    :param standard_mean: training mean of every feature
+    :type standard_mean: np.ndarray
+    :param standard_scale: training standard deviation of every feature
+    :type standard_scale: np.ndarray
+    :return: bundle arrays by name
+    :rtype: Dict[str, np.ndarray]
+    """
+    arrays = {
+        "format_version": np.array(BUNDLE_FORMAT_VERSION),
+        "feature_names": np.asarray(feature_names, dtype=str),
+        "coef": np.asarray(coef, dtype=np.float64).ravel(),
+        "intercept": np.array([intercept], dtype=np.float64),
+        "minmax_features": np.asarray(minmax_features, dtype=str),
+        "minmax_scale": np.asarray(minmax_scale, dtype=np.float64),
+        "minmax_min": np.asarray(minmax_min, dtype=np.float64),
+        "minmax_data_min": np.asarray(minmax_data_min, dtype=np.float64),
+        "minmax_data_max": np.asarray(minmax_data_max, dtype=np.float64),
+        "standard_features": np.asarray(standard_features, dtype=str),
+        "standard_mean": np.asarray(standard_mean, dtype=np.float64),
+        "standard_scale": np.asarray(standard_scale, dtype=np.float64),
+    }
+    for name, vocabulary in VOCABULARIES.items():
+        if isinstance(vocabulary, dict):
+            vocabulary = list(vocabulary.items())
+        arrays[f"vocabulary_{name}"] = np.asarray(vocabulary, dtype=str)
+
+    return arrays
+
+
+def bundle_from_arrays(arrays: Dict[str, np.ndarray]) -> ModelBundle:
+    """Assemble a bundle from its arrays and check that the service encodes features the way the model was trained.
+
+    :param arrays: bundle arrays by name
+    :type arrays: Dict[str, np.ndarray]
+    :raises ValueError: unsupported format version, inconsistent shapes or vocabularies that differ from the service
+    :return: model bundle
+    :rtype: ModelBundle
+    """
+    format_version = int(arrays["format_version"])
+    if format_version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"unsupported model bundle format version {format_version}")
+
+    vocabularies: Dict[str, Union[Dict[str, str], List[str]]] = {}
+    for name, expected in VOCABULARIES.items():
+        values = arrays[f"vocabulary_{name}"].tolist()
+        vocabularies[name] = dict(values) if isinstance(expected, dict) else values
+        if vocabularies[name] != expected:
+            raise ValueError(f"model bundle vocabulary {name} differs from the service")
+
+    bundle = ModelBundle(
+        format_version=format_version,
+        feature_names=arrays["feature_names"],
+        coef=arrays["coef"],
+        intercept=float(arrays["intercept"][0]),
+        minmax_features=arrays["minmax_features"],
+        minmax_scale=arrays["minmax_scale"],
+        minmax_min=arrays["minmax_min"],
+        minmax_data_min=arrays["minmax_data_min"],
+        minmax_data_max=arrays["minmax_data_max"],
+        standard_features=arrays["standard_features"],
+        standard_mean=arrays["standard_mean"],
+        standard_scale=arrays["standard_scale"],
+        vocabularies=vocabularies,
+    )
+    if len(bundle.coef) != len(bundle.feature_names):
+        raise ValueError("model bundle coefficients do not match its feature names")
+
+    return bundle
+
+
+def _aligned(offset: int) -> int:
+    """Round an offset up to the bundle alignment.
+
+    :param offset: byte offset
+    :type offset: int
+    :return: aligned byte offset
+    :rtype: int
+    """
+    return -(-offset // BUNDLE_ALIGNMENT) * BUNDLE_ALIGNMENT
+
+
+def write_bundle(arrays: Dict[str, np.ndarray], path: Path) -> Path:
+    """Write the bundle arrays to a raw bundle file, atomically replacing an existing bundle.
+
+    The file holds the magic bytes, the length of a JSON index, the index with dtype, shape and offset of every array, and the aligned raw array data, offsets count from the start of the data.
+
+    :param arrays: bundle arrays by name
+    :type arrays: Dict[str, np.ndarray]
+    :param path: bundle file
+    :type path: Path
+    :return: bundle file
+    :rtype: Path
+    """
+    index = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        index[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps(
+        {"format_version": BUNDLE_FORMAT_VERSION, "arrays": index}
+    ).encode()
+    prefix = BUNDLE_MAGIC + struct.pack("<I", len(header)) + header
+    data_start = _aligned(len(prefix))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(prefix.ljust(data_start, b"\0"))
+        for name, array in arrays.items():
+            file.seek(data_start + index[name]["offset"])
+            file.write(np.asarray(array).tobytes())
+        file.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def load_bundle(path: Union[str, Path]) -> ModelBundle:
+    """Map a model bundle file into memory, its arrays are read-only views of the mapping and nothing is unpickled.
+
+    :param path: bundle file
+    :type path: Union[str, Path]
+    :raises ValueError: not a bundle file, or an unsupported or inconsistent bundle
+    :return: model bundle
+    :rtype: ModelBundle
+    """
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[: len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+        raise ValueError(f"{path} is not a model bundle")
+
+    header_start = len(BUNDLE_MAGIC) + 4
+    (header_length,) = struct.unpack_from("<I", buffer, len(BUNDLE_MAGIC))
+    header = json.loads(buffer[header_start : header_start + header_length])
+    if header["format_version"] != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"unsupported model bundle format version {header['format_version']}"
+        )
+
+    data_start = _aligned(header_start + header_length)
+    arrays = {}
+    for name, meta in header["arrays"].items():
+        dtype = np.dtype(meta["dtype"])
+        count = math.prod(meta["shape"])
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + meta["offset"]
+        ).reshape(tuple(meta["shape"]))
+
+    return bundle_from_arrays(arrays)
+
+
+def convert_pickles(model_dir: Path, output: Path) -> Path:
+    """Convert the pickled artifacts into a bundle, after checking that the bundle predicts like the sklearn chain.
+
+    :param model_dir: directory containing the pickled artifacts
+    :type model_dir: Path
+    :param output: bundle file
+    :type output: Path
+    :raises PredictorParityError: bundle predictions differ from the sklearn model
+    :return: bundle file
+    :rtype: Path
+    """
+    from .compiled_model import check_parity, compile_predictor
+    from .model_utils import load_model
+
+    artifacts = {
+        name: load_model(Path(model_dir) / fname) for name, fname in MODEL_FILES.items()
+    }
+    arrays = bundle_arrays(artifacts)
+    check_parity(compile_predictor(bundle_from_arrays(arrays)), artifacts)
+
+    return write_bundle(arrays, output)
+
+
+def main(argv=None):
+    """Parse the command line arguments and convert the pickled artifacts into a model bundle"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", type=Path, default=MODEL_DIR)
+    parser.add_argument("--output", type=Path, default=MODEL_DIR / MODEL_BUNDLE_FILE)
+    args = parser.parse_args(argv)
+
+    print(convert_pickles(args.model_dir, args.output))
+
+
+if __name__ == "__main__":
+    main()
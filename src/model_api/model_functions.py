@@ -1,9 +1,8 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Union, List
+from typing import Any, Dict, Union, List, Optional
 
-from .model_utils import load_model
-from .constants import BASE_DIR
+from .model_utils import MODEL_REGISTRY
 
 
 def classify_match(
@@ -30,14 +29,16 @@ def classify_match(
 
 
 def compute_duration(
-    current_date: pd.Series, start_date: pd.Series, freq: str
+    current_date: Union[pd.Series, np.ndarray],
+    start_date: Union[pd.Series, np.ndarray],
+    freq: str,
 ) -> Union[float, int]:
     """Calculate the number of months/weeks between the current date based on sales data and the start date of the event (e.g Opening of competition, Promo2 opening)
 
     :param current_date: current date based on sales data. either Month Year or Week Year
-    :type current_date: pd.Series
+    :type current_date: Union[pd.Series, np.ndarray]
     :param start_date: Actual start date of specific event
-    :type start_date: pd.Series
+    :type start_date: Union[pd.Series, np.ndarray]
     :param freq: period frequency. Either in months or weeks
     :type freq: str
     :return: reshaped model input dataframe
@@ -50,8 +51,8 @@ def compute_duration(
     else:
         divisor = 1
 
-    current_date = current_date.values
-    start_date = start_date.values
+    current_date = np.asarray(current_date)
+    start_date = np.asarray(start_date)
 
     if np.all(start_date == 0):
         duration = 0
@@ -64,7 +65,10 @@ def compute_duration(
 
 
 def scale_inputs(
-    df_to_scale: pd.Series, feature_list: List, scaler_type: str
+    df_to_scale: pd.Series,
+    feature_list: List,
+    scaler_type: str,
+    scaler: Optional[Any] = None,
 ) -> pd.Series:
     """Perform feature scaling, either MinMax or StandardScaler, based on the fitted train dataset.
 
@@ -74,16 +78,108 @@ def scale_inputs(
     :type feature_list: List
     :param scaler_type: scaling type, either standardscaling or minmax
     :type scaler_type: str
+    :param scaler: fitted scaler to use instead of the one from the model registry
+    :type scaler: Optional[Any]
     :return: scaled model input dataframe.
     :rtype: pd.Series
     """
     scaled_df = df_to_scale.copy()
-    if scaler_type == "minmax":
-        scaler = load_model(BASE_DIR / "models" / "transform_minmax.pkl")
-    else:
-        scaler = load_model(BASE_DIR / "models" / "transform_std.pkl")
+    if scaler is None:
+        scaler = MODEL_REGISTRY.get("bundle").scaler(scaler_type)
 
     to_scale = df_to_scale[feature_list].to_frame().T
     scaled_df.loc[feature_list] = scaler.transform(to_scale)[0]
 
     return scaled_df
+
+
+def classify_match_batch(
+    match_dict: Dict, sales_data: pd.Series, df_request: pd.DataFrame
+) -> pd.DataFrame:
+    """One hot encode a column of sales data into the corresponding dictionary feature columns.
+
+    Batch version of classify_match, every row gets 1 in the feature column matching its value and 0 in the rest.
+
+    :param match_dict: Dictionary containing sales data key and corresponding feature values
+    :type match_dict: Dict
+    :param sales_data: actual input sales data based on corresponding dictionary inputs, one value per row
+    :type sales_data: pd.Series
+    :param df_request: model input dataframe
+    :type df_request: pd.DataFrame
+    :raises KeyError: sales data value not in the dictionary
+    :return: reshaped model input dataframe
+    :rtype: pd.DataFrame
+    """
+    values = np.asarray(sales_data)
+    unknown = ~np.isin(values, list(match_dict.keys()))
+    if unknown.any():
+        raise KeyError(values[unknown][0])
+
+    for key, feature in match_dict.items():
+        df_request[feature] = (values == key).astype(int)
+
+    return df_request
+
+
+def compute_duration_batch(
+    current_date: Union[pd.DataFrame, np.ndarray],
+    start_date: Union[pd.DataFrame, np.ndarray],
+    freq: str,
+) -> np.ndarray:
+    """Calculate the number of months/weeks between the current dates and the event start dates of many rows.
+
+    Batch version of compute_duration, both inputs have two columns, either Month Year or Week Year.
+
+    :param current_date: current dates based on sales data
+    :type current_date: Union[pd.DataFrame, np.ndarray]
+    :param start_date: Actual start dates of specific event
+    :type start_date: Union[pd.DataFrame, np.ndarray]
+    :param freq: period frequency. Either in months or weeks
+    :type freq: str
+    :return: durations, one per row
+    :rtype: np.ndarray
+    """
+    if freq == "M":
+        divisor = 12
+    elif freq == "W":
+        divisor = 52
+    else:
+        divisor = 1
+
+    current_date = np.asarray(current_date, dtype=np.float64)
+    start_date = np.asarray(start_date, dtype=np.float64)
+
+    duration = (current_date[:, 0] - start_date[:, 0]) / divisor + (
+        current_date[:, 1] - start_date[:, 1]
+    )
+    duration[np.all(start_date == 0, axis=1)] = 0
+
+    return np.maximum(duration, 0) * divisor
+
+
+def scale_inputs_batch(
+    df_to_scale: pd.DataFrame,
+    feature_list: List,
+    scaler_type: str,
+    scaler: Optional[Any] = None,
+) -> pd.DataFrame:
+    """Perform feature scaling of many rows, either MinMax or StandardScaler, based on the fitted train dataset.
+
+    :param df_to_scale: feature values to be scaled based on model input
+    :type df_to_scale: pd.DataFrame
+    :param feature_list: list of features to be scaled
+    :type feature_list: List
+    :param scaler_type: scaling type, either standardscaling or minmax
+    :type scaler_type: str
+    :param scaler: fitted scaler to use instead of the one from the model registry
+    :type scaler: Optional[Any]
+    :return: scaled model input dataframe.
+    :rtype: pd.DataFrame
+    """
+    scaled_df = df_to_scale.copy()
+    if scaler is None:
+        scaler = MODEL_REGISTRY.get("bundle").scaler(scaler_type)
+
+    scaled_df[feature_list] = scaler.transform(df_to_scale[feature_list])
+
+    return scaled_df
@@ -1,74 +1,70 @@
+from typing import Optional
+
 import pandas as pd
 import numpy as np
 from .constants import (
-    BASE_DIR,
     ASSORT_TYPE,
     PROMO_INTERVAL_LIST,
     STORE_TYPE,
-    PROMO_TWO_WEEKYEAR,
-    COMPET_OPEN_MONTHYEAR,
-    ORDINAL_FEATURES,
-    NUMERICAL_FEATURES,
 )
 
-from .model_functions import classify_match, compute_duration, scale_inputs
+from .model_functions import compute_duration, compute_duration_batch
 
-from .model_utils import load_model
+from .calendar_table import CALENDAR, CalendarFeatures
+from .compiled_model import compiled_predictor
+from .duration_table import DURATION_INDEX
+from .store_index import STORE_INDEX
 
 
 def reshape_inputs_pipeline(df_request: pd.Series) -> pd.Series:
     """Reshapes and transforms the sales data input into necessary model features.
 
+    The Promo2 and competition durations are read from the duration table, dates outside the table are computed with compute_duration.
+
     :param df_request: sales data input
     :type df_request: pd.Series
     :return: reshaped model inputs
     :rtype: pd.Series
     """
-    df_store_info = pd.read_csv(BASE_DIR / "data" / "raw" / "store.csv")
-    df_store_info = df_store_info.drop_duplicates()
+    store_arrays = STORE_INDEX.arrays()
+    store = int(df_request["Store"])
+    store_vals = STORE_INDEX.lookup(store, store_arrays)
 
-    store_mask = df_store_info["Store"] == df_request["Store"]
-    store_vals = df_store_info[store_mask].squeeze()
+    df_request["CompetitionDistance"] = store_vals.competition_distance
 
-    df_request["CompetitionDistance"] = store_vals["CompetitionDistance"]
+    df_request["Promo2"] = store_vals.promo2
 
-    df_request["Promo2"] = store_vals["Promo2"]
+    df_request[PROMO_INTERVAL_LIST] = store_vals.promo_interval
 
-    df_request[PROMO_INTERVAL_LIST] = 0
-
-    if store_vals["PromoInterval"] != store_vals["PromoInterval"]:
-        df_request["No_Promo"] = 1
-    else:
-        df_request[store_vals["PromoInterval"]] = 1
-
-    df_request["Date"] = pd.Period(df_request["Date"])
-    df_request["Year"] = df_request["Date"].year
-    df_request["Month"] = df_request["Date"].month
-    df_request["Week"] = df_request["Date"].week
+    year, month, week, _ = CALENDAR.date_features(df_request["Date"])
+    df_request["Year"] = year
+    df_request["Month"] = month
+    df_request["Week"] = week
     df_request = df_request.drop("Date")
 
-    week_str = ["Week", "Year"]
-    df_request["Promo2SinceDuration"] = compute_duration(
-        current_date=df_request[week_str],
-        start_date=store_vals[PROMO_TWO_WEEKYEAR].fillna(0.0),
-        freq="W",
-    )
-
-    month_str = ["Month", "Year"]
-    df_request["CompetitionOpenSinceDuration"] = compute_duration(
-        current_date=df_request[month_str],
-        start_date=store_vals[COMPET_OPEN_MONTHYEAR].fillna(0.0),
-        freq="M",
-    )
-
-    df_request = classify_match(
-        match_dict=ASSORT_TYPE,
-        sales_data=store_vals["Assortment"],
-        df_request=df_request,
-    )
-    df_request = classify_match(
-        match_dict=STORE_TYPE, sales_data=store_vals["StoreType"], df_request=df_request
-    )
+    durations = DURATION_INDEX.store_durations(store_arrays, store, year, month, week)
+    if durations is not None:
+        (
+            df_request["Promo2SinceDuration"],
+            df_request["CompetitionOpenSinceDuration"],
+        ) = durations
+    else:
+        week_str = ["Week", "Year"]
+        df_request["Promo2SinceDuration"] = compute_duration(
+            current_date=df_request[week_str],
+            start_date=store_vals.promo2_since,
+            freq="W",
+        )
+
+        month_str = ["Month", "Year"]
+        df_request["CompetitionOpenSinceDuration"] = compute_duration(
+            current_date=df_request[month_str],
+            start_date=store_vals.competition_open_since,
+            freq="M",
+        )
+
+    df_request[list(ASSORT_TYPE.values())] = store_vals.assortment
+    df_request[list(STORE_TYPE.values())] = store_vals.store_type
 
     return df_request
 
@@ -81,14 +77,88 @@ def model_prediction_pipeline(reshaped_inputs: pd.Series) -> float:
     :return: predicted sales
     :rtype: float
     """
-    scaled_data = scale_inputs(
-        df_to_scale=reshaped_inputs, feature_list=ORDINAL_FEATURES, scaler_type="minmax"
-    )
-    scaled_data = scale_inputs(
-        df_to_scale=scaled_data, feature_list=NUMERICAL_FEATURES, scaler_type="standard"
+    predictor = compiled_predictor()
+    features = reshaped_inputs[predictor.feature_names].to_numpy(dtype=np.float64)
+    sales = predictor.predict(features[np.newaxis, :])
+
+    return np.round(sales, 2)
+
+
+def reshape_inputs_batch_pipeline(
+    df_request: pd.DataFrame, calendar_features: Optional[CalendarFeatures] = None
+) -> pd.DataFrame:
+    """Reshapes and transforms many sales data inputs into necessary model features.
+
+    Batch version of reshape_inputs_pipeline, store attributes are gathered from the store index with one array lookup, every distinct date string is looked up in the calendar table only once and the durations are gathered from the duration table.
+
+    :param df_request: sales data inputs, one row per request
+    :type df_request: pd.DataFrame
+    :param calendar_features: calendar features of the rows, looked up from the Date column if not given
+    :type calendar_features: Optional[CalendarFeatures]
+    :raises KeyError: unknown Store id
+    :raises ValueError: Date entry that cannot be parsed
+    :return: reshaped model inputs
+    :rtype: pd.DataFrame
+    """
+    store_arrays = STORE_INDEX.arrays()
+    stores = df_request["Store"].to_numpy(dtype=np.int64)
+    unknown = (stores < 0) | (stores >= len(store_arrays.known))
+    unknown[~unknown] = ~store_arrays.known[stores[~unknown]]
+    if unknown.any():
+        raise KeyError(int(stores[unknown][0]))
+
+    df_request["CompetitionDistance"] = store_arrays.competition_distance[stores]
+
+    df_request["Promo2"] = store_arrays.promo2[stores]
+
+    df_request[PROMO_INTERVAL_LIST] = store_arrays.promo_interval[stores]
+
+    if calendar_features is None:
+        calendar_features = CALENDAR.features(df_request["Date"])
+    if not calendar_features.parsed.all():
+        raise ValueError("incorrect Date entry")
+    df_request["Year"] = calendar_features.year
+    df_request["Month"] = calendar_features.month
+    df_request["Week"] = calendar_features.week
+    df_request = df_request.drop(columns="Date")
+
+    promo2_duration, competition_duration, in_table = DURATION_INDEX.table(
+        store_arrays
+    ).lookup(
+        stores, calendar_features.year, calendar_features.month, calendar_features.week
     )
+    if not in_table.all():
+        outside = ~in_table
+        week_str = ["Week", "Year"]
+        promo2_duration[outside] = compute_duration_batch(
+            current_date=df_request[week_str].to_numpy()[outside],
+            start_date=store_arrays.promo2_since[stores[outside]],
+            freq="W",
+        )
+
+        month_str = ["Month", "Year"]
+        competition_duration[outside] = compute_duration_batch(
+            current_date=df_request[month_str].to_numpy()[outside],
+            start_date=store_arrays.competition_open_since[stores[outside]],
+            freq="M",
+        )
+    df_request["Promo2SinceDuration"] = promo2_duration
+    df_request["CompetitionOpenSinceDuration"] = competition_duration
+
+    df_request[list(ASSORT_TYPE.values())] = store_arrays.assortment[stores]
+    df_request[list(STORE_TYPE.values())] = store_arrays.store_type[stores]
+
+    return df_request
 
-    tuned_model = load_model(BASE_DIR / "models" / "tuned_model.pkl")
-    sales = tuned_model.predict(scaled_data.to_frame().T)
+
+def model_prediction_batch_pipeline(reshaped_inputs: pd.DataFrame) -> np.ndarray:
+    """Predict the sales of many rows based on the model inputs and trained model with a single matrix product.
+
+    :param reshaped_inputs: reshaped model inputs, one row per request
+    :type reshaped_inputs: pd.DataFrame
+    :return: predicted sales, one per row
+    :rtype: np.ndarray
+    """
+    sales = compiled_predictor().predict_frame(reshaped_inputs)
 
     return np.round(sales, 2)
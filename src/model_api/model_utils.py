@@ -1,4 +1,11 @@
 import pickle
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from .constants import MODEL_DIR, MODEL_RELOAD_INTERVAL, SERVING_MODEL_FILES
+from .metrics import ARTIFACT_LOAD_SECONDS, METRICS, CallbackMetric
+from .model_bundle import load_bundle
 
 
 def load_model(fname):
@@ -7,8 +14,202 @@ def load_model(fname):
     :param fname: filepath of the pkl file
     :return: loaded model object
     """
-    file = open(fname, "rb")
-    data = pickle.load(file)
-    file.close()
+    with open(fname, "rb") as file:
+        data = pickle.load(file)
 
     return data
+
+
+def load_artifact(path: Path) -> Any:
+    """Load a model artifact, .pkl files as pickle and anything else as model bundle.
+
+    :param path: artifact file
+    :type path: Path
+    :return: loaded artifact object
+    :rtype: Any
+    """
+    if Path(path).suffix == ".pkl":
+        return load_model(path)
+
+    return load_bundle(path)
+
+
+class ArtifactSnapshot(NamedTuple):
+    """Consistent set of loaded model artifacts sharing one version"""
+
+    version: int
+    stamp: Tuple
+    artifacts: Dict[str, Any]
+
+
+class BackgroundReloader:
+    """Base class running the refresh method of a file backed resource on a daemon thread."""
+
+    def __init__(self, reload_interval: float):
+        """Initialize the watcher state without starting the thread.
+
+        :param reload_interval: seconds between refresh calls of the watcher
+        :type reload_interval: float
+        """
+        self.reload_interval = reload_interval
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        """Reload the resource if its files changed.
+
+        :return: True if the resource was reloaded
+        :rtype: bool
+        """
+        raise NotImplementedError
+
+    def _watch(self):
+        """Call refresh periodically until the watcher is stopped"""
+        while not self._stop_event.wait(self.reload_interval):
+            self.refresh()
+
+    def start_watcher(self):
+        """Start the background thread that reloads changed files"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name=f"{type(self).__name__}-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background reload thread"""
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+class ModelRegistry(BackgroundReloader):
+    """Keep the model and scaler artifacts loaded in memory and reload them when the files change.
+
+    By default the registry serves the model bundle, the pickle-free conversion of the scaler and model pickles. Artifacts are loaded once and handed out from memory. A background watcher polls the file stamps (mtime and size) and, when any of them changes, loads a complete new set of artifacts before swapping it in with a single reference assignment. Requests that already hold a snapshot keep using it until they finish.
+    """
+
+    def __init__(
+        self,
+        model_files: Dict[str, str] = SERVING_MODEL_FILES,
+        model_dir: Path = MODEL_DIR,
+        reload_interval: float = MODEL_RELOAD_INTERVAL,
+    ):
+        """Initialize the registry without loading anything yet.
+
+        :param model_files: artifact name to file name mapping
+        :type model_files: Dict[str, str]
+        :param model_dir: directory containing the artifact files
+        :type model_dir: Path
+        :param reload_interval: seconds between file stamp checks of the watcher
+        :type reload_interval: float
+        """
+        self.paths = {
+            name: Path(model_dir) / fname for name, fname in model_files.items()
+        }
+        super().__init__(reload_interval)
+        self._snapshot: Optional[ArtifactSnapshot] = None
+        self._load_lock = threading.Lock()
+
+    def _file_stamp(self) -> Tuple:
+        """Collect the modification time and size of every artifact file.
+
+        :return: file stamps in artifact order
+        :rtype: Tuple
+        """
+        stamps = []
+        for path in self.paths.values():
+            stat = path.stat()
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+
+        return tuple(stamps)
+
+    def _swap(self) -> ArtifactSnapshot:
+        """Load every artifact from disk and swap them in. Caller must hold the load lock.
+
+        :return: newly loaded snapshot
+        :rtype: ArtifactSnapshot
+        """
+        stamp = self._file_stamp()
+        with ARTIFACT_LOAD_SECONDS.time("model"):
+            artifacts = {name: load_artifact(path) for name, path in self.paths.items()}
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = ArtifactSnapshot(version, stamp, artifacts)
+
+        return self._snapshot
+
+    def load(self) -> ArtifactSnapshot:
+        """Load every artifact from disk and swap them in as the current snapshot.
+
+        :return: newly loaded snapshot
+        :rtype: ArtifactSnapshot
+        """
+        with self._load_lock:
+            return self._swap()
+
+    def snapshot(self) -> ArtifactSnapshot:
+        """Return the current artifact snapshot, loading it on first use.
+
+        :return: current snapshot
+        :rtype: ArtifactSnapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                snapshot = self._snapshot or self._swap()
+
+        return snapshot
+
+    def get(self, name: str) -> Any:
+        """Return a loaded artifact from the current snapshot.
+
+        :param name: artifact name, one of the model_files keys
+        :type name: str
+        :return: loaded artifact object
+        :rtype: Any
+        """
+        return self.snapshot().artifacts[name]
+
+    @property
+    def version(self) -> int:
+        """Version number of the current snapshot, incremented on every reload"""
+        return self.snapshot().version
+
+    def refresh(self) -> bool:
+        """Reload the artifacts if any of the files changed since the last load.
+
+        A failed reload, e.g. from a partially copied file, keeps the current snapshot and is retried on the next check.
+
+        :return: True if a new snapshot was swapped in
+        :rtype: bool
+        """
+        current = self._snapshot
+        try:
+            if current is not None and self._file_stamp() == current.stamp:
+                return False
+            self.load()
+        except (
+            OSError,
+            pickle.UnpicklingError,
+            EOFError,
+            ValueError,
+            KeyError,
+        ):
+            return False
+
+        return True
+
+
+MODEL_REGISTRY = ModelRegistry()
+METRICS.register(
+    CallbackMetric(
+        "sales_api_model_version",
+        "Version of the loaded model artifacts, incremented on every reload",
+        lambda: (
+            [((), MODEL_REGISTRY._snapshot.version)] if MODEL_REGISTRY._snapshot else []
+        ),
+    )
+)
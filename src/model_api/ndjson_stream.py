@@ -0,0 +1,109 @@
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+from starlette.responses import StreamingResponse
+
+from .constants import STREAM_CHUNK_SIZE, STREAM_MAX_LINE_BYTES
+
+
+class NDJSONRecord(NamedTuple):
+    """Decoded line of a newline-delimited JSON body, with the error instead of the record if it cannot be decoded"""
+
+    line: int
+    record: Optional[Dict[str, Any]]
+    error: Optional[str]
+
+
+def decode_line(line_number: int, line: bytes) -> Optional[NDJSONRecord]:
+    """Decode one line of a newline-delimited JSON body into a record.
+
+    :param line_number: line number in the body, starting at 1
+    :type line_number: int
+    :param line: line without the newline
+    :type line: bytes
+    :return: decoded record or decoding error, None for a blank line
+    :rtype: Optional[NDJSONRecord]
+    """
+    if not line.strip():
+        return None
+
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return NDJSONRecord(line_number, None, "line is not valid JSON")
+    if not isinstance(record, dict):
+        return NDJSONRecord(line_number, None, "line must be a JSON object")
+
+    return NDJSONRecord(line_number, record, None)
+
+
+async def ndjson_chunks(
+    body: AsyncIterator[bytes],
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_line_bytes: int = STREAM_MAX_LINE_BYTES,
+) -> AsyncIterator[List[NDJSONRecord]]:
+    """Split a streamed newline-delimited JSON body into chunks of decoded records, reading it incrementally.
+
+    Only the unfinished last line and one chunk of records are held in memory. Lines longer than max_line_bytes are dropped as they arrive and reported as an error record, blank lines are skipped but counted.
+
+    :param body: body bytes as they are received
+    :type body: AsyncIterator[bytes]
+    :param chunk_size: number of records per chunk
+    :type chunk_size: int
+    :param max_line_bytes: longest accepted line
+    :type max_line_bytes: int
+    :return: chunks of at most chunk_size records, in body order
+    :rtype: AsyncIterator[List[NDJSONRecord]]
+    """
+    buffer = b""
+    line_number = 0
+    too_long = False
+    chunk: List[NDJSONRecord] = []
+
+    async for data in body:
+        lines = (buffer + data).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_number += 1
+            if too_long:
+                too_long = False
+                record = NDJSONRecord(
+                    line_number, None, f"line is longer than {max_line_bytes} bytes"
+                )
+            else:
+                record = decode_line(line_number, line)
+            if record is not None:
+                chunk.append(record)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if len(buffer) > max_line_bytes:
+            too_long = True
+            buffer = b""
+
+    if too_long:
+        chunk.append(
+            NDJSONRecord(
+                line_number + 1, None, f"line is longer than {max_line_bytes} bytes"
+            )
+        )
+    else:
+        record = decode_line(line_number + 1, buffer)
+        if record is not None:
+            chunk.append(record)
+    if chunk:
+        yield chunk
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """Streaming response whose content is produced while the request body is still being read.
+
+    StreamingResponse listens for the client disconnect by reading receive while it streams, which would take the body messages away from request.stream(). Here only the content reads the request, a disconnect ends the body stream instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from .calendar_table import CalendarTable
+from .constants import PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL
+from .metrics import METRICS, CallbackMetric
+
+
+def canonical_date(date: str) -> str:
+    """Normalize a date string so that equivalent spellings share a cache key.
+
+    :param date: date entry of the request
+    :type date: str
+    :return: canonical date, or the entry unchanged if it cannot be parsed
+    :rtype: str
+    """
+    try:
+        CalendarTable.fast_ordinal(date)
+        return date
+    except ValueError:
+        pass
+
+    try:
+        return str(pd.Period(date))
+    except ValueError:
+        return date
+
+
+def sales_data_key(sales_data: Any) -> Tuple:
+    """Build the cache key of a sales data entry.
+
+    :param sales_data: JSON response input
+    :type sales_data: SalesData
+    :return: normalized entry values
+    :rtype: Tuple
+    """
+    return (
+        sales_data.Store,
+        sales_data.DayOfWeek,
+        canonical_date(sales_data.Date),
+        sales_data.Customers,
+        sales_data.Open,
+        sales_data.Promo,
+        sales_data.StateHoliday,
+        sales_data.SchoolHoliday,
+    )
+
+
+class PredictionCache:
+    """Bounded in-memory cache of predictions with LRU and TTL eviction.
+
+    Entries belong to a generation token, e.g. the model and store index versions. Looking up with a different token drops every cached entry, so predictions of a previous model or store data are never served.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PREDICTION_CACHE_SIZE,
+        ttl: float = PREDICTION_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty cache.
+
+        :param max_size: maximum number of cached predictions, 0 disables the cache
+        :type max_size: int
+        :param ttl: seconds a prediction stays valid
+        :type ttl: float
+        :param clock: monotonic time source
+        :type clock: Callable[[], float]
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._token: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_token(self, token: Hashable):
+        """Drop every entry if the generation token changed. Caller must hold the lock.
+
+        :param token: current generation token
+        :type token: Hashable
+        """
+        if token != self._token:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._token = token
+
+    def get(self, key: Hashable, token: Hashable = None) -> Optional[Any]:
+        """Return the cached prediction of the key, if present and not expired.
+
+        :param key: cache key of the request
+        :type key: Hashable
+        :param token: current generation token
+        :type token: Hashable
+        :return: cached prediction, None on a miss
+        :rtype: Optional[Any]
+        """
+        if self.max_size <= 0:
+            return None
+
+        with self._lock:
+            self._check_token(token)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return value
+
+    def put(self, key: Hashable, value: Any, token: Hashable = None):
+        """Cache a prediction, evicting the least recently used entries beyond the size limit.
+
+        :param key: cache key of the request
+        :type key: Hashable
+        :param value: prediction to cache
+        :type value: Any
+        :param token: generation token the prediction was computed with
+        :type token: Hashable
+        """
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._check_token(token)
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached prediction"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Return the cache counters.
+
+        :return: size, limits, hit, miss, eviction, expiration and invalidation counts
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+PREDICTION_CACHE = PredictionCache()
+METRICS.register(
+    CallbackMetric(
+        "sales_api_prediction_cache_lookups_total",
+        "Prediction cache lookups by result",
+        lambda: [
+            (("hit",), PREDICTION_CACHE.hits),
+            (("miss",), PREDICTION_CACHE.misses),
+        ],
+        ["result"],
+        metric_type="counter",
+    )
+)
+METRICS.register(
+    CallbackMetric(
+        "sales_api_prediction_cache_size",
+        "Number of cached predictions",
+        lambda: [((), len(PREDICTION_CACHE._entries))],
+    )
+)
@@ -0,0 +1,381 @@
+import asyncio
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from .constants import (
+    PROFILING_DIR,
+    PROFILING_HEADER,
+    PROFILING_MAX_CAPTURES,
+    PROFILING_SAMPLE_RATE,
+)
+
+if TYPE_CHECKING:
+    import tracemalloc
+
+REQUEST_ID_HEADER = "x-request-id"
+PROFILE_ID_HEADER = "x-profile-id"
+
+ACTIVE_PROFILE: contextvars.ContextVar[Optional["RequestProfile"]] = (
+    contextvars.ContextVar("active_profile", default=None)
+)
+
+
+def tracemalloc_filters() -> List["tracemalloc.Filter"]:
+    """Build the filters that drop the allocations of tracemalloc itself and of the import machinery.
+
+    :return: allocation snapshot filters
+    :rtype: List[tracemalloc.Filter]
+    """
+    import tracemalloc
+
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+
+def profiling_active() -> bool:
+    """Check if the current request is being profiled.
+
+    Profiled requests run their stages on the event loop thread, where the profiler is enabled.
+
+    :return: True inside a profiled request
+    :rtype: bool
+    """
+    return ACTIVE_PROFILE.get() is not None
+
+
+def safe_request_id(request_id: str) -> str:
+    """Reduce a client supplied request ID to characters that are safe in a filename.
+
+    :param request_id: request ID header value
+    :type request_id: str
+    :return: sanitized request ID, a new random ID if nothing is left
+    :rtype: str
+    """
+    request_id = re.sub(r"[^A-Za-z0-9_.-]", "", request_id)[:64].lstrip(".")
+    return request_id or uuid.uuid4().hex
+
+
+class RequestProfile:
+    """CPU profile and allocation snapshot of a single request.
+
+    cProfile, pstats and tracemalloc are imported on first use, a service that never profiles does not load them.
+    """
+
+    def __init__(self, request_id: str, trigger: str):
+        """Initialize the profile without starting it.
+
+        :param request_id: ID of the profiled request
+        :type request_id: str
+        :param trigger: why the request is profiled, header or sample
+        :type trigger: str
+        """
+        import cProfile
+
+        self.request_id = request_id
+        self.trigger = trigger
+        self.profiler = cProfile.Profile()
+        self.snapshot: Optional["tracemalloc.Snapshot"] = None
+        self.peak_traced_bytes = 0
+        self.started = 0.0
+        self.duration = 0.0
+
+    def start(self):
+        """Start allocation tracing and CPU profiling of the current thread"""
+        import tracemalloc
+
+        tracemalloc.start()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        """Stop profiling and take the allocation snapshot"""
+        import tracemalloc
+
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(tracemalloc_filters())
+        self.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+
+class RequestProfiler:
+    """Decide which requests to profile and keep the latest captures in a rotating directory.
+
+    A request is profiled when it carries the profiling header or is picked by the sampling rate. Only one request is profiled at a time, since allocation tracing is process wide, requests arriving meanwhile are served unprofiled. Every capture is written as <capture id>.prof (cProfile stats), .tracemalloc (allocation snapshot) and .json (request details), the oldest captures beyond max_captures are deleted.
+    """
+
+    def __init__(
+        self,
+        profile_dir: Union[str, Path] = PROFILING_DIR,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        max_captures: int = PROFILING_MAX_CAPTURES,
+        header: str = PROFILING_HEADER,
+    ):
+        """Initialize the profiler without creating the directory yet.
+
+        :param profile_dir: directory of the captures
+        :type profile_dir: Union[str, Path]
+        :param sample_rate: fraction of requests profiled without the header
+        :type sample_rate: float
+        :param max_captures: number of captures kept
+        :type max_captures: int
+        :param header: request header that triggers profiling
+        :type header: str
+        """
+        self.profile_dir = Path(profile_dir)
+        self.sample_rate = sample_rate
+        self.max_captures = max_captures
+        self.header = header.lower().encode()
+        self._busy = threading.Lock()
+
+    def trigger(self, headers: Dict[bytes, bytes]) -> Optional[str]:
+        """Decide if a request is profiled.
+
+        :param headers: lowercase request headers
+        :type headers: Dict[bytes, bytes]
+        :return: header or sample if the request is profiled, else None
+        :rtype: Optional[str]
+        """
+        value = headers.get(self.header)
+        if value is not None and value.strip() not in (b"", b"0", b"false"):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+
+        return None
+
+    def begin(self, request_id: str, trigger: str) -> Optional[RequestProfile]:
+        """Start profiling a request, unless another request is being profiled.
+
+        :param request_id: ID of the request
+        :type request_id: str
+        :param trigger: why the request is profiled
+        :type trigger: str
+        :return: started profile, None if the profiler is busy
+        :rtype: Optional[RequestProfile]
+        """
+        if not self._busy.acquire(blocking=False):
+            return None
+
+        profile = RequestProfile(request_id, trigger)
+        try:
+            profile.start()
+        except Exception:
+            self._busy.release()
+            raise
+
+        return profile
+
+    def end(self, profile: RequestProfile):
+        """Stop profiling a request and release the profiler for the next one.
+
+        :param profile: started profile
+        :type profile: RequestProfile
+        """
+        try:
+            profile.stop()
+        finally:
+            self._busy.release()
+
+    def save(self, profile: RequestProfile, details: Dict[str, Any]) -> str:
+        """Write a stopped profile to the directory and delete the oldest captures.
+
+        :param profile: stopped profile
+        :type profile: RequestProfile
+        :param details: request details stored next to the profile
+        :type details: Dict[str, Any]
+        :return: capture ID, the common filename stem of the capture files
+        :rtype: str
+        """
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        capture_id = f"{time.time_ns()}-{profile.request_id}"
+        stem = self.profile_dir / capture_id
+
+        profile.profiler.dump_stats(f"{stem}.prof")
+        profile.snapshot.dump(f"{stem}.tracemalloc")
+        meta = {
+            "capture_id": capture_id,
+            "request_id": profile.request_id,
+            "trigger": profile.trigger,
+            "duration_seconds": profile.duration,
+            "peak_traced_bytes": profile.peak_traced_bytes,
+            **details,
+        }
+        tmp_file = Path(f"{stem}.json.tmp")
+        tmp_file.write_text(json.dumps(meta))
+        os.replace(tmp_file, f"{stem}.json")
+
+        self.rotate()
+        return capture_id
+
+    def captures(self) -> List[Dict[str, Any]]:
+        """Return the details of the kept captures, oldest first.
+
+        :return: capture details
+        :rtype: List[Dict[str, Any]]
+        """
+        if not self.profile_dir.exists():
+            return []
+
+        captures = []
+        for meta_file in sorted(self.profile_dir.glob("*.json")):
+            try:
+                captures.append(json.loads(meta_file.read_text()))
+            except (OSError, ValueError):
+                continue
+
+        return captures
+
+    def rotate(self):
+        """Delete the oldest captures beyond max_captures"""
+        captures = sorted(self.profile_dir.glob("*.json"))
+        for meta_file in captures[: max(len(captures) - self.max_captures, 0)]:
+            stem = meta_file.with_suffix("")
+            for suffix in (".json", ".prof", ".tracemalloc"):
+                Path(f"{stem}{suffix}").unlink(missing_ok=True)
+
+    def summary(self, top: int = 20, sort: str = "cumulative") -> Dict[str, Any]:
+        """Aggregate the top functions and allocation sites over every kept capture.
+
+        :param top: number of functions and allocation sites to report
+        :type top: int
+        :param sort: function ordering, cumulative or tottime
+        :type sort: str
+        :raises ValueError: unknown sort key
+        :return: captures, top functions and top allocation sites
+        :rtype: Dict[str, Any]
+        """
+        import pstats
+        import tracemalloc
+
+        if sort not in ("cumulative", "tottime"):
+            raise ValueError("sort must be cumulative or tottime")
+
+        captures = self.captures()
+        stems = [self.profile_dir / capture["capture_id"] for capture in captures]
+
+        functions = []
+        prof_files = [f"{stem}.prof" for stem in stems if Path(f"{stem}.prof").exists()]
+        if prof_files:
+            stats = pstats.Stats(*prof_files)
+            for (filename, line, name), (
+                _,
+                calls,
+                tottime,
+                cumtime,
+                _,
+            ) in stats.stats.items():
+                functions.append(
+                    {
+                        "function": f"{filename}:{line}({name})",
+                        "calls": calls,
+                        "tottime": tottime,
+                        "cumulative": cumtime,
+                    }
+                )
+            functions.sort(key=lambda function: function[sort], reverse=True)
+
+        sizes: Dict[str, int] = defaultdict(int)
+        counts: Dict[str, int] = defaultdict(int)
+        for stem in stems:
+            try:
+                snapshot = tracemalloc.Snapshot.load(f"{stem}.tracemalloc")
+            except (OSError, EOFError):
+                continue
+            for statistic in snapshot.statistics("lineno"):
+                site = str(statistic.traceback[0])
+                sizes[site] += statistic.size
+                counts[site] += statistic.count
+        allocations = [
+            {"site": site, "size_bytes": size, "blocks": counts[site]}
+            for site, size in sorted(sizes.items(), key=lambda item: -item[1])
+        ]
+
+        return {
+            "captures": captures,
+            "top_functions": functions[:top],
+            "top_allocations": allocations[:top],
+        }
+
+
+REQUEST_PROFILER = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests the request profiler picks.
+
+    Only installed when profiling is enabled, so unprofiled deployments do not pay for it. The request ID is taken from the x-request-id header or generated, profiled responses return it in the x-profile-id header and it is part of the capture filenames.
+    """
+
+    def __init__(self, app: Callable, profiler: RequestProfiler = REQUEST_PROFILER):
+        """Wrap an ASGI application.
+
+        :param app: ASGI application
+        :type app: Callable
+        :param profiler: profiler deciding, capturing and storing the profiles
+        :type profiler: RequestProfiler
+        """
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        trigger = self.profiler.trigger(headers)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_id = safe_request_id(
+            headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")
+        )
+        profile = self.profiler.begin(request_id, trigger)
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_profile_id(message: Dict):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (PROFILE_ID_HEADER.encode(), request_id.encode()),
+                    ],
+                }
+            await send(message)
+
+        token = ACTIVE_PROFILE.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            ACTIVE_PROFILE.reset(token)
+            self.profiler.end(profile)
+            details = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+            }
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.profiler.save, profile, details
+            )
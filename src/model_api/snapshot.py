@@ -0,0 +1,272 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .calendar_table import CALENDAR
+from .compiled_model import CompiledPredictor, compiled_predictor
+from .constants import (
+    ASSORT_TYPE,
+    PROMO_INTERVAL_LIST,
+    SNAPSHOT_CACHE_SIZE,
+    STATE_HOLIDAYS,
+    STORE_TYPE,
+)
+from .duration_table import DURATION_INDEX
+from .metrics import METRICS, CallbackMetric
+from .model_functions import compute_duration_batch
+from .store_index import STORE_INDEX, StoreArrays
+
+
+class Scenario(NamedTuple):
+    """Sales data values shared by every store of a chain-wide snapshot"""
+
+    Customers: int
+    Open: int = 1
+    Promo: int = 0
+    StateHoliday: str = "0"
+    SchoolHoliday: int = 0
+
+
+class ChainSnapshot(NamedTuple):
+    """Predicted sales of every known store for one date and scenario, NaN for stores that cannot be predicted"""
+
+    date: str
+    day_of_week: int
+    model_version: int
+    store_version: int
+    stores: np.ndarray
+    sales: np.ndarray
+
+
+def snapshot_features(
+    store_arrays: StoreArrays,
+    feature_names: np.ndarray,
+    ordinal: int,
+    scenario: Scenario,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Build the unscaled store-by-feature matrix of every known store for one date and scenario.
+
+    The store attributes and durations are gathered from the preloaded store and duration arrays, the date and scenario features are the same for every row.
+
+    :param store_arrays: store attribute arrays
+    :type store_arrays: StoreArrays
+    :param feature_names: model feature names, the column order of the matrix
+    :type feature_names: np.ndarray
+    :param ordinal: date ordinal within the calendar table
+    :type ordinal: int
+    :param scenario: sales data values of every store
+    :type scenario: Scenario
+    :return: known Store ids and the feature matrix with one row per store
+    :rtype: Tuple[np.ndarray, np.ndarray]
+    """
+    stores = np.flatnonzero(store_arrays.known)
+    calendar_features = CALENDAR.ordinals_features(np.full(len(stores), ordinal))
+    year = calendar_features.year
+    month = calendar_features.month
+    week = calendar_features.week
+
+    promo2_duration, competition_duration, in_table = DURATION_INDEX.table(
+        store_arrays
+    ).lookup(stores, year, month, week)
+    if not in_table.all():
+        outside = ~in_table
+        promo2_duration[outside] = compute_duration_batch(
+            current_date=np.column_stack([week, year])[outside],
+            start_date=store_arrays.promo2_since[stores[outside]],
+            freq="W",
+        )
+        competition_duration[outside] = compute_duration_batch(
+            current_date=np.column_stack([month, year])[outside],
+            start_date=store_arrays.competition_open_since[stores[outside]],
+            freq="M",
+        )
+
+    columns = {
+        "Store": stores,
+        "DayOfWeek": calendar_features.day_of_week,
+        "Customers": scenario.Customers,
+        "Open": scenario.Open,
+        "Promo": scenario.Promo,
+        "SchoolHoliday": scenario.SchoolHoliday,
+        "CompetitionDistance": store_arrays.competition_distance[stores],
+        "Promo2": store_arrays.promo2[stores],
+        "Year": year,
+        "Month": month,
+        "Week": week,
+        "Promo2SinceDuration": promo2_duration,
+        "CompetitionOpenSinceDuration": competition_duration,
+    }
+    for code, feature in STATE_HOLIDAYS.items():
+        columns[feature] = float(code == scenario.StateHoliday)
+    for position, feature in enumerate(PROMO_INTERVAL_LIST):
+        columns[feature] = store_arrays.promo_interval[stores, position]
+    for position, feature in enumerate(ASSORT_TYPE.values()):
+        columns[feature] = store_arrays.assortment[stores, position]
+    for position, feature in enumerate(STORE_TYPE.values()):
+        columns[feature] = store_arrays.store_type[stores, position]
+
+    features = np.empty((len(stores), len(feature_names)))
+    for position, feature in enumerate(feature_names):
+        features[:, position] = columns[feature]
+
+    return stores, features
+
+
+def chain_snapshot(
+    date: str,
+    scenario: Scenario,
+    store_arrays: StoreArrays,
+    predictor: CompiledPredictor,
+) -> ChainSnapshot:
+    """Predict the sales of every known store for one date and scenario with a single matrix-vector product.
+
+    Stores without the CompetitionDistance the model needs get NaN sales.
+
+    :param date: YYYY-MM-DD date within the calendar table
+    :type date: str
+    :param scenario: sales data values of every store
+    :type scenario: Scenario
+    :param store_arrays: store attribute arrays
+    :type store_arrays: StoreArrays
+    :param predictor: compiled predictor
+    :type predictor: CompiledPredictor
+    :raises ValueError: date that cannot be parsed or lies outside the calendar table
+    :return: chain-wide snapshot
+    :rtype: ChainSnapshot
+    """
+    try:
+        ordinal = CALENDAR.fast_ordinal(date)
+    except ValueError:
+        raise ValueError("incorrect Date entry, expected YYYY-MM-DD") from None
+    if not CALENDAR.first_ordinal <= ordinal <= CALENDAR.last_ordinal:
+        raise ValueError("Date must lie within the supported calendar years")
+
+    stores, features = snapshot_features(
+        store_arrays, predictor.feature_names, ordinal, scenario
+    )
+    sales = np.full(len(stores), np.nan)
+    predictable = ~np.isnan(features).any(axis=1)
+    sales[predictable] = np.round(predictor.predict(features[predictable]), 2)
+
+    return ChainSnapshot(
+        date=date,
+        day_of_week=int(CALENDAR.ordinal_features(ordinal)[3]),
+        model_version=predictor.version,
+        store_version=store_arrays.version,
+        stores=stores,
+        sales=sales,
+    )
+
+
+class SnapshotCache:
+    """Memoize chain-wide snapshots per date, scenario, model version and store data version.
+
+    Concurrent requests of a snapshot that is not cached yet wait for the first one to compute it, the least recently used snapshots are evicted beyond max_size.
+    """
+
+    def __init__(self, max_size: int = SNAPSHOT_CACHE_SIZE):
+        """Initialize an empty cache.
+
+        :param max_size: maximum number of cached snapshots, 0 disables the cache
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self._snapshots: "OrderedDict[Hashable, ChainSnapshot]" = OrderedDict()
+        self._pending: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cached(self, key: Hashable) -> Optional[ChainSnapshot]:
+        """Return the cached snapshot of the key and count the lookup.
+
+        :param key: snapshot key
+        :type key: Hashable
+        :return: cached snapshot, None on a miss
+        :rtype: Optional[ChainSnapshot]
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                self._snapshots.move_to_end(key)
+                self.hits += 1
+            return snapshot
+
+    def get(self, date: str, scenario: Scenario) -> Tuple[ChainSnapshot, bool]:
+        """Return the snapshot of the current model and store data, computing it on the first request.
+
+        :param date: YYYY-MM-DD date within the calendar table
+        :type date: str
+        :param scenario: sales data values of every store
+        :type scenario: Scenario
+        :raises ValueError: date that cannot be parsed or lies outside the calendar table
+        :return: snapshot and whether it was served from the cache
+        :rtype: Tuple[ChainSnapshot, bool]
+        """
+        store_arrays = STORE_INDEX.arrays()
+        predictor = compiled_predictor()
+        if self.max_size <= 0:
+            return chain_snapshot(date, scenario, store_arrays, predictor), False
+
+        key = (date, scenario, predictor.version, store_arrays.version)
+        snapshot = self._cached(key)
+        if snapshot is not None:
+            return snapshot, True
+
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        with pending:
+            snapshot = self._cached(key)
+            if snapshot is not None:
+                return snapshot, True
+            try:
+                snapshot = chain_snapshot(date, scenario, store_arrays, predictor)
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+            with self._lock:
+                self.misses += 1
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_size:
+                    self._snapshots.popitem(last=False)
+                    self.evictions += 1
+
+        return snapshot, False
+
+    def clear(self):
+        """Drop every cached snapshot"""
+        with self._lock:
+            self._snapshots.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Return the cache counters.
+
+        :return: size, limit, hit, miss and eviction counts
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            return {
+                "size": len(self._snapshots),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+SNAPSHOT_CACHE = SnapshotCache()
+METRICS.register(
+    CallbackMetric(
+        "sales_api_snapshot_cache_lookups_total",
+        "Chain-wide snapshot cache lookups by result",
+        lambda: [
+            (("hit",), SNAPSHOT_CACHE.hits),
+            (("miss",), SNAPSHOT_CACHE.misses),
+        ],
+        ["result"],
+        metric_type="counter",
+    )
+)
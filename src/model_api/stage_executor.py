@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .compiled_model import compiled_predictor
+from .constants import EXECUTION_MODE, EXECUTION_WORKERS
+from .duration_table import DURATION_INDEX
+from .metrics import METRICS, STAGE_SECONDS, CallbackMetric
+from .model_utils import MODEL_REGISTRY
+from .profiling import profiling_active
+from .store_index import STORE_INDEX
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+def init_worker(watch: bool = False):
+    """Load the model artifacts, store index and duration table once per worker process.
+
+    :param watch: also reload the artifacts and store index when their files change
+    :type watch: bool
+    """
+    MODEL_REGISTRY.load()
+    DURATION_INDEX.table(STORE_INDEX.load())
+    compiled_predictor()
+    if watch:
+        MODEL_REGISTRY.start_watcher()
+        STORE_INDEX.start_watcher()
+
+
+class StageExecutor:
+    """Run the blocking pipeline stages of a request off the event loop.
+
+    In inline mode, and for profiled requests, the stages run directly on the event loop. In thread mode they run on a bounded thread pool, in process mode on a bounded process pool, except for stages whose arguments or errors cannot be pickled, which fall back to the thread pool. The number of submitted but unfinished calls of every stage is tracked as its queue depth.
+    """
+
+    def __init__(
+        self, mode: str = EXECUTION_MODE, max_workers: int = EXECUTION_WORKERS
+    ):
+        """Initialize the executor without starting any pool yet.
+
+        :param mode: execution mode, one of inline, thread or process
+        :type mode: str
+        :param max_workers: number of pool workers
+        :type max_workers: int
+        :raises ValueError: unknown execution mode
+        """
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"execution mode must be one of {EXECUTION_MODES}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._peak: Dict[str, int] = defaultdict(int)
+        self._completed: Dict[str, int] = defaultdict(int)
+
+    def _pool(self, allow_process: bool) -> Executor:
+        """Return the pool of the execution mode, starting it on first use.
+
+        :param allow_process: whether the stage can run in another process
+        :type allow_process: bool
+        :return: pool executor
+        :rtype: Executor
+        """
+        with self._lock:
+            if self.mode == "process" and allow_process:
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        initializer=init_worker,
+                        initargs=(True,),
+                    )
+                return self._process_pool
+
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="stage"
+                )
+            return self._thread_pool
+
+    async def run(
+        self, stage: str, func: Callable, *args: Any, allow_process: bool = True
+    ) -> Any:
+        """Run one pipeline stage and wait for its result without blocking the event loop.
+
+        :param stage: stage name used for the queue depth counters and the latency histogram
+        :type stage: str
+        :param func: blocking stage function
+        :type func: Callable
+        :param allow_process: whether func, its arguments, result and errors can be pickled
+        :type allow_process: bool
+        :return: stage function result
+        :rtype: Any
+        """
+        with self._lock:
+            self._in_flight[stage] += 1
+            self._peak[stage] = max(self._peak[stage], self._in_flight[stage])
+        start = time.perf_counter()
+        try:
+            if self.mode == "inline" or profiling_active():
+                return func(*args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool(allow_process), functools.partial(func, *args)
+            )
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+            with self._lock:
+                self._in_flight[stage] -= 1
+                self._completed[stage] += 1
+
+    def start(self):
+        """Start the pools ahead of the first request"""
+        if self.mode != "inline":
+            self._pool(allow_process=False)
+            self._pool(allow_process=True)
+
+    def shutdown(self):
+        """Stop the pools, waiting for running stages to finish"""
+        with self._lock:
+            pools = [self._thread_pool, self._process_pool]
+            self._thread_pool = self._process_pool = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the execution mode and the per stage queue depths.
+
+        :return: mode, workers and per stage in flight, peak and completed counts
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "in_flight": self._in_flight[stage],
+                    "peak_in_flight": self._peak[stage],
+                    "completed": self._completed[stage],
+                }
+                for stage in self._completed.keys() | self._in_flight.keys()
+            }
+
+        return {"mode": self.mode, "max_workers": self.max_workers, "stages": stages}
+
+
+STAGE_EXECUTOR = StageExecutor()
+METRICS.register(
+    CallbackMetric(
+        "sales_api_stage_in_flight",
+        "Calls of a request stage submitted but not finished yet",
+        lambda: [
+            ((stage,), counts["in_flight"])
+            for stage, counts in STAGE_EXECUTOR.stats()["stages"].items()
+        ],
+        ["stage"],
+    )
+)
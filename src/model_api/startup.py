@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from .metrics import METRICS, CallbackMetric
+
+_CLOCK_STARTED = time.monotonic()
+
+
+def process_uptime() -> float:
+    """Seconds since the process started, including interpreter start up and imports.
+
+    The process start time is read from /proc on Linux, elsewhere the uptime is measured from the first import of this module.
+
+    :return: process age in seconds
+    :rtype: float
+    """
+    try:
+        with open("/proc/self/stat") as stat_file:
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime_file:
+            system_uptime = float(uptime_file.read().split()[0])
+        return max(system_uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _CLOCK_STARTED
+
+
+class StartupTracker:
+    """Record the cold start of the service: process milestones, warm-up phase durations and readiness.
+
+    Milestones are process ages in seconds, e.g. when the application module finished importing, when the warm-up completed and when the first prediction was served. Phases are the durations of the individual warm-up steps. The service is ready once every warm-up step succeeded.
+    """
+
+    def __init__(self, uptime: Callable[[], float] = process_uptime):
+        """Initialize a tracker that is not ready yet.
+
+        :param uptime: clock of the process age in seconds
+        :type uptime: Callable[[], float]
+        """
+        self.uptime = uptime
+        self.milestones: Dict[str, float] = {}
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark(self, milestone: str):
+        """Record the process age of a milestone, only its first occurrence is kept.
+
+        :param milestone: milestone name
+        :type milestone: str
+        """
+        if milestone in self.milestones:
+            return
+        with self._lock:
+            self.milestones.setdefault(milestone, self.uptime())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a warm-up step, a failing step keeps the service not ready and records the error.
+
+        :param name: warm-up step name
+        :type name: str
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as error:
+            self.error = f"{name}: {error!r}"
+            raise
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def warm_up(self, steps: Dict[str, Callable[[], object]]) -> bool:
+        """Run the warm-up steps in order and mark the service ready if all of them succeed.
+
+        :param steps: warm-up callables by step name
+        :type steps: Dict[str, Callable[[], object]]
+        :return: True if the service is ready
+        :rtype: bool
+        """
+        started = time.perf_counter()
+        self.mark("warmup_started")
+        try:
+            for name, step in steps.items():
+                with self.phase(name):
+                    step()
+        except Exception:
+            return False
+        finally:
+            self.phases["total"] = time.perf_counter() - started
+
+        self.error = None
+        self.ready = True
+        self.mark("ready")
+        return True
+
+    def start(self, steps: Dict[str, Callable[[], object]]):
+        """Run the warm-up on a daemon thread, unless the service is already ready or warming up.
+
+        :param steps: warm-up callables by step name
+        :type steps: Dict[str, Callable[[], object]]
+        """
+        with self._lock:
+            if self.ready or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(
+                target=self.warm_up, args=(steps,), name="warm-up", daemon=True
+            )
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running warm-up to finish.
+
+        :param timeout: longest wait in seconds, None waits until it finishes
+        :type timeout: Optional[float]
+        :return: True if the service is ready
+        :rtype: bool
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+        return self.ready
+
+    def report(self) -> Dict:
+        """Summarize readiness, milestones and warm-up phases.
+
+        :return: readiness report
+        :rtype: Dict
+        """
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "milestones": dict(self.milestones),
+            "warmup": dict(self.phases),
+        }
+
+
+STARTUP = StartupTracker()
+
+METRICS.register(
+    CallbackMetric(
+        "sales_api_ready",
+        "1 once the startup warm-up completed, 0 before",
+        lambda: [((), int(STARTUP.ready))],
+    )
+)
+METRICS.register(
+    CallbackMetric(
+        "sales_api_startup_milestone_seconds",
+        "Process age in seconds at each startup milestone",
+        lambda: [((name,), value) for name, value in dict(STARTUP.milestones).items()],
+        ["milestone"],
+    )
+)
+METRICS.register(
+    CallbackMetric(
+        "sales_api_warmup_phase_seconds",
+        "Duration in seconds of each startup warm-up phase",
+        lambda: [((name,), value) for name, value in dict(STARTUP.phases).items()],
+        ["phase"],
+    )
+)
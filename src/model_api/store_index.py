@@ -0,0 +1,283 @@
+import hashlib
+import io
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import (
+    ASSORT_TYPE,
+    COMPET_OPEN_MONTHYEAR,
+    PROMO_INTERVAL_LIST,
+    PROMO_TWO_WEEKYEAR,
+    STORE_FILE,
+    STORE_RELOAD_INTERVAL,
+    STORE_TYPE,
+)
+from .metrics import ARTIFACT_LOAD_SECONDS, METRICS, CallbackMetric
+from .model_utils import BackgroundReloader
+
+
+class StoreRecord(NamedTuple):
+    """Precomputed model attributes of a single store"""
+
+    store: int
+    competition_distance: float
+    promo2: float
+    promo_interval: np.ndarray
+    promo2_since: np.ndarray
+    competition_open_since: np.ndarray
+    assortment: np.ndarray
+    store_type: np.ndarray
+
+
+class StoreArrays(NamedTuple):
+    """Dense store attribute arrays where the row number is the Store id.
+
+    Rows of unknown Store ids are zero, with NaN CompetitionDistance, and flagged False in known. digest is the sha256 of the store.csv contents the arrays were built from, empty if they were not built from a file.
+    """
+
+    version: int
+    stamp: Tuple
+    known: np.ndarray
+    first_store: int
+    last_store: int
+    competition_distance: np.ndarray
+    promo2: np.ndarray
+    promo_interval: np.ndarray
+    promo2_since: np.ndarray
+    competition_open_since: np.ndarray
+    assortment: np.ndarray
+    store_type: np.ndarray
+    digest: str = ""
+
+
+def one_hot_rows(
+    values: pd.Series, categories: list, rows: np.ndarray, size: int
+) -> np.ndarray:
+    """One hot encode the values into the given rows of a dense array.
+
+    :param values: categorical values, one per row
+    :type values: pd.Series
+    :param categories: ordered categories, one column each
+    :type categories: list
+    :param rows: destination row of each value
+    :type rows: np.ndarray
+    :param size: number of rows of the output array
+    :type size: int
+    :return: one hot encoded array of shape (size, len(categories))
+    :rtype: np.ndarray
+    """
+    encoded = np.zeros((size, len(categories)))
+    codes = pd.Categorical(values, categories=categories).codes
+    valid = codes >= 0
+    encoded[rows[valid], codes[valid]] = 1
+
+    return encoded
+
+
+def build_store_arrays(
+    df_store_info: pd.DataFrame, version: int = 1, stamp: Tuple = (), digest: str = ""
+) -> StoreArrays:
+    """Precompute the model attributes of every store in store.csv.
+
+    :param df_store_info: store.csv contents
+    :type df_store_info: pd.DataFrame
+    :param version: version number of the resulting arrays
+    :type version: int
+    :param stamp: file stamp the arrays were built from
+    :type stamp: Tuple
+    :param digest: sha256 of the file contents the arrays were built from
+    :type digest: str
+    :return: dense store attribute arrays
+    :rtype: StoreArrays
+    """
+    df_store_info = df_store_info.drop_duplicates().drop_duplicates("Store")
+    stores = df_store_info["Store"].to_numpy(dtype=np.int64)
+    size = int(stores.max()) + 1
+
+    known = np.zeros(size, dtype=bool)
+    known[stores] = True
+
+    competition_distance = np.full(size, np.nan)
+    competition_distance[stores] = df_store_info["CompetitionDistance"]
+    promo2 = np.zeros(size)
+    promo2[stores] = df_store_info["Promo2"]
+    promo2_since = np.zeros((size, 2))
+    promo2_since[stores] = df_store_info[PROMO_TWO_WEEKYEAR].fillna(0.0)
+    competition_open_since = np.zeros((size, 2))
+    competition_open_since[stores] = df_store_info[COMPET_OPEN_MONTHYEAR].fillna(0.0)
+
+    promo_interval = one_hot_rows(
+        df_store_info["PromoInterval"].fillna(PROMO_INTERVAL_LIST[0]),
+        PROMO_INTERVAL_LIST,
+        stores,
+        size,
+    )
+    assortment = one_hot_rows(
+        df_store_info["Assortment"], list(ASSORT_TYPE.keys()), stores, size
+    )
+    store_type = one_hot_rows(
+        df_store_info["StoreType"], list(STORE_TYPE.keys()), stores, size
+    )
+
+    return StoreArrays(
+        version=version,
+        stamp=stamp,
+        known=known,
+        first_store=int(stores.min()),
+        last_store=int(stores.max()),
+        competition_distance=competition_distance,
+        promo2=promo2,
+        promo_interval=promo_interval,
+        promo2_since=promo2_since,
+        competition_open_since=competition_open_since,
+        assortment=assortment,
+        store_type=store_type,
+        digest=digest,
+    )
+
+
+class StoreIndex(BackgroundReloader):
+    """Store attribute index built once from store.csv and rebuilt when the file changes.
+
+    Lookups and membership checks are plain array indexing by Store id.
+    """
+
+    def __init__(
+        self,
+        store_file: Path = STORE_FILE,
+        reload_interval: float = STORE_RELOAD_INTERVAL,
+    ):
+        """Initialize the index without reading store.csv yet.
+
+        :param store_file: filepath of store.csv
+        :type store_file: Path
+        :param reload_interval: seconds between file stamp checks of the watcher
+        :type reload_interval: float
+        """
+        super().__init__(reload_interval)
+        self.store_file = Path(store_file)
+        self._arrays: Optional[StoreArrays] = None
+        self._load_lock = threading.Lock()
+
+    def _file_stamp(self) -> Tuple:
+        """Modification time and size of store.csv
+
+        :return: file stamp
+        :rtype: Tuple
+        """
+        stat = self.store_file.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _swap(self) -> StoreArrays:
+        """Rebuild the arrays from store.csv and swap them in. Caller must hold the load lock.
+
+        :return: newly built arrays
+        :rtype: StoreArrays
+        """
+        stamp = self._file_stamp()
+        version = self._arrays.version + 1 if self._arrays else 1
+        with ARTIFACT_LOAD_SECONDS.time("store"):
+            contents = self.store_file.read_bytes()
+            self._arrays = build_store_arrays(
+                pd.read_csv(io.BytesIO(contents)),
+                version=version,
+                stamp=stamp,
+                digest=hashlib.sha256(contents).hexdigest(),
+            )
+
+        return self._arrays
+
+    def load(self) -> StoreArrays:
+        """Build the index from store.csv and swap it in.
+
+        :return: newly built arrays
+        :rtype: StoreArrays
+        """
+        with self._load_lock:
+            return self._swap()
+
+    def arrays(self) -> StoreArrays:
+        """Return the current store arrays, building them on first use.
+
+        :return: current store arrays
+        :rtype: StoreArrays
+        """
+        arrays = self._arrays
+        if arrays is None:
+            with self._load_lock:
+                arrays = self._arrays or self._swap()
+
+        return arrays
+
+    @property
+    def version(self) -> int:
+        """Version number of the current arrays, incremented on every rebuild"""
+        return self.arrays().version
+
+    def refresh(self) -> bool:
+        """Rebuild the index if store.csv changed since the last build.
+
+        :return: True if new arrays were swapped in
+        :rtype: bool
+        """
+        current = self._arrays
+        try:
+            if current is not None and self._file_stamp() == current.stamp:
+                return False
+            self.load()
+        except (OSError, ValueError, KeyError):
+            return False
+
+        return True
+
+    def contains(self, store: int) -> bool:
+        """Check if the Store id is in store.csv.
+
+        :param store: Store id
+        :type store: int
+        :return: True if the store is known
+        :rtype: bool
+        """
+        known = self.arrays().known
+        return 0 <= store < len(known) and bool(known[store])
+
+    def lookup(self, store: int, arrays: Optional[StoreArrays] = None) -> StoreRecord:
+        """Return the precomputed attributes of one store.
+
+        :param store: Store id, must be known
+        :type store: int
+        :param arrays: store arrays to read from, defaults to the current ones
+        :type arrays: Optional[StoreArrays]
+        :raises KeyError: unknown Store id
+        :return: store attributes
+        :rtype: StoreRecord
+        """
+        if arrays is None:
+            arrays = self.arrays()
+        if not (0 <= store < len(arrays.known) and arrays.known[store]):
+            raise KeyError(store)
+
+        return StoreRecord(
+            store=store,
+            competition_distance=arrays.competition_distance[store],
+            promo2=arrays.promo2[store],
+            promo_interval=arrays.promo_interval[store],
+            promo2_since=arrays.promo2_since[store],
+            competition_open_since=arrays.competition_open_since[store],
+            assortment=arrays.assortment[store],
+            store_type=arrays.store_type[store],
+        )
+
+
+STORE_INDEX = StoreIndex()
+METRICS.register(
+    CallbackMetric(
+        "sales_api_store_index_version",
+        "Version of the loaded store.csv index, incremented on every rebuild",
+        lambda: [((), STORE_INDEX._arrays.version)] if STORE_INDEX._arrays else [],
+    )
+)
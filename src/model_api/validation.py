@@ -0,0 +1,115 @@
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from .calendar_table import CALENDAR, CalendarFeatures, day_of_week_mismatch
+from .constants import BINARY_FIELDS, STATE_HOLIDAYS
+from .store_index import STORE_INDEX, StoreArrays
+
+
+class ValidationResult(NamedTuple):
+    """Outcome of validating a batch of sales data entries"""
+
+    valid: np.ndarray
+    errors: List[Dict]
+    warnings: List[Dict]
+
+
+def validate_sales_frame(
+    df_request: pd.DataFrame,
+    store_arrays: Optional[StoreArrays] = None,
+    calendar_features: Optional[CalendarFeatures] = None,
+) -> ValidationResult:
+    """Validate whole columns of sales data entries and report every failing row.
+
+    Applies the same rules as the /predict validators, column by column, plus a check that the store has the CompetitionDistance the model needs. Failing rows are reported instead of aborting the batch. Rows whose DayOfWeek contradicts the Date are reported as warnings and stay valid.
+
+    :param df_request: sales data entries, one row per entry
+    :type df_request: pd.DataFrame
+    :param store_arrays: store attribute arrays, defaults to the current store index
+    :type store_arrays: Optional[StoreArrays]
+    :param calendar_features: calendar features of the rows, looked up from the Date column if not given
+    :type calendar_features: Optional[CalendarFeatures]
+    :return: mask of rows passing every check, the per row error and warning records, ordered by row
+    :rtype: ValidationResult
+    """
+    if store_arrays is None:
+        store_arrays = STORE_INDEX.arrays()
+
+    stores = pd.to_numeric(df_request["Store"], errors="coerce").to_numpy()
+    in_range = (stores >= 0) & (stores < len(store_arrays.known))
+    store_rows = np.where(in_range, stores, 0).astype(np.int64)
+    known_store = in_range & store_arrays.known[store_rows]
+
+    day_of_week = df_request["DayOfWeek"].to_numpy()
+    checks = [
+        (
+            "Store",
+            ~known_store,
+            f"Store number must be from {store_arrays.first_store} to {store_arrays.last_store}",
+        ),
+        (
+            "Store",
+            known_store & np.isnan(store_arrays.competition_distance[store_rows]),
+            "Store has no CompetitionDistance to predict with",
+        ),
+        (
+            "DayOfWeek",
+            ~((day_of_week >= 1) & (day_of_week <= 7)),
+            "Number of days in a week should be between 1 to 7",
+        ),
+        (
+            "Customers",
+            ~(df_request["Customers"].to_numpy() >= 0),
+            "Number of customers must be greater than or equal to 0",
+        ),
+    ]
+    for field in BINARY_FIELDS:
+        checks.append(
+            (
+                field,
+                ~df_request[field].isin([0, 1]).to_numpy(),
+                f"{field} entry must be binary",
+            )
+        )
+    if calendar_features is None:
+        calendar_features = CALENDAR.features(df_request["Date"].astype(str))
+    checks.append(("Date", ~calendar_features.parsed, "incorrect Date entry"))
+    checks.append(
+        (
+            "StateHoliday",
+            ~df_request["StateHoliday"]
+            .astype(str)
+            .isin(list(STATE_HOLIDAYS.keys()))
+            .to_numpy(),
+            "incorrect StateHoliday entry",
+        )
+    )
+
+    valid = np.ones(len(df_request), dtype=bool)
+    errors = []
+    for order, (field, invalid, detail) in enumerate(checks):
+        valid &= ~invalid
+        errors.extend(
+            (row, order, field, detail) for row in np.flatnonzero(invalid).tolist()
+        )
+    errors.sort()
+
+    mismatch = day_of_week_mismatch(calendar_features, day_of_week)
+
+    return ValidationResult(
+        valid=valid,
+        errors=[
+            {"row": row, "field": field, "detail": detail}
+            for row, _, field, detail in errors
+        ],
+        warnings=[
+            {
+                "row": row,
+                "field": "DayOfWeek",
+                "detail": "DayOfWeek does not match Date",
+            }
+            for row in np.flatnonzero(mismatch).tolist()
+        ],
+    )
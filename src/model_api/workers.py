@@ -0,0 +1,193 @@
+import gc
+import math
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .constants import WEB_CONCURRENCY, WORKERS_PER_CPU
+from .metrics import METRICS, CallbackMetric
+
+CGROUP_DIR = Path("/sys/fs/cgroup")
+
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Swap": "swap",
+}
+
+
+def cgroup_cpu_limit(cgroup_dir: Path = CGROUP_DIR) -> Optional[float]:
+    """Read the CPU quota of the container, as set by docker --cpus or the ECS task CPU units.
+
+    :param cgroup_dir: cgroup file system mount point
+    :type cgroup_dir: Path
+    :return: number of CPUs the quota allows, None without quota
+    :rtype: Optional[float]
+    """
+    try:
+        quota, period = (cgroup_dir / "cpu.max").read_text().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        quota = int((cgroup_dir / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((cgroup_dir / "cpu" / "cpu.cfs_period_us").read_text())
+    except (OSError, ValueError):
+        return None
+
+    return quota / period if quota > 0 and period > 0 else None
+
+
+def available_cpus(cgroup_dir: Path = CGROUP_DIR) -> int:
+    """Count the CPUs the process may run on, limited by the CPU affinity and the container quota.
+
+    :param cgroup_dir: cgroup file system mount point
+    :type cgroup_dir: Path
+    :return: number of usable CPUs, at least 1
+    :rtype: int
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit(cgroup_dir)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+
+    return max(cpus, 1)
+
+
+def worker_count(
+    configured: Optional[int] = WEB_CONCURRENCY,
+    cpus: Optional[int] = None,
+    workers_per_cpu: float = WORKERS_PER_CPU,
+) -> int:
+    """Choose the number of serving worker processes.
+
+    The async workers keep a CPU busy on their own, so the default is one worker per usable CPU.
+
+    :param configured: explicitly configured worker count, None to derive it from the CPUs
+    :type configured: Optional[int]
+    :param cpus: usable CPUs, defaults to available_cpus()
+    :type cpus: Optional[int]
+    :param workers_per_cpu: workers started per usable CPU
+    :type workers_per_cpu: float
+    :return: number of workers, at least 1
+    :rtype: int
+    """
+    if configured:
+        return max(configured, 1)
+
+    if cpus is None:
+        cpus = available_cpus()
+
+    return max(int(cpus * workers_per_cpu), 1)
+
+
+def preload_shared_data():
+    """Load the read-only serving data in the master process, so that forked workers share it copy-on-write.
+
+    Loads the model bundle, store index and duration table and compiles the predictor, then moves every object into the permanent GC generation, so that garbage collections in the workers do not write to, and thereby copy, the shared pages.
+    """
+    from .compiled_model import compiled_predictor
+    from .duration_table import DURATION_INDEX
+    from .model_utils import MODEL_REGISTRY
+    from .store_index import STORE_INDEX
+
+    MODEL_REGISTRY.snapshot()
+    DURATION_INDEX.table(STORE_INDEX.arrays())
+    compiled_predictor()
+
+    gc.collect()
+    gc.freeze()
+
+
+def process_memory(
+    smaps_file: Path = Path("/proc/self/smaps_rollup"),
+) -> Dict[str, int]:
+    """Measure the memory of the current process in bytes.
+
+    rss counts every resident page, pss divides shared pages by the number of processes sharing them, the private pages are the ones no other worker shares. Without smaps_rollup only the peak RSS is available.
+
+    :param smaps_file: memory summary of the process
+    :type smaps_file: Path
+    :return: memory by kind in bytes
+    :rtype: Dict[str, int]
+    """
+    try:
+        lines = smaps_file.read_text().splitlines()
+    except OSError:
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"max_rss": max_rss * 1024}
+
+    memory = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in SMAPS_FIELDS:
+            memory[SMAPS_FIELDS[field]] = int(value.split()[0]) * 1024
+    memory["private"] = memory.get("private_clean", 0) + memory.get("private_dirty", 0)
+    memory["shared"] = memory.get("shared_clean", 0) + memory.get("shared_dirty", 0)
+
+    return memory
+
+
+class MemoryTracker:
+    """Report the memory of the worker process and its growth since the worker started serving"""
+
+    def __init__(self):
+        """Initialize the tracker without a baseline"""
+        self.baseline: Dict[str, int] = {}
+
+    def mark_baseline(self):
+        """Measure the baseline the growth is reported against, e.g. right after the worker was forked"""
+        self.baseline = process_memory()
+
+    def report(self) -> Dict[str, Any]:
+        """Measure the current memory and its growth since the baseline.
+
+        :return: pid, current memory by kind and growth by kind in bytes
+        :rtype: Dict[str, Any]
+        """
+        current = process_memory()
+        return {
+            "pid": os.getpid(),
+            "bytes": current,
+            "growth_bytes": {
+                kind: value - self.baseline[kind]
+                for kind, value in current.items()
+                if kind in self.baseline
+            },
+        }
+
+
+MEMORY_TRACKER = MemoryTracker()
+
+METRICS.register(
+    CallbackMetric(
+        "sales_api_process_memory_bytes",
+        "Memory of the worker process by kind (rss, pss, private, shared)",
+        lambda: [((kind,), value) for kind, value in process_memory().items()],
+        ["kind"],
+    )
+)
+METRICS.register(
+    CallbackMetric(
+        "sales_api_process_memory_growth_bytes",
+        "Memory growth of the worker process since it started serving, by kind",
+        lambda: [
+            ((kind,), value)
+            for kind, value in MEMORY_TRACKER.report()["growth_bytes"].items()
+        ],
+        ["kind"],
+    )
+)
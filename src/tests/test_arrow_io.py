@@ -0,0 +1,181 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from numpy.testing import assert_array_equal
+
+from benchmarks import arrow_stream, sales_entries
+from main import app
+from model_api.arrow_io import (
+    ARROW_STREAM_MEDIA_TYPE,
+    read_arrow_batch,
+    write_arrow_predictions,
+)
+from model_api.calendar_table import CALENDAR
+from model_api.constants import SALES_DATA_FIELDS
+
+pa = pytest.importorskip("pyarrow")
+
+
+def table_stream(table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
+
+def read_stream(body: bytes):
+    return pa.ipc.open_stream(body).read_all()
+
+
+def test_read_arrow_batch():
+    entries = sales_entries(20)
+
+    batch = read_arrow_batch(arrow_stream(entries))
+
+    assert batch.df_request.to_dict("records") == entries
+    assert_array_equal(
+        batch.calendar_features.year,
+        CALENDAR.features([entry["Date"] for entry in entries]).year,
+    )
+
+
+def test_read_arrow_batch_dates_and_nulls():
+    entries = sales_entries(3)
+    table = pa.table(
+        {
+            "Store": pa.array([None, entries[1]["Store"], 5], pa.int32()),
+            "DayOfWeek": [entry["DayOfWeek"] for entry in entries],
+            "Date": pa.array(
+                [datetime.date(2015, 7, 31), None, datetime.date(2015, 7, 31)]
+            ),
+            "Customers": [entry["Customers"] for entry in entries],
+            "Open": [1, 1, 1],
+            "Promo": [0, 0, 0],
+            "StateHoliday": ["0", "a", None],
+            "SchoolHoliday": [0, 0, 1],
+        }
+    )
+
+    batch = read_arrow_batch(table_stream(table))
+
+    assert batch.df_request["Store"].tolist() == [-1, entries[1]["Store"], 5]
+    assert batch.df_request["Date"].tolist() == ["2015-07-31", None, "2015-07-31"]
+    assert batch.df_request["StateHoliday"].tolist() == ["0", "a", None]
+    assert batch.calendar_features.parsed.tolist() == [True, False, True]
+    assert batch.calendar_features.day_of_week[0] == 5
+
+
+def test_read_arrow_batch_dictionary_columns():
+    entries = sales_entries(20)
+    entries[3] = {**entries[3], "Date": None}
+    entries[4] = {**entries[4], "Date": ""}
+    df_entries = pd.DataFrame(entries).astype(
+        {"Date": "category", "StateHoliday": "category"}
+    )
+    table = pa.Table.from_pandas(df_entries, preserve_index=False)
+
+    batch = read_arrow_batch(table_stream(table))
+    expected = read_arrow_batch(arrow_stream(entries))
+
+    assert pa.types.is_dictionary(table.column("Date").type)
+    assert batch.df_request.to_dict("records") == expected.df_request.to_dict("records")
+    for values, expected_values in zip(
+        batch.calendar_features, expected.calendar_features
+    ):
+        assert_array_equal(values, expected_values)
+    assert batch.calendar_features.parsed[3:5].tolist() == [False, False]
+
+
+def columns_replaced(**columns) -> bytes:
+    entries = sales_entries(2)
+    table = pa.table(
+        {field: [entry[field] for entry in entries] for field in SALES_DATA_FIELDS}
+    )
+    for field, column in columns.items():
+        table = table.set_column(table.column_names.index(field), field, column)
+
+    return table_stream(table)
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        (b"not arrow", "not an Arrow IPC stream"),
+        (table_stream(pa.table({"Store": [1]})), "missing columns: DayOfWeek"),
+        (columns_replaced(Date=pa.array([1.5, 2.0])), "column Date must hold"),
+        (
+            columns_replaced(StateHoliday=pa.array([[1], [2]])),
+            "column StateHoliday must hold strings",
+        ),
+    ],
+)
+def test_read_arrow_batch_rejected(body, message):
+    with pytest.raises(ValueError, match=message):
+        read_arrow_batch(body)
+
+
+def test_write_arrow_predictions():
+    errors = [
+        {"row": 1, "field": "Store", "detail": "unknown"},
+        {"row": 1, "field": "Open", "detail": "not binary"},
+    ]
+
+    table = read_stream(
+        write_arrow_predictions(np.array([1.5, np.nan, 2.0]), errors, [])
+    )
+
+    assert table.column("sales").to_pylist() == [1.5, None, 2.0]
+    assert table.column("error").to_pylist() == [
+        None,
+        "Store: unknown; Open: not binary",
+        None,
+    ]
+    assert table.column("warning").null_count == 3
+
+
+def test_arrow_endpoint_matches_batch():
+    entries = sales_entries(300, seed=3)
+    entries[7] = {**entries[7], "Customers": -5}
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict/arrow",
+            content=arrow_stream(entries),
+            headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+        )
+        batch = client.post("/predict/batch", json=entries).json()
+        rejected = client.post("/predict/arrow", content=b"{}")
+
+    table = read_stream(response.content)
+    assert response.headers["content-type"] == ARROW_STREAM_MEDIA_TYPE
+    assert table.column("sales").to_pylist() == batch["sales"]
+    assert table.column("error").to_pylist()[7].startswith("Customers:")
+    assert rejected.status_code == 422
+
+
+def test_arrow_endpoint_dictionary_dates():
+    entries = sales_entries(50, seed=4)
+    entries[5] = {**entries[5], "Date": "NaT"}
+    table = pa.Table.from_pandas(
+        pd.DataFrame(entries).astype({"Date": "category"}), preserve_index=False
+    )
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict/arrow",
+            content=table_stream(table),
+            headers={"content-type": ARROW_STREAM_MEDIA_TYPE},
+        )
+        batch = client.post("/predict/batch", json=entries).json()
+        rejected = client.post(
+            "/predict/arrow", content=columns_replaced(Date=pa.array([1.5, 2.0]))
+        )
+
+    assert response.status_code == 200
+    assert read_stream(response.content).column("sales").to_pylist() == batch["sales"]
+    assert batch["sales"][5] is None
+    assert rejected.status_code == 422
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from numpy.testing import assert_array_equal
+
+from main import app
+from model_api.constants import STATE_HOLIDAYS, PROMO_TWO_WEEKYEAR
+from model_api.model_functions import (
+    classify_match,
+    classify_match_batch,
+    compute_duration,
+    compute_duration_batch,
+)
+from model_api.model_pipeline import (
+    reshape_inputs_pipeline,
+    model_prediction_pipeline,
+    reshape_inputs_batch_pipeline,
+    model_prediction_batch_pipeline,
+)
+from model_api.model_utils import MODEL_REGISTRY
+
+POST_REQUESTS = [
+    {
+        "Store": 872,
+        "DayOfWeek": 3,
+        "Date": "2014-07-09",
+        "Customers": 577,
+        "Open": 1,
+        "Promo": 0,
+        "StateHoliday": "0",
+        "SchoolHoliday": 1,
+    },
+    {
+        "Store": 608,
+        "DayOfWeek": 7,
+        "Date": "2013-12-01",
+        "Customers": 0,
+        "Open": 0,
+        "Promo": 0,
+        "StateHoliday": "0",
+        "SchoolHoliday": 0,
+    },
+    {
+        "Store": 1099,
+        "DayOfWeek": 1,
+        "Date": "2015-04-06",
+        "Customers": 804,
+        "Open": 1,
+        "Promo": 0,
+        "StateHoliday": "b",
+        "SchoolHoliday": 1,
+    },
+    {
+        "Store": 274,
+        "DayOfWeek": 4,
+        "Date": "2015-01-01",
+        "Customers": 754,
+        "Open": 1,
+        "Promo": 0,
+        "StateHoliday": "a",
+        "SchoolHoliday": 1,
+    },
+    {
+        "Store": 948,
+        "DayOfWeek": 4,
+        "Date": "2015-12-25",
+        "Customers": 1463,
+        "Open": 1,
+        "Promo": 0,
+        "StateHoliday": "c",
+        "SchoolHoliday": 1,
+    },
+    {
+        "Store": 2,
+        "DayOfWeek": 1,
+        "Date": "2013-12-30",
+        "Customers": 500,
+        "Open": 1,
+        "Promo": 1,
+        "StateHoliday": "0",
+        "SchoolHoliday": 0,
+    },
+]
+
+
+def single_row_prediction(post_request):
+    feature_names = MODEL_REGISTRY.get("bundle").feature_names
+    df_request = pd.Series(index=feature_names, dtype=float)
+    for field, value in post_request.items():
+        if field != "StateHoliday":
+            df_request[field] = value
+    df_request = classify_match(
+        STATE_HOLIDAYS, post_request["StateHoliday"], df_request
+    )
+
+    reshaped_inputs = reshape_inputs_pipeline(df_request)
+    return model_prediction_pipeline(reshaped_inputs=reshaped_inputs)[0]
+
+
+def test_classify_match_batch():
+    df_request = pd.DataFrame(index=range(3))
+    results = classify_match_batch(
+        STATE_HOLIDAYS, pd.Series(["0", "c", "0"]), df_request
+    )
+
+    assert_array_equal(results["no_holiday"], [1, 0, 1])
+    assert_array_equal(results["christmas"], [0, 1, 0])
+    assert_array_equal(results["public_holiday"], [0, 0, 0])
+    with pytest.raises(KeyError):
+        classify_match_batch(STATE_HOLIDAYS, pd.Series(["x"]), df_request)
+
+
+def test_compute_duration_batch():
+    current_date = np.array([[1, 2013], [30, 2015], [10, 2011]])
+    start_date = np.array([[5, 2014], [0, 0], [13, 2010]])
+    expected_results = [
+        compute_duration(current, start, "W")
+        for current, start in zip(current_date, start_date)
+    ]
+    results = compute_duration_batch(
+        pd.DataFrame(current_date),
+        pd.DataFrame(start_date, columns=PROMO_TWO_WEEKYEAR),
+        "W",
+    )
+
+    assert_array_equal(results, expected_results)
+
+
+def test_batch_pipeline_matches_single_row():
+    df_request = pd.DataFrame(POST_REQUESTS)
+    df_request = classify_match_batch(
+        STATE_HOLIDAYS, df_request.pop("StateHoliday"), df_request
+    )
+    reshaped_inputs = reshape_inputs_batch_pipeline(df_request)
+    results = model_prediction_batch_pipeline(reshaped_inputs=reshaped_inputs)
+
+    assert_array_equal(
+        results, [single_row_prediction(post_request) for post_request in POST_REQUESTS]
+    )
+
+
+def test_predict_batch_endpoint():
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", json=POST_REQUESTS)
+        empty_response = client.post("/predict/batch", json=[])
+        invalid_response = client.post(
+            "/predict/batch", json=[POST_REQUESTS[0], {**POST_REQUESTS[1], "Store": 0}]
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "sales": [
+            single_row_prediction(post_request) for post_request in POST_REQUESTS
+        ],
+        "errors": [],
+        "warnings": [
+            {"row": 4, "field": "DayOfWeek", "detail": "DayOfWeek does not match Date"}
+        ],
+    }
+    assert empty_response.json() == {"sales": [], "errors": [], "warnings": []}
+    assert invalid_response.json() == {
+        "sales": [single_row_prediction(POST_REQUESTS[0]), None],
+        "errors": [
+            {
+                "row": 1,
+                "field": "Store",
+                "detail": "Store number must be from 1 to 1115",
+            }
+        ],
+        "warnings": [],
+    }
+
+
+@pytest.mark.parametrize("date", ["", "NaT"])
+def test_predict_batch_endpoint_unparsed_date(date):
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict/batch",
+            json=[POST_REQUESTS[0], {**POST_REQUESTS[1], "Date": date}],
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "sales": [single_row_prediction(POST_REQUESTS[0]), None],
+        "errors": [{"row": 1, "field": "Date", "detail": "incorrect Date entry"}],
+        "warnings": [],
+    }
@@ -0,0 +1,122 @@
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks import (
+    best_results,
+    compare_results,
+    main,
+    parse_thresholds,
+    run_benchmarks,
+    sales_entries,
+    stage_benchmarks,
+)
+from model_api.validation import validate_sales_frame
+
+
+def result(median):
+    return {"median": median}
+
+
+def test_sales_entries_are_valid():
+    entries = sales_entries(50)
+
+    assert len(entries) == 50
+    assert validate_sales_frame(pd.DataFrame(entries)).valid.all()
+
+
+def test_run_benchmarks_filters_and_times_stages():
+    results = run_benchmarks(
+        stage_benchmarks([8]), rounds=2, min_time=0.001, name_filter="compute_duration"
+    )
+
+    assert set(results) == {"stage.compute_duration", "stage.compute_duration_batch[8]"}
+    batch = results["stage.compute_duration_batch[8]"]
+    assert batch["size"] == 8
+    assert batch["rounds"] == 2
+    assert 0 < batch["min"] <= batch["median"]
+    assert batch["median_per_row"] == pytest.approx(batch["median"] / 8)
+
+
+def test_compare_results():
+    results = {"a": result(1.3), "b": result(1.3), "c": result(0.5), "d": result(9)}
+    baseline = {"a": result(1.0), "b": result(1.0), "c": result(1.0)}
+
+    regressions = compare_results(results, baseline, 0.25, thresholds={"b": 0.5})
+
+    assert [regression.name for regression in regressions] == ["a"]
+    assert regressions[0].ratio == pytest.approx(0.3)
+    assert regressions[0].limit == 0.25
+
+
+def test_best_results():
+    runs = [
+        {"a": {"median": 2.0}, "b": {"median": 1.0}},
+        {"a": {"median": 1.5}, "b": {"median": 3.0}, "c": {"median": 4.0}},
+    ]
+
+    assert best_results(runs) == {
+        "a": {"median": 1.5},
+        "b": {"median": 1.0},
+        "c": {"median": 4.0},
+    }
+
+
+def test_parse_thresholds():
+    assert parse_thresholds(["e2e.predict[1]=0.5", "a=1"]) == {
+        "e2e.predict[1]": 0.5,
+        "a": 1.0,
+    }
+    with pytest.raises(ValueError):
+        parse_thresholds(["a"])
+
+
+def test_main_fails_on_regression(tmp_path):
+    output = tmp_path / "benchmark.json"
+    args = [
+        "--output",
+        str(output),
+        "--sizes",
+        "4",
+        "--rounds",
+        "1",
+        "--min-time",
+        "0.001",
+        "--filter",
+        "compute_duration",
+        "--stages-only",
+    ]
+
+    assert main(args) == 0
+    results = json.loads(output.read_text())
+    assert "python" in results["environment"]
+    assert "stage.compute_duration_batch[4]" in results["benchmarks"]
+
+    baseline = tmp_path / "baseline.json"
+    for name in results["benchmarks"]:
+        results["benchmarks"][name]["median"] /= 100
+    baseline.write_text(json.dumps(results))
+
+    assert main(args + ["--baseline", str(baseline)]) == 1
+    assert main(args + ["--baseline", str(baseline), "--max-regression", "1000"]) == 0
+
+
+def test_main_compares_saved_results(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def write_run(name, medians):
+        path = tmp_path / name
+        benchmarks = {key: {"median": median} for key, median in medians.items()}
+        path.write_text(json.dumps({"benchmarks": benchmarks}))
+        return str(path)
+
+    base = [write_run("base1.json", {"a": 1.0}), write_run("base2.json", {"a": 2.0})]
+    slow = write_run("head1.json", {"a": 1.5})
+    noisy = write_run("head2.json", {"a": 1.1})
+
+    assert main(["--results", slow, "--baseline", *base]) == 1
+    assert main(["--results", slow, noisy, "--baseline", *base]) == 0
+    assert not (tmp_path / "benchmark.json").exists()
+    with pytest.raises(SystemExit):
+        main(["--results", slow])
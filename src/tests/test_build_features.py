@@ -0,0 +1,128 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+from benchmarks import sales_entries
+from build_features import MANIFEST_FILE, build_features, partition_rows
+from bulk_score import score_chunk
+from model_api.compiled_model import compiled_predictor
+from train_model import processed_chunks
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def train_file(tmp_path):
+    df_train = pd.DataFrame(sales_entries(600, seed=5))
+    df_train = df_train.sort_values("Date", ascending=False, ignore_index=True)
+    df_train.insert(3, "Sales", np.arange(len(df_train)) * 7)
+    df_train.loc[10, "Store"] = 5000
+    train_file = tmp_path / "train.csv"
+    df_train.to_csv(train_file, index=False)
+
+    return train_file
+
+
+def read_partitions(output_dir):
+    return pd.concat(
+        [pd.read_parquet(path) for path in sorted(output_dir.glob("*.parquet"))],
+        ignore_index=True,
+    )
+
+
+def test_partition_rows():
+    df_chunk = pd.DataFrame(
+        {"Store": [1, 250, 100, 101], "Date": ["2015-07-31", "2015-06-01"] * 2}
+    )
+
+    months = partition_rows(df_chunk, "month", 100)
+    stores = partition_rows(df_chunk, "store", 100)
+
+    assert {name: rows.tolist() for name, rows in months.items()} == {
+        "month=2015-07": [0, 2],
+        "month=2015-06": [1, 3],
+    }
+    assert {name: rows.tolist() for name, rows in stores.items()} == {
+        "store=0001-0100": [0, 2],
+        "store=0201-0300": [1],
+        "store=0101-0200": [3],
+    }
+
+
+@pytest.mark.parametrize("partition_by, workers", [("month", 1), ("store", 2)])
+def test_features_predict_like_the_service(train_file, tmp_path, partition_by, workers):
+    output_dir = tmp_path / "features"
+
+    summary = build_features(
+        train_file, output_dir, partition_by, stores_per_partition=300, workers=workers
+    )
+
+    df_train = pd.read_csv(train_file, dtype={"StateHoliday": str})
+    df_features = read_partitions(output_dir).set_index("Id")
+    ids = "(" + df_train["Store"].astype(str) + ", '" + df_train["Date"] + "')"
+    expected = score_chunk(df_train)
+    df_features = df_features.loc[ids[~np.isnan(expected)]]
+    assert (summary.rows, summary.dropped) == (len(df_train) - 1, 1)
+    assert_array_equal(
+        np.round(compiled_predictor().predict_frame(df_features), 2),
+        expected[~np.isnan(expected)],
+    )
+    assert_array_equal(
+        df_features["Sales"], df_train["Sales"][~np.isnan(expected)].to_numpy()
+    )
+
+
+def test_rebuilds_only_changed_partitions(train_file, tmp_path):
+    output_dir = tmp_path / "features"
+    first = build_features(train_file, output_dir, workers=1)
+    manifest = json.loads((output_dir / MANIFEST_FILE).read_text())
+
+    unchanged = build_features(train_file, output_dir, workers=1)
+    df_train = pd.read_csv(train_file, dtype={"StateHoliday": str})
+    df_train.loc[0, "Sales"] += 1
+    df_train = df_train[~df_train["Date"].str.startswith("2013-01")]
+    df_train.to_csv(train_file, index=False)
+    changed = build_features(train_file, output_dir, workers=1)
+
+    assert set(manifest["partitions"]) == set(first.built)
+    assert unchanged.built == [] and unchanged.unchanged == first.built
+    assert changed.built == [f"month={df_train.loc[0, 'Date'][:7]}"]
+    assert changed.removed == ["month=2013-01"]
+    assert not (output_dir / "month=2013-01.parquet").exists()
+    assert_array_equal(
+        np.sort(read_partitions(output_dir)["Sales"]),
+        np.sort(df_train.loc[df_train["Store"] != 5000, "Sales"]),
+    )
+
+
+def test_processed_chunks_reads_partitions(train_file, tmp_path):
+    output_dir = tmp_path / "features"
+    build_features(train_file, output_dir, workers=1)
+
+    chunks = list(processed_chunks(output_dir, chunksize=10))
+
+    assert max(len(chunk) for chunk in chunks) == 10
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), read_partitions(output_dir)
+    )
+
+
+def test_invalid_dates_dropped_before_partitioning(train_file, tmp_path):
+    lines = train_file.read_text().splitlines()
+    header = lines[0].split(",")
+    for line_number, date in [(2, ""), (3, "NaT"), (4, "nan")]:
+        fields = lines[line_number].split(",")
+        fields[header.index("Date")] = date
+        lines[line_number] = ",".join(fields)
+    train_file.write_text("\n".join(lines) + "\n")
+    output_dir = tmp_path / "features"
+
+    summary = build_features(train_file, output_dir, workers=1)
+
+    assert (summary.rows, summary.dropped) == (len(lines) - 1 - 4, 4)
+    assert all(re.fullmatch(r"month=\d{4}-\d{2}", name) for name in summary.built)
+    assert len(read_partitions(output_dir)) == summary.rows
@@ -0,0 +1,110 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+import bulk_score as bulk_score_module
+from bulk_score import PREDICTION_COLUMN, bulk_score, score_chunk
+from .test_batch_pipeline import POST_REQUESTS, single_row_prediction
+
+
+@pytest.fixture
+def train_file(tmp_path):
+    df_train = pd.DataFrame(POST_REQUESTS * 5)
+    df_train.insert(3, "Sales", 0)
+    df_train.loc[3, "Store"] = 291
+    df_train.loc[4, "Store"] = 5000
+    train_file = tmp_path / "train.csv"
+    df_train.to_csv(train_file, index=False)
+
+    return train_file
+
+
+@pytest.fixture
+def expected_sales(train_file):
+    df_train = pd.read_csv(train_file, dtype={"StateHoliday": str})
+    expected = [single_row_prediction(row) for row in POST_REQUESTS] * 5
+    expected[3] = expected[4] = np.nan
+
+    return df_train, np.array(expected)
+
+
+def test_score_chunk(expected_sales):
+    df_train, expected = expected_sales
+
+    assert_array_equal(score_chunk(df_train), expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bulk_score_keeps_input_order(train_file, tmp_path, expected_sales, workers):
+    df_train, expected = expected_sales
+    output_file = tmp_path / "predictions.csv"
+
+    rows = bulk_score(train_file, output_file, chunksize=4, workers=workers)
+    df_output = pd.read_csv(output_file, dtype={"StateHoliday": str})
+
+    assert rows == len(df_train)
+    assert_array_equal(df_output[PREDICTION_COLUMN], expected)
+    assert_array_equal(df_output["Store"], df_train["Store"])
+
+
+def test_bulk_score_resumes(train_file, tmp_path, expected_sales):
+    df_train, expected = expected_sales
+    output_file = tmp_path / "predictions.csv"
+    bulk_score(train_file, output_file, chunksize=4, workers=1)
+    checkpoint_file = tmp_path / "predictions.csv.checkpoint"
+    full_output = output_file.read_bytes()
+
+    checkpoint = json.loads(checkpoint_file.read_text())
+    with open(output_file) as output:
+        partial_bytes = len("".join(output.readlines()[:9]).encode())
+    checkpoint.update(chunks_done=2, rows_done=8, output_bytes=partial_bytes)
+    checkpoint_file.write_text(json.dumps(checkpoint))
+    with open(output_file, "ab") as output:
+        output.write(b"garbage from an interrupted chunk\n")
+
+    rows = bulk_score(train_file, output_file, chunksize=4, workers=1, resume=True)
+
+    assert rows == len(df_train) - 8
+    assert output_file.read_bytes() == full_output
+
+
+def test_bulk_score_resumes_after_failure(train_file, tmp_path, monkeypatch):
+    full_file = tmp_path / "full.csv"
+    bulk_score(train_file, full_file, chunksize=4, workers=1)
+    output_file = tmp_path / "predictions.csv"
+    scored_chunks = []
+
+    def failing_score_chunk(df_chunk):
+        if len(scored_chunks) == 3:
+            raise RuntimeError("interrupted")
+        scored_chunks.append(len(df_chunk))
+        return score_chunk(df_chunk)
+
+    monkeypatch.setattr(bulk_score_module, "score_chunk", failing_score_chunk)
+    with pytest.raises(RuntimeError, match="interrupted"):
+        bulk_score(train_file, output_file, chunksize=4, workers=1)
+    monkeypatch.undo()
+    rows = bulk_score(train_file, output_file, chunksize=4, workers=1, resume=True)
+
+    assert rows == len(pd.read_csv(train_file)) - sum(scored_chunks)
+    assert output_file.read_bytes() == full_file.read_bytes()
+
+
+def test_bulk_score_blank_dates(train_file, tmp_path, expected_sales):
+    df_train, expected = expected_sales
+    lines = train_file.read_text().splitlines()
+    lines[2] = lines[2].replace(POST_REQUESTS[1]["Date"], "")
+    lines[8] = lines[8].replace(POST_REQUESTS[1]["Date"], "NaT")
+    train_file.write_text("\n".join(lines) + "\n")
+    expected[[1, 7]] = np.nan
+    output_file = tmp_path / "predictions.csv"
+
+    rows = bulk_score(train_file, output_file, chunksize=4, workers=1)
+    df_output = pd.read_csv(output_file, dtype={"StateHoliday": str})
+
+    assert rows == len(df_train)
+    assert pd.isna(df_output.loc[1, "Date"])
+    assert_array_equal(df_output[PREDICTION_COLUMN], expected)
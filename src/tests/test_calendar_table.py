@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+from model_api.calendar_table import CalendarTable, day_of_week_mismatch
+
+
+@pytest.fixture(scope="module")
+def calendar():
+    return CalendarTable(first_year=2013, last_year=2015)
+
+
+@pytest.mark.parametrize(
+    "date",
+    [
+        "2013-01-01",
+        "2013-12-30",
+        "2015-12-31",
+        "2016-01-03",
+        "2009-06-15",
+        "2014-7-9",
+        "07/09/2014",
+        "2014-07",
+    ],
+)
+def test_date_features_match_period(calendar, date):
+    period = pd.Period(date)
+
+    assert calendar.date_features(date) == (
+        period.year,
+        period.month,
+        period.week,
+        period.dayofweek + 1,
+    )
+
+
+@pytest.mark.parametrize(
+    "date", ["2014-02-30", "2014-13-01", "not a date", "", "NaT", "nan"]
+)
+def test_date_features_rejects_invalid_date(calendar, date):
+    with pytest.raises(ValueError):
+        calendar.date_features(date)
+
+
+def test_features_of_date_arrays(calendar):
+    features = calendar.features(
+        ["2014-07-09", "2014-02-30", "2014-07-09", "2015-01-01", "", "NaT"]
+    )
+
+    assert_array_equal(features.parsed, [True, False, True, True, False, False])
+    assert_array_equal(features.year, [2014, np.nan, 2014, 2015, np.nan, np.nan])
+    assert_array_equal(features.week, [28, np.nan, 28, 1, np.nan, np.nan])
+    assert_array_equal(
+        day_of_week_mismatch(features, [3, 3, 4, 4, 1, 1]),
+        [False, False, True, False, False, False],
+    )
+
+
+def test_ordinals_features(calendar):
+    ordinals = pd.to_datetime(["2014-07-09", "2015-12-31"]).map(
+        lambda day: day.toordinal()
+    )
+    features = calendar.ordinals_features(np.asarray(ordinals))
+
+    assert_array_equal(features.month, [7, 12])
+    assert_array_equal(features.day_of_week, [3, 4])
+    with pytest.raises(IndexError):
+        calendar.ordinals_features(np.array([calendar.last_ordinal + 1]))
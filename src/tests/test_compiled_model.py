@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+
+from model_api.compiled_model import (
+    PredictorParityError,
+    check_parity,
+    compile_predictor,
+    compiled_predictor,
+    parity_sample,
+    sklearn_prediction,
+)
+from model_api.constants import MODEL_DIR, MODEL_FILES
+from model_api.model_utils import MODEL_REGISTRY, load_model
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return {name: load_model(MODEL_DIR / fname) for name, fname in MODEL_FILES.items()}
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    return MODEL_REGISTRY.get("bundle")
+
+
+def test_compiled_predictor_matches_sklearn(artifacts, bundle):
+    predictor = compile_predictor(bundle)
+    sample = parity_sample(bundle, size=50)
+    features = sample[predictor.feature_names].to_numpy()
+
+    assert check_parity(predictor, artifacts) < 1e-6
+    assert_allclose(
+        predictor.predict(features), sklearn_prediction(sample, artifacts), atol=1e-6
+    )
+    assert predictor.predict(features[0]) == pytest.approx(
+        predictor.predict(features)[0]
+    )
+
+
+def test_compiled_predictor_parity_failure(artifacts, bundle):
+    predictor = compile_predictor(bundle)
+    coef = predictor.coef.copy()
+    coef[0] += 1e-3
+    tampered = predictor._replace(coef=coef)
+
+    with pytest.raises(PredictorParityError):
+        check_parity(tampered, artifacts)
+
+
+def test_compiled_predictor_rejects_nan(bundle):
+    predictor = compile_predictor(bundle)
+    features = np.zeros(len(predictor.feature_names))
+    features[0] = np.nan
+
+    with pytest.raises(ValueError):
+        predictor.predict(features)
+
+
+def test_compiled_predictor_follows_registry_version():
+    predictor = compiled_predictor()
+
+    assert predictor.version == MODEL_REGISTRY.version
+    assert compiled_predictor() is predictor
@@ -0,0 +1,117 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from benchmarks import sales_entries
+from data_quality import QUALITY_RULES, check_data_quality, main
+
+QUALITY_FIXTURE = Path(__file__).parent / "data" / "train_quality.csv"
+FIXTURE_VIOLATIONS = {
+    "store_range": [7],
+    "state_holiday_vocabulary": [6],
+    "date_parseable": [2, 3, 4, 5],
+    "Open_binary": [10],
+    "Promo_binary": [11],
+    "SchoolHoliday_binary": [12],
+    "customers_non_negative": [9],
+    "day_of_week_range": [8],
+}
+BAD_ROWS = {
+    3: {"Store": 5000},
+    7: {"Store": "x", "Customers": -1},
+    40: {"StateHoliday": "d"},
+    41: {"Date": "2015-02-30"},
+    42: {"Date": "not a date", "Open": 2},
+    80: {"Promo": None, "DayOfWeek": 8},
+    81: {"SchoolHoliday": 0.5, "DayOfWeek": 0},
+    99: {"Customers": -3},
+}
+
+
+@pytest.fixture
+def train_file(tmp_path):
+    df_train = pd.DataFrame(sales_entries(100, seed=9))
+    df_train.insert(3, "Sales", 1000)
+    df_train = df_train.astype(object)
+    for row, values in BAD_ROWS.items():
+        for field, value in values.items():
+            df_train.loc[row, field] = value
+    train_file = tmp_path / "train.csv"
+    train_file.write_text(df_train.to_csv(index=False) + "\n\n")
+
+    return train_file
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_check_data_quality(train_file, workers):
+    report = check_data_quality(train_file, workers, block_size=300, max_samples=1)
+
+    violations = {
+        rule: (rule_report["violations"], rule_report["samples"][0]["row"])
+        for rule, rule_report in report["rules"].items()
+        if rule_report["violations"]
+    }
+    assert report["rows"] == 100
+    assert set(report["rules"]) == set(QUALITY_RULES)
+    assert violations == {
+        "store_range": (2, 3),
+        "customers_non_negative": (2, 7),
+        "state_holiday_vocabulary": (1, 40),
+        "date_parseable": (2, 41),
+        "Open_binary": (1, 42),
+        "Promo_binary": (1, 80),
+        "SchoolHoliday_binary": (1, 81),
+        "day_of_week_range": (2, 80),
+    }
+    assert report["rules"]["store_range"]["samples"][0]["Store"] == "5000"
+
+
+def test_check_data_quality_independent_of_blocks(train_file):
+    small = check_data_quality(train_file, workers=1, block_size=64)
+    large = check_data_quality(train_file, workers=1)
+
+    assert small == large
+    assert [sample["row"] for sample in small["rules"]["store_range"]["samples"]] == [
+        3,
+        7,
+    ]
+
+
+def test_missing_columns(tmp_path):
+    data_file = tmp_path / "train.csv"
+    data_file.write_text("Store,Date\n1,2015-07-31\n")
+
+    with pytest.raises(ValueError, match="missing columns: DayOfWeek"):
+        check_data_quality(data_file)
+
+
+def test_main_report_and_exit_status(train_file, tmp_path):
+    report_file = tmp_path / "report.json"
+    clean_file = tmp_path / "clean.csv"
+    pd.DataFrame(sales_entries(20)).to_csv(clean_file, index=False)
+
+    assert main([str(train_file), "--report", str(report_file), "--workers", "1"]) == 1
+    assert main([str(clean_file), "--report", str(report_file), "--workers", "1"]) == 0
+    assert json.loads(report_file.read_text())["rows"] == 20
+
+
+@pytest.mark.parametrize("rule", list(QUALITY_RULES))
+def test_fixture_rule_violations(rule):
+    report = check_data_quality(QUALITY_FIXTURE, workers=1)
+    rule_report = report["rules"][rule]
+
+    assert report["rows"] == 14
+    assert rule_report["violations"] == len(FIXTURE_VIOLATIONS[rule])
+    assert [sample["row"] for sample in rule_report["samples"]] == FIXTURE_VIOLATIONS[
+        rule
+    ]
+
+
+def test_date_parseable_blank_and_nat_dates():
+    report = check_data_quality(QUALITY_FIXTURE, workers=1)
+
+    assert [
+        sample["Date"] for sample in report["rules"]["date_parseable"]["samples"]
+    ] == ["", "NaT", "2015-02-30", "nan"]
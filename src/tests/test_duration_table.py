@@ -0,0 +1,105 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+from model_api.constants import STORE_FILE
+from model_api.duration_table import (
+    DurationIndex,
+    build_duration_table,
+    table_file,
+)
+from model_api.model_functions import compute_duration
+from model_api.store_index import StoreIndex
+
+
+@pytest.fixture
+def store_index(tmp_path):
+    store_file = tmp_path / "store.csv"
+    shutil.copy(STORE_FILE, store_file)
+
+    return StoreIndex(store_file=store_file)
+
+
+@pytest.fixture
+def duration_index(tmp_path):
+    return DurationIndex(
+        table_dir=tmp_path / "processed", first_year=2013, last_year=2015
+    )
+
+
+@pytest.mark.parametrize("store", [1, 2, 291, 1115])
+@pytest.mark.parametrize(
+    "date", ["2013-01-01", "2013-12-30", "2014-07-09", "2015-12-31"]
+)
+def test_store_durations_match_compute_duration(
+    store_index, duration_index, store, date
+):
+    period = pd.Period(date)
+    store_arrays = store_index.arrays()
+    record = store_index.lookup(store)
+
+    durations = duration_index.store_durations(
+        store_arrays, store, period.year, period.month, period.week
+    )
+
+    assert durations == pytest.approx(
+        (
+            compute_duration([period.week, period.year], record.promo2_since, freq="W"),
+            compute_duration(
+                [period.month, period.year], record.competition_open_since, freq="M"
+            ),
+        )
+    )
+
+
+def test_lookup_flags_dates_outside_the_table(store_index):
+    table = build_duration_table(store_index.arrays(), first_year=2013, last_year=2015)
+
+    promo2, competition, in_table = table.lookup(
+        np.array([2, 2, 2]),
+        year=np.array([2014, 2016, 2012]),
+        month=np.array([7, 1, 12]),
+        week=np.array([28, 1, 52]),
+    )
+
+    assert_array_equal(in_table, [True, False, False])
+    assert promo2[0] == table.store_durations(2, 2014, 7, 28)[0]
+    assert competition[0] == table.store_durations(2, 2014, 7, 28)[1]
+    assert np.isnan(promo2[1:]).all() and np.isnan(competition[1:]).all()
+    assert table.store_durations(2, 2016, 1, 1) is None
+
+
+def test_duration_table_is_written_and_memory_mapped(store_index, duration_index):
+    store_arrays = store_index.arrays()
+
+    table = duration_index.table(store_arrays)
+
+    assert table_file(
+        duration_index.table_dir, store_arrays.digest, 2013, 2015
+    ).exists()
+    assert isinstance(table.values, np.memmap)
+    assert duration_index.table(store_arrays) is table
+    assert (
+        DurationIndex(
+            table_dir=duration_index.table_dir, first_year=2013, last_year=2015
+        )
+        .table(store_arrays)
+        .values.shape
+        == table.values.shape
+    )
+
+
+def test_duration_table_follows_store_changes(store_index, duration_index):
+    table = duration_index.table(store_index.arrays())
+
+    df_store_info = pd.read_csv(store_index.store_file)
+    df_store_info.loc[df_store_info["Store"] == 2, "Promo2SinceYear"] = 2013
+    df_store_info.to_csv(store_index.store_file, index=False)
+    new_table = duration_index.table(store_index.load())
+
+    assert new_table.digest != table.digest
+    assert new_table.store_durations(2, 2014, 7, 28)[0] == 67
+    assert table.store_durations(2, 2014, 7, 28)[0] == 223
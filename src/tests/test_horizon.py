@@ -0,0 +1,120 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from numpy.testing import assert_array_equal
+
+from main import app
+from model_api.calendar_table import CALENDAR
+from model_api.horizon import horizon_frame, horizon_ordinals
+
+DEFAULTS = {
+    "Customers": 500,
+    "Open": 1,
+    "Promo": 0,
+    "StateHoliday": "0",
+    "SchoolHoliday": 0,
+}
+
+HORIZON_REQUEST = {
+    "Store": 2,
+    "StartDate": "2015-07-28",
+    "EndDate": "2015-08-10",
+    "Customers": 500,
+    "Promo": 1,
+    "Days": [
+        {"Date": "2015-08-02", "Open": 0, "Customers": 0},
+        {"Date": "2015-08-04", "StateHoliday": "a"},
+        {"Date": "2015-08-06", "Customers": -1},
+    ],
+}
+
+
+def test_horizon_ordinals():
+    ordinals = horizon_ordinals("2015-12-30", "2016-01-02")
+
+    assert_array_equal(
+        ordinals, [datetime.date(2015, 12, 30).toordinal() + day for day in range(4)]
+    )
+    assert len(horizon_ordinals("2015-08-01", "2015-08-01")) == 1
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date, message",
+    [
+        ("2015-08-10", "2015-08-01", "EndDate must not be before StartDate"),
+        ("2015-13-01", "2015-08-01", "incorrect StartDate entry"),
+        ("2015-08-01", "10/08/2015", "incorrect EndDate entry"),
+        ("2015-01-01", "2016-12-31", "horizon must not be longer than"),
+        ("2009-12-30", "2010-01-02", "supported calendar years"),
+    ],
+)
+def test_horizon_ordinals_rejected(start_date, end_date, message):
+    with pytest.raises(ValueError, match=message):
+        horizon_ordinals(start_date, end_date)
+
+
+def test_horizon_frame():
+    ordinals = horizon_ordinals("2015-08-01", "2015-08-07")
+
+    frame = horizon_frame(
+        2, ordinals, DEFAULTS, {ordinals[2]: {"Promo": 1, "StateHoliday": "b"}}
+    )
+
+    assert frame.dates[0] == "2015-08-01"
+    assert frame.dates[-1] == "2015-08-07"
+    assert frame.df_request["DayOfWeek"].tolist() == [6, 7, 1, 2, 3, 4, 5]
+    assert frame.df_request["Promo"].tolist() == [0, 0, 1, 0, 0, 0, 0]
+    assert frame.df_request["StateHoliday"].tolist()[1:4] == ["0", "b", "0"]
+    assert (frame.df_request["Store"] == 2).all()
+    assert_array_equal(
+        frame.calendar_features.day_of_week,
+        CALENDAR.ordinals_features(ordinals).day_of_week,
+    )
+
+    with pytest.raises(ValueError, match="within the horizon"):
+        horizon_frame(2, ordinals, DEFAULTS, {ordinals[-1] + 1: {"Promo": 1}})
+
+
+def test_horizon_matches_batch():
+    with TestClient(app) as client:
+        horizon = client.post("/predict/horizon", json=HORIZON_REQUEST).json()
+
+        overrides = {day["Date"]: day for day in HORIZON_REQUEST["Days"]}
+        batch_request = []
+        for date in horizon["dates"]:
+            entry = {
+                "Store": 2,
+                "DayOfWeek": datetime.date.fromisoformat(date).isoweekday(),
+                "Date": date,
+                **DEFAULTS,
+                "Customers": 500,
+                "Promo": 1,
+            }
+            entry.update(overrides.get(date, {}))
+            batch_request.append(entry)
+        batch = client.post("/predict/batch", json=batch_request).json()
+
+    assert len(horizon["dates"]) == 14
+    assert horizon["sales"] == batch["sales"]
+    assert horizon["errors"] == batch["errors"]
+    assert horizon["sales"][9] is None
+    assert horizon["errors"][0]["row"] == 9
+    assert horizon["errors"][0]["field"] == "Customers"
+
+
+@pytest.mark.parametrize(
+    "changes, detail",
+    [
+        ({"Store": 99999}, "Store number must be from"),
+        ({"EndDate": "2015-07-01"}, "EndDate must not be before StartDate"),
+        ({"Days": [{"Date": "2015-09-01", "Promo": 0}]}, "within the horizon"),
+        ({"Days": [{"Date": "01.08.2015"}]}, "incorrect Days Date entry"),
+    ],
+)
+def test_horizon_rejected(changes, detail):
+    with TestClient(app) as client:
+        response = client.post("/predict/horizon", json={**HORIZON_REQUEST, **changes})
+
+    assert response.status_code == 422
+    assert detail in response.json()["detail"]
@@ -0,0 +1,86 @@
+import datetime
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from load_test import (
+    ENDPOINTS,
+    TRAIN_FIRST_DATE,
+    TRAIN_LAST_DATE,
+    RequestFactory,
+    Sample,
+    compare_runs,
+    main,
+    parse_mix,
+    summarize,
+)
+from main import app
+
+
+def test_request_factory_bodies_are_accepted():
+    factory = RequestFactory(seed=3, batch_size=4, horizon_days=5)
+    entries = [factory.entry() for _ in range(200)]
+
+    for entry in entries:
+        date = datetime.date.fromisoformat(entry["Date"])
+        assert TRAIN_FIRST_DATE <= entry["Date"] <= TRAIN_LAST_DATE
+        assert entry["DayOfWeek"] == date.isoweekday()
+        assert entry["Open"] or entry["Customers"] == 0
+    assert len({entry["Store"] for entry in entries}) > 50
+
+    with TestClient(app) as client:
+        for endpoint, path in ENDPOINTS.items():
+            for body in factory.payloads(endpoint, count=5):
+                response = client.post(
+                    path, content=body, headers={"content-type": "application/json"}
+                )
+                assert response.status_code == 200, (endpoint, response.text)
+        assert len(json.loads(factory.payloads("batch", 1)[0])) == 4
+
+
+def test_request_factory_seeded():
+    assert RequestFactory(seed=1).payloads("predict", 10) == RequestFactory(
+        seed=1
+    ).payloads("predict", 10)
+
+
+def test_parse_mix():
+    assert parse_mix(["predict=8", "batch"]) == {"predict": 8.0, "batch": 1.0}
+    with pytest.raises(ValueError, match="unknown endpoint"):
+        parse_mix(["arrow=1"])
+    with pytest.raises(ValueError, match="must be positive"):
+        parse_mix(["predict=0"])
+
+
+def test_summarize():
+    samples = [Sample("predict", 0.5, 1.0, 200)]
+    samples += [Sample("predict", 1 + i / 100, (i + 1) / 1000, 200) for i in range(100)]
+    samples += [Sample("batch", 2.0, 0.2, 422), Sample("batch", 3.0, 0.3, 0)]
+
+    summary = summarize(samples, warmup=1.0, duration=3.0)
+
+    assert summary["requests"] == 102
+    assert summary["rps"] == 51.0
+    assert summary["errors"] == 2
+    assert summary["status"] == {"0": 1, "200": 100, "422": 1}
+    assert summary["latency_ms"]["p50"] == pytest.approx(51.5)
+    assert summary["latency_ms"]["max"] == pytest.approx(300)
+    assert summary["endpoints"]["predict"]["error_rate"] == 0
+    assert summary["endpoints"]["batch"]["error_rate"] == 1
+
+
+def test_main_against_local_server(tmp_path):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    arguments = ["--duration", "2", "--warmup", "0.5", "--concurrency", "2"]
+
+    assert main(arguments + ["--output", str(first), "--mix", "predict", "batch"]) == 0
+    assert main(arguments + ["--output", str(second), "--rate", "20"]) == 0
+
+    runs = [json.loads(path.read_text()) for path in [first, second]]
+    assert runs[0]["results"]["requests"] > 0
+    assert runs[0]["results"]["errors"] == 0
+    assert set(runs[0]["results"]["endpoints"]) == {"predict", "batch"}
+    assert runs[1]["results"]["requests"] == pytest.approx(30, abs=2)
+    assert runs[1]["environment"]["version"]
+    assert compare_runs(runs, ["first", "second"]).count("\n") == 2
@@ -0,0 +1,103 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from model_api.metrics import (
+    CallbackMetric,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+)
+
+SALES_DATA = {
+    "Store": 2,
+    "DayOfWeek": 1,
+    "Date": "2013-12-30",
+    "Customers": 500,
+    "Open": 1,
+    "Promo": 1,
+    "StateHoliday": "0",
+    "SchoolHoliday": 0,
+}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", ["stage"], buckets=[0.1, 1])
+    histogram.observe(0.05, "a")
+    histogram.observe(0.1, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(3, "a")
+
+    assert histogram.count("a") == 4
+    assert histogram.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="a",le="0.1"} 2',
+        'latency_seconds_bucket{stage="a",le="1"} 3',
+        'latency_seconds_bucket{stage="a",le="+Inf"} 4',
+        'latency_seconds_sum{stage="a"} 3.65',
+        'latency_seconds_count{stage="a"} 4',
+    ]
+
+
+def test_histogram_times_failing_blocks():
+    histogram = Histogram("latency_seconds", "Latency")
+    with pytest.raises(ValueError):
+        with histogram.time():
+            raise ValueError
+
+    assert histogram.count() == 1
+
+
+def test_counter_gauge_and_callback_rendering():
+    counter = Counter("requests_total", "Requests", ["path"])
+    counter.inc('/a"b')
+    counter.inc('/a"b', amount=2)
+    gauge = Gauge("in_flight", "In flight")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    callback = CallbackMetric(
+        "hits_total", "Hits", lambda: [(("x",), 5)], ["kind"], metric_type="counter"
+    )
+
+    registry = MetricsRegistry()
+    for metric in (counter, gauge, callback):
+        registry.register(metric)
+    with pytest.raises(ValueError):
+        registry.register(Gauge("in_flight", "Duplicate"))
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{path="/a\\"b"} 3' in lines
+    assert "in_flight 1" in lines
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{kind="x"} 5' in lines
+
+
+def test_metrics_endpoint():
+    with TestClient(app) as client:
+        client.post("/predict", json=SALES_DATA)
+        client.post("/predict", json={**SALES_DATA, "Customers": -1})
+        client.post("/predict/batch", json=[SALES_DATA, {**SALES_DATA, "Open": 2}])
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert (
+        'sales_api_requests_total{endpoint="/predict",method="POST",status="200"}'
+        in text
+    )
+    assert (
+        'sales_api_validation_rejections_total{endpoint="/predict",validator="check_customer_entry"}'
+        in text
+    )
+    assert (
+        'sales_api_validation_rejections_total{endpoint="/predict/batch",validator="check_binary_entry"}'
+        in text
+    )
+    assert 'sales_api_stage_duration_seconds_count{stage="validation"}' in text
+    assert 'sales_api_artifact_load_duration_seconds_count{artifact="model"}' in text
+    assert "\nsales_api_model_version " in text
+    assert "sales_api_stage_in_flight" in text
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import PredictionBatcher, SalesData, app
+from .test_batch_pipeline import POST_REQUESTS, single_row_prediction
+
+
+async def predict_concurrently(batcher, post_requests):
+    return await asyncio.gather(
+        *[batcher.predict(SalesData(**post_request)) for post_request in post_requests],
+        return_exceptions=True,
+    )
+
+
+def test_batcher_merges_concurrent_entries():
+    batcher = PredictionBatcher(max_batch_size=4, max_wait=0.05)
+    results = asyncio.run(predict_concurrently(batcher, POST_REQUESTS))
+
+    assert results == [
+        single_row_prediction(post_request) for post_request in POST_REQUESTS
+    ]
+    assert batcher.stats()["flushes"] == 2
+    assert batcher.stats()["largest_batch"] == 4
+
+
+def test_batcher_isolates_failing_entry():
+    batcher = PredictionBatcher(max_batch_size=8, max_wait=0.01)
+    post_requests = [POST_REQUESTS[0], {**POST_REQUESTS[1], "Store": 291}]
+    results = asyncio.run(predict_concurrently(batcher, post_requests))
+
+    assert results[0] == single_row_prediction(POST_REQUESTS[0])
+    assert isinstance(results[1], ValueError)
+
+
+def test_batcher_disabled():
+    assert not PredictionBatcher(max_batch_size=64, max_wait=0).enabled
+    assert not PredictionBatcher(max_batch_size=1, max_wait=0.01).enabled
+
+
+@pytest.mark.parametrize("post_request", POST_REQUESTS[:2])
+def test_predict_endpoint(post_request):
+    with TestClient(app) as client:
+        response = client.post("/predict", json=post_request)
+        repeat_response = client.post("/predict", json=post_request)
+        stats = client.get("/stats").json()
+
+    assert response.json() == {"sales": single_row_prediction(post_request)}
+    assert repeat_response.json() == response.json()
+    assert stats["cache"]["hits"] >= 1
+    assert stats["batching"]["flushes"] >= 1
+
+
+def test_predict_endpoint_store_without_competition_distance():
+    with TestClient(app) as client:
+        response = client.post("/predict", json={**POST_REQUESTS[0], "Store": 291})
+        batch = client.post(
+            "/predict/batch", json=[{**POST_REQUESTS[0], "Store": 291}]
+        ).json()
+
+    assert response.status_code == 422
+    assert response.json() == {"detail": batch["errors"][0]["detail"]}
+    assert batch["errors"][0]["detail"] == (
+        "Store has no CompetitionDistance to predict with"
+    )
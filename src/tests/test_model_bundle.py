@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+
+from model_api.constants import (
+    MODEL_DIR,
+    MODEL_FILES,
+    NUMERICAL_FEATURES,
+    ORDINAL_FEATURES,
+)
+from model_api.model_bundle import (
+    bundle_arrays,
+    convert_pickles,
+    load_bundle,
+    write_bundle,
+)
+from model_api.model_utils import MODEL_REGISTRY, load_model
+
+
+@pytest.fixture(scope="module")
+def artifacts():
+    return {name: load_model(MODEL_DIR / fname) for name, fname in MODEL_FILES.items()}
+
+
+def test_bundle_round_trip(artifacts, tmp_path):
+    bundle = load_bundle(write_bundle(bundle_arrays(artifacts), tmp_path / "b.bin"))
+
+    assert_array_equal(bundle.feature_names, artifacts["model"].feature_names_in_)
+    assert_array_equal(bundle.coef, artifacts["model"].coef_)
+    assert bundle.intercept == artifacts["model"].intercept_
+    assert not bundle.coef.flags.writeable
+    assert bundle.vocabularies["state_holidays"]["a"] == "public_holiday"
+
+
+def test_bundle_scalers_match_sklearn(artifacts):
+    bundle = MODEL_REGISTRY.get("bundle")
+    ordinal = pd.DataFrame(
+        [[1.0, 2013, 1, 1, 1], [1115, 2015, 52, 12, 7]], columns=ORDINAL_FEATURES
+    )
+    numerical = pd.DataFrame(
+        [[0.0, 20, 3, 0], [7000, 75000, 300, 250]], columns=NUMERICAL_FEATURES
+    )
+
+    assert_allclose(
+        bundle.scaler("minmax").transform(ordinal),
+        artifacts["minmax"].transform(ordinal),
+    )
+    assert_allclose(
+        bundle.scaler("standard").transform(numerical),
+        artifacts["standard"].transform(numerical),
+    )
+    assert list(bundle.minmax_features) == ORDINAL_FEATURES
+
+
+def test_converted_bundle_matches_shipped_bundle(tmp_path):
+    converted = load_bundle(convert_pickles(MODEL_DIR, tmp_path / "b.bin"))
+
+    assert_array_equal(converted.coef, MODEL_REGISTRY.get("bundle").coef)
+
+
+def test_bundle_rejects_foreign_files(artifacts, tmp_path):
+    with pytest.raises(ValueError):
+        load_bundle(MODEL_DIR / MODEL_FILES["model"])
+
+    arrays = bundle_arrays(artifacts)
+    arrays["vocabulary_store_type"] = arrays["vocabulary_store_type"][:2]
+    with pytest.raises(ValueError, match="store_type"):
+        load_bundle(write_bundle(arrays, tmp_path / "b.bin"))
+
+    arrays = bundle_arrays(artifacts)
+    arrays["format_version"] = np.array(99)
+    with pytest.raises(ValueError, match="format version"):
+        load_bundle(write_bundle(arrays, tmp_path / "b.bin"))
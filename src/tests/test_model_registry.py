@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pytest
+
+import main
+from model_api.constants import MODEL_DIR, MODEL_FILES, SERVING_MODEL_FILES
+from model_api.model_utils import MODEL_REGISTRY, ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    for fname in SERVING_MODEL_FILES.values():
+        shutil.copy(MODEL_DIR / fname, tmp_path / fname)
+
+    return ModelRegistry(model_dir=tmp_path, reload_interval=0.01)
+
+
+def test_registry_loads_once(registry):
+    bundle = registry.get("bundle")
+
+    assert registry.get("bundle") is bundle
+    assert registry.version == 1
+    assert registry.refresh() is False
+
+
+def test_registry_reloads_changed_file(registry, tmp_path):
+    bundle = registry.get("bundle")
+    bundle_file = tmp_path / SERVING_MODEL_FILES["bundle"]
+    stat = bundle_file.stat()
+    os.utime(bundle_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert registry.refresh() is True
+    assert registry.version == 2
+    assert registry.get("bundle") is not bundle
+
+
+def test_registry_keeps_snapshot_on_broken_file(registry, tmp_path):
+    snapshot = registry.snapshot()
+    bundle_file = tmp_path / SERVING_MODEL_FILES["bundle"]
+    bundle_file.write_bytes(bundle_file.read_bytes()[:100])
+
+    assert registry.refresh() is False
+    assert registry.snapshot() is snapshot
+    bundle_file.write_bytes(b"partial")
+
+    assert registry.refresh() is False
+    assert registry.snapshot() is snapshot
+
+
+def test_registry_loads_pickles(tmp_path):
+    for fname in MODEL_FILES.values():
+        shutil.copy(MODEL_DIR / fname, tmp_path / fname)
+    registry = ModelRegistry(model_files=MODEL_FILES, model_dir=tmp_path)
+
+    assert list(registry.get("model").feature_names_in_) == list(
+        ModelRegistry().get("bundle").feature_names
+    )
+
+
+def test_app_shares_the_registry():
+    assert main.MODEL_REGISTRY is MODEL_REGISTRY
@@ -0,0 +1,136 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from model_api.ndjson_stream import ndjson_chunks
+
+ENTRY = {
+    "Store": 2,
+    "DayOfWeek": 1,
+    "Date": "2013-12-30",
+    "Customers": 500,
+    "Open": 1,
+    "Promo": 1,
+    "StateHoliday": "0",
+    "SchoolHoliday": 0,
+}
+
+
+async def collect_chunks(parts, **kwargs):
+    async def body():
+        for part in parts:
+            yield part
+
+    return [chunk async for chunk in ndjson_chunks(body(), **kwargs)]
+
+
+def test_chunks_split_across_body_parts():
+    body = b'{"a": 1}\n\n{"a": 2}\nnot json\n[3]\n{"a": 4}'
+
+    chunks = asyncio.run(
+        collect_chunks([body[:5], body[5:13], body[13:], b""], chunk_size=2)
+    )
+
+    records = [record for chunk in chunks for record in chunk]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [record.line for record in records] == [1, 3, 4, 5, 6]
+    assert [record.record for record in records] == [
+        {"a": 1},
+        {"a": 2},
+        None,
+        None,
+        {"a": 4},
+    ]
+    assert records[2].error == "line is not valid JSON"
+    assert records[3].error == "line must be a JSON object"
+
+
+def test_long_lines_dropped():
+    long_line = b'{"a": "' + b"x" * 100 + b'"}'
+
+    chunks = asyncio.run(
+        collect_chunks(
+            [
+                b'{"a": 1}\n',
+                long_line[:60],
+                long_line[60:] + b'\n{"a": 2}\n',
+                long_line,
+            ],
+            max_line_bytes=50,
+        )
+    )
+
+    records = chunks[0]
+    assert [record.line for record in records] == [1, 2, 3, 4]
+    assert records[1].error == "line is longer than 50 bytes"
+    assert records[2].record == {"a": 2}
+    assert records[3].error == "line is longer than 50 bytes"
+
+
+def test_stream_endpoint_matches_batch():
+    entries = [
+        {**ENTRY, "Store": store % 1115 + 1, "Customers": store}
+        for store in range(2500)
+    ]
+    entries[10] = {**entries[10], "Store": 99999}
+    entries[1500] = {**entries[1500], "DayOfWeek": 3}
+    body = "\n".join(json.dumps(entry) for entry in entries) + "\n"
+
+    with TestClient(app) as client:
+        response = client.post("/predict/stream", content=body.encode())
+        batch = client.post("/predict/batch", json=entries).json()
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [result["line"] for result in results] == list(range(1, 2501))
+    assert [result["sales"] for result in results] == batch["sales"]
+    assert results[10]["errors"][0]["field"] == "Store"
+    assert results[1500]["warnings"][0]["field"] == "DayOfWeek"
+
+
+def test_stream_endpoint_inline_errors():
+    lines = [
+        json.dumps(ENTRY),
+        "{not json",
+        json.dumps({**ENTRY, "Customers": "many"}),
+        json.dumps({key: value for key, value in ENTRY.items() if key != "Date"}),
+        json.dumps({**ENTRY, "Customers": "500", "Open": True}),
+    ]
+
+    with TestClient(app) as client:
+        response = client.post("/predict/stream", content="\n".join(lines).encode())
+        sales = client.post("/predict", json=ENTRY).json()["sales"]
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert results[0] == {"line": 1, "sales": sales}
+    assert results[1]["errors"] == [
+        {"field": "line", "detail": "line is not valid JSON"}
+    ]
+    assert results[2]["errors"][0]["field"] == "Customers"
+    assert results[3]["errors"] == [{"field": "Date", "detail": "field required"}]
+    assert results[4] == {"line": 5, "sales": sales}
+
+
+@pytest.mark.parametrize("date", ["", "NaT"])
+def test_stream_endpoint_unparsed_date(date):
+    lines = [json.dumps(ENTRY), json.dumps({**ENTRY, "Date": date}), json.dumps(ENTRY)]
+
+    with TestClient(app) as client:
+        response = client.post("/predict/stream", content="\n".join(lines).encode())
+        sales = client.post("/predict", json=ENTRY).json()["sales"]
+
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert results == [
+        {"line": 1, "sales": sales},
+        {
+            "line": 2,
+            "sales": None,
+            "errors": [{"field": "Date", "detail": "incorrect Date entry"}],
+        },
+        {"line": 3, "sales": sales},
+    ]
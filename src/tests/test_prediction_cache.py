@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from model_api.prediction_cache import PredictionCache, sales_data_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_sales_data_key_normalizes_date():
+    entry = dict(
+        Store=1,
+        DayOfWeek=3,
+        Customers=10,
+        Open=1,
+        Promo=0,
+        StateHoliday="0",
+        SchoolHoliday=0,
+    )
+
+    assert sales_data_key(SimpleNamespace(Date="2014-7-9", **entry)) == sales_data_key(
+        SimpleNamespace(Date="2014-07-09", **entry)
+    )
+    assert (
+        sales_data_key(SimpleNamespace(Date="not a date", **entry))[2] == "not a date"
+    )
+
+
+def test_cache_lru_eviction(clock):
+    cache = PredictionCache(max_size=2, ttl=60, clock=clock)
+    cache.put("a", 1.0)
+    cache.put("b", 2.0)
+    assert cache.get("a") == 1.0
+    cache.put("c", 3.0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.0
+    assert cache.get("c") == 3.0
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_ttl_expiration(clock):
+    cache = PredictionCache(max_size=2, ttl=60, clock=clock)
+    cache.put("a", 1.0)
+    clock.now = 59.0
+    assert cache.get("a") == 1.0
+    clock.now = 60.0
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_invalidated_by_token(clock):
+    cache = PredictionCache(max_size=2, ttl=60, clock=clock)
+    cache.put("a", 1.0, token=(1, 1))
+    assert cache.get("a", token=(1, 1)) == 1.0
+
+    assert cache.get("a", token=(2, 1)) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_cache_disabled(clock):
+    cache = PredictionCache(max_size=0, ttl=60, clock=clock)
+    cache.put("a", 1.0)
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
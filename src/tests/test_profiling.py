@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import REQUEST_PROFILER, ProfilingMiddleware, app
+from model_api.profiling import RequestProfiler, safe_request_id
+
+SALES_DATA = {
+    "Store": 2,
+    "DayOfWeek": 1,
+    "Date": "2013-12-30",
+    "Customers": 500,
+    "Open": 1,
+    "Promo": 1,
+    "StateHoliday": "0",
+    "SchoolHoliday": 0,
+}
+
+
+def capture(profiler, request_id):
+    profile = profiler.begin(request_id, "header")
+    assert profiler.begin("other", "header") is None
+    sorted([str(value) for value in range(1000)])
+    profiler.end(profile)
+
+    return profiler.save(profile, {"method": "POST", "path": "/predict"})
+
+
+def test_trigger(tmp_path):
+    profiler = RequestProfiler(profile_dir=tmp_path, sample_rate=0.0)
+
+    assert profiler.trigger({b"x-profile": b"1"}) == "header"
+    assert profiler.trigger({b"x-profile": b"0"}) is None
+    assert profiler.trigger({}) is None
+    assert RequestProfiler(profile_dir=tmp_path, sample_rate=1.0).trigger({}) == (
+        "sample"
+    )
+
+
+def test_safe_request_id():
+    assert safe_request_id("abc-123_x.y") == "abc-123_x.y"
+    assert safe_request_id("../../etc/passwd") == "etcpasswd"
+    assert len(safe_request_id("/")) == 32
+
+
+def test_captures_rotate_and_summarize(tmp_path):
+    profiler = RequestProfiler(profile_dir=tmp_path, max_captures=2)
+    for request_id in ("first", "second", "third"):
+        capture(profiler, request_id)
+
+    captures = profiler.captures()
+    assert [meta["request_id"] for meta in captures] == ["second", "third"]
+    assert len(list(tmp_path.iterdir())) == 6
+
+    summary = profiler.summary(top=5)
+    assert len(summary["captures"]) == 2
+    assert len(summary["top_functions"]) == 5
+    assert summary["top_functions"][0]["cumulative"] >= (
+        summary["top_functions"][-1]["cumulative"]
+    )
+    assert summary["top_allocations"]
+    with pytest.raises(ValueError):
+        profiler.summary(sort="calls")
+
+
+def test_profiled_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(REQUEST_PROFILER, "profile_dir", tmp_path)
+    profiled_app = ProfilingMiddleware(app, profiler=REQUEST_PROFILER)
+
+    with TestClient(profiled_app) as client:
+        plain = client.post("/predict", json=SALES_DATA)
+        profiled = client.post(
+            "/predict",
+            json={**SALES_DATA, "Customers": 501},
+            headers={"x-profile": "1", "x-request-id": "spike-42"},
+        )
+        summary = client.get("/profiles/summary", params={"top": 50}).json()
+
+    assert "x-profile-id" not in plain.headers
+    assert profiled.status_code == 200
+    assert profiled.headers["x-profile-id"] == "spike-42"
+    assert [meta["request_id"] for meta in summary["captures"]] == ["spike-42"]
+    assert summary["captures"][0]["status"] == 200
+    assert any(
+        "reshape_inputs_batch_pipeline" in function["function"]
+        or "reshape_inputs_pipeline" in function["function"]
+        for function in summary["top_functions"]
+    )
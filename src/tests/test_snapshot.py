@@ -0,0 +1,157 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from numpy.testing import assert_allclose, assert_array_equal
+
+from main import app, reshape_sales_frame
+from model_api.calendar_table import CALENDAR
+from model_api.compiled_model import compiled_predictor
+from model_api.constants import SALES_DATA_FIELDS
+from model_api.snapshot import (
+    Scenario,
+    SnapshotCache,
+    chain_snapshot,
+    snapshot_features,
+)
+from model_api.store_index import STORE_INDEX
+
+SNAPSHOT_REQUEST = {"Date": "2015-08-03", "Customers": 600, "Promo": 1}
+
+
+@pytest.mark.parametrize(
+    "date, scenario",
+    [
+        ("2015-08-03", Scenario(600, Promo=1)),
+        ("2013-12-25", Scenario(0, Open=0, StateHoliday="c", SchoolHoliday=1)),
+        ("2034-06-30", Scenario(850, StateHoliday="a")),
+    ],
+)
+def test_snapshot_features_match_batch_pipeline(date, scenario):
+    store_arrays = STORE_INDEX.arrays()
+    predictor = compiled_predictor()
+
+    stores, features = snapshot_features(
+        store_arrays, predictor.feature_names, CALENDAR.fast_ordinal(date), scenario
+    )
+    df_request = pd.DataFrame(
+        {
+            "Store": stores,
+            "DayOfWeek": CALENDAR.date_features(date)[3],
+            "Date": date,
+            **scenario._asdict(),
+        },
+        columns=SALES_DATA_FIELDS,
+    )
+    reshaped_inputs = reshape_sales_frame(df_request)
+
+    assert_array_equal(stores, np.flatnonzero(store_arrays.known))
+    assert_allclose(
+        features, reshaped_inputs[predictor.feature_names].to_numpy(dtype=np.float64)
+    )
+
+
+def test_chain_snapshot_skips_unpredictable_stores():
+    store_arrays = STORE_INDEX.arrays()
+
+    snapshot = chain_snapshot(
+        "2015-08-03", Scenario(600), store_arrays, compiled_predictor()
+    )
+
+    missing = np.isnan(store_arrays.competition_distance[snapshot.stores])
+    assert snapshot.day_of_week == 1
+    assert_array_equal(np.isnan(snapshot.sales), missing)
+    with pytest.raises(ValueError, match="calendar years"):
+        chain_snapshot("2040-01-01", Scenario(600), store_arrays, compiled_predictor())
+
+
+def test_snapshot_cache():
+    cache = SnapshotCache(max_size=2)
+
+    first, cached = cache.get("2015-08-03", Scenario(600))
+    assert not cached
+    again, cached = cache.get("2015-08-03", Scenario(600))
+    assert cached
+    assert again is first
+
+    cache.get("2015-08-04", Scenario(600))
+    cache.get("2015-08-03", Scenario(600, Promo=1))
+    assert cache.stats() == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+    }
+    assert not cache.get("2015-08-03", Scenario(600))[1]
+
+    disabled = SnapshotCache(max_size=0)
+    assert not disabled.get("2015-08-03", Scenario(600))[1]
+    assert not disabled.get("2015-08-03", Scenario(600))[1]
+
+
+def test_snapshot_computed_once_by_concurrent_requests():
+    cache = SnapshotCache()
+    results = []
+
+    def request():
+        results.append(cache.get("2014-03-10", Scenario(420)))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 7
+    assert len({id(snapshot) for snapshot, _ in results}) == 1
+
+
+def test_snapshot_endpoint_matches_batch():
+    with TestClient(app) as client:
+        snapshot = client.post("/predict/snapshot", json=SNAPSHOT_REQUEST).json()
+        cached = client.post("/predict/snapshot", json=SNAPSHOT_REQUEST).json()
+        batch = client.post(
+            "/predict/batch",
+            json=[
+                {
+                    "Store": store,
+                    "DayOfWeek": 1,
+                    "Date": "2015-08-03",
+                    "Customers": 600,
+                    "Open": 1,
+                    "Promo": 1,
+                    "StateHoliday": "0",
+                    "SchoolHoliday": 0,
+                }
+                for store in snapshot["Store"]
+            ],
+        ).json()
+        stats = client.get("/stats").json()
+
+    assert len(snapshot["Store"]) == len(snapshot["sales"]) == 1115
+    assert snapshot["DayOfWeek"] == 1
+    assert cached["cached"]
+    assert cached["sales"] == snapshot["sales"] == batch["sales"]
+    assert stats["snapshots"]["hits"] >= 1
+
+
+@pytest.mark.parametrize(
+    "request_body, detail",
+    [
+        ({"Date": "03.08.2015", "Customers": 600}, "incorrect Date entry"),
+        ({"Date": "2015-08-03", "Customers": -1}, "Number of customers"),
+        ({"Date": "2015-08-03", "Customers": 600, "Promo": 2}, "must be binary"),
+        ({"Date": "2015-08-03", "Customers": 600, "StateHoliday": "x"}, "StateHoliday"),
+        ({"Date": "2040-08-03", "Customers": 600}, "calendar years"),
+    ],
+)
+def test_snapshot_rejected(request_body, detail):
+    with TestClient(app) as client:
+        response = client.post("/predict/snapshot", json=request_body)
+
+    assert response.status_code == 422
+    assert detail in response.json()["detail"]
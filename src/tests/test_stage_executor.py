@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+from model_api.stage_executor import StageExecutor
+
+
+def add(left, right):
+    return left + right
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_stage_executor_modes(mode):
+    executor = StageExecutor(mode=mode, max_workers=2)
+    try:
+        result = asyncio.run(executor.run("predict", add, 1, 2))
+    finally:
+        executor.shutdown()
+
+    assert result == 3
+    assert executor.stats()["stages"]["predict"] == {
+        "in_flight": 0,
+        "peak_in_flight": 1,
+        "completed": 1,
+    }
+
+
+def test_stage_executor_keeps_event_loop_free():
+    executor = StageExecutor(mode="thread", max_workers=2)
+    release = threading.Event()
+
+    async def scenario():
+        slow_stage = asyncio.ensure_future(executor.run("predict", release.wait, 5))
+        await asyncio.sleep(0.01)
+        depth = executor.stats()["stages"]["predict"]["in_flight"]
+        release.set()
+        await slow_stage
+        return depth
+
+    try:
+        assert asyncio.run(scenario()) == 1
+    finally:
+        executor.shutdown()
+
+
+def test_stage_executor_unknown_mode():
+    with pytest.raises(ValueError):
+        StageExecutor(mode="fiber")
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+
+from main import STARTUP, app
+from model_api.startup import StartupTracker, process_uptime
+
+
+def fail():
+    raise ValueError("missing artifact")
+
+
+def test_warm_up_marks_ready():
+    tracker = StartupTracker(uptime=iter([1.0, 2.0, 3.0]).__next__)
+    calls = []
+
+    assert tracker.warm_up(
+        {"a": lambda: calls.append("a"), "b": lambda: calls.append("b")}
+    )
+    tracker.mark("ready")
+
+    report = tracker.report()
+    assert calls == ["a", "b"]
+    assert report["ready"] is True
+    assert report["error"] is None
+    assert report["milestones"] == {"warmup_started": 1.0, "ready": 2.0}
+    assert set(report["warmup"]) == {"a", "b", "total"}
+
+
+def test_failed_warm_up_is_not_ready():
+    tracker = StartupTracker()
+    calls = []
+
+    assert not tracker.warm_up({"a": fail, "b": lambda: calls.append("b")})
+    assert not tracker.ready
+    assert tracker.error == "a: ValueError('missing artifact')"
+    assert calls == []
+    assert "ready" not in tracker.milestones
+
+
+def test_start_runs_warm_up_once():
+    tracker = StartupTracker()
+    calls = []
+
+    tracker.start({"a": lambda: calls.append("a")})
+    assert tracker.wait(timeout=10)
+    tracker.start({"a": lambda: calls.append("a")})
+    tracker.wait(timeout=10)
+
+    assert calls == ["a"]
+
+
+def test_process_uptime():
+    assert 0 < process_uptime() < 24 * 3600
+
+
+def test_ready_endpoint(monkeypatch):
+    with TestClient(app) as client:
+        assert STARTUP.wait(timeout=60)
+        response = client.get("/ready")
+        metrics = client.get("/metrics").text
+
+    report = response.json()
+    assert response.status_code == 200
+    assert report["ready"] is True
+    assert {"model", "store_index", "duration_table", "first_prediction"} <= set(
+        report["warmup"]
+    )
+    assert report["milestones"]["imported"] <= report["milestones"]["ready"]
+    assert "sales_api_ready 1" in metrics
+    assert 'sales_api_warmup_phase_seconds{phase="first_prediction"}' in metrics
+
+    monkeypatch.setattr(STARTUP, "ready", False)
+    assert TestClient(app).get("/ready").status_code == 503
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+
+from model_api.constants import STORE_FILE
+from model_api.store_index import StoreIndex
+
+
+@pytest.fixture
+def store_index(tmp_path):
+    store_file = tmp_path / "store.csv"
+    shutil.copy(STORE_FILE, store_file)
+
+    return StoreIndex(store_file=store_file)
+
+
+@pytest.mark.parametrize(
+    "store, expected_results",
+    [
+        (
+            1,
+            {
+                "competition_distance": 1270,
+                "promo2": 0,
+                "promo_interval": [1, 0, 0, 0],
+                "promo2_since": [0, 0],
+                "competition_open_since": [9, 2008],
+                "assortment": [1, 0, 0],
+                "store_type": [0, 0, 1, 0],
+            },
+        ),
+        (
+            2,
+            {
+                "competition_distance": 570,
+                "promo2": 1,
+                "promo_interval": [0, 1, 0, 0],
+                "promo2_since": [13, 2010],
+                "competition_open_since": [11, 2007],
+                "assortment": [1, 0, 0],
+                "store_type": [1, 0, 0, 0],
+            },
+        ),
+    ],
+)
+def test_store_lookup(store_index, store, expected_results):
+    record = store_index.lookup(store)._asdict()
+
+    for field, expected in expected_results.items():
+        assert_array_equal(record[field], expected)
+
+
+def test_store_membership(store_index):
+    assert store_index.contains(1)
+    assert store_index.contains(1115)
+    assert not store_index.contains(0)
+    assert not store_index.contains(1116)
+    assert not store_index.contains(-1)
+    with pytest.raises(KeyError):
+        store_index.lookup(1116)
+
+
+def test_store_index_rebuilds_changed_file(store_index):
+    assert np.isnan(store_index.lookup(291).competition_distance)
+    assert store_index.refresh() is False
+
+    df_store_info = pd.read_csv(store_index.store_file)
+    df_store_info.loc[df_store_info["Store"] == 291, "CompetitionDistance"] = 100
+    df_store_info.to_csv(store_index.store_file, index=False)
+    stat = store_index.store_file.stat()
+    os.utime(store_index.store_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert store_index.refresh() is True
+    assert store_index.version == 2
+    assert store_index.lookup(291).competition_distance == 100
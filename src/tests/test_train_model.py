@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+from sklearn.linear_model import Ridge, RidgeCV
+from sklearn.model_selection import PredefinedSplit
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from model_api.constants import NUMERICAL_FEATURES, ORDINAL_FEATURES
+from model_api.model_bundle import load_bundle
+from model_api.model_utils import MODEL_REGISTRY
+from train_model import main, split_rows, train_model
+
+ALPHAS = [1e-2, 1, 100, 10000]
+
+
+@pytest.fixture(scope="module")
+def processed_data(tmp_path_factory):
+    feature_names = list(MODEL_REGISTRY.get("bundle").feature_names)
+    rng = np.random.default_rng(7)
+    size = 3000
+    df_data = pd.DataFrame(
+        rng.integers(0, 2, size=(size, len(feature_names))).astype(float),
+        columns=feature_names,
+    )
+    df_data[ORDINAL_FEATURES] = rng.integers(1, 60, size=(size, len(ORDINAL_FEATURES)))
+    df_data[NUMERICAL_FEATURES] = rng.normal(
+        [600, 3000, 20, 40], [200, 2500, 15, 30], size=(size, len(NUMERICAL_FEATURES))
+    )
+    df_data["Sales"] = (
+        df_data.to_numpy() @ rng.normal(0, 3, size=len(feature_names))
+        + rng.normal(0, 40, size=size)
+        + 5000
+    )
+    df_data.insert(0, "Id", [f"({idx % 1115 + 1}, '{idx}')" for idx in range(size)])
+    data_file = tmp_path_factory.mktemp("data") / "processed_data.csv"
+    df_data.to_csv(data_file, index=False)
+
+    return data_file, df_data, feature_names
+
+
+def sklearn_fit(df_data, feature_names, folds):
+    fold = split_rows(df_data["Id"], 0.3, folds)
+    df_train = df_data[fold >= 0]
+    minmax = MinMaxScaler().fit(df_train[ORDINAL_FEATURES])
+    standard = StandardScaler().fit(df_train[NUMERICAL_FEATURES])
+
+    def scaled(df_rows):
+        df_rows = df_rows[feature_names].copy()
+        df_rows[ORDINAL_FEATURES] = minmax.transform(df_rows[ORDINAL_FEATURES])
+        df_rows[NUMERICAL_FEATURES] = standard.transform(df_rows[NUMERICAL_FEATURES])
+        return df_rows.to_numpy()
+
+    ridge_cv = RidgeCV(alphas=ALPHAS, cv=PredefinedSplit(fold[fold >= 0])).fit(
+        scaled(df_train), df_train["Sales"]
+    )
+    ridge = Ridge(alpha=ridge_cv.alpha_).fit(scaled(df_train), df_train["Sales"])
+
+    return minmax, standard, ridge_cv, ridge, scaled(df_data[fold < 0])
+
+
+def test_split_rows_is_stable():
+    ids = pd.Series([f"({idx}, '2015-07-31')" for idx in range(20000)])
+
+    fold = split_rows(ids, 0.3, 10)
+
+    assert_array_equal(split_rows(ids[5000:], 0.3, 10), fold[5000:])
+    assert abs((fold < 0).mean() - 0.3) < 0.02
+    assert fold.max() == 9
+    assert np.ptp(np.bincount(fold[fold >= 0])) < 300
+
+
+def test_train_model_matches_sklearn(processed_data):
+    data_file, df_data, feature_names = processed_data
+    minmax, standard, ridge_cv, ridge, x_test = sklearn_fit(df_data, feature_names, 5)
+
+    result = train_model(data_file, chunksize=700, alphas=ALPHAS, folds=5)
+
+    arrays = result.arrays
+    assert result.alpha == ridge_cv.alpha_
+    assert result.cv_scores[result.alpha] == pytest.approx(ridge_cv.best_score_)
+    assert_array_equal(arrays["feature_names"], feature_names)
+    assert_allclose(arrays["minmax_scale"], minmax.scale_)
+    assert_allclose(arrays["minmax_min"], minmax.min_)
+    assert_allclose(arrays["standard_mean"], standard.mean_)
+    assert_allclose(arrays["standard_scale"], standard.scale_)
+    assert_allclose(arrays["coef"], ridge.coef_, rtol=1e-6, atol=1e-9)
+    assert arrays["intercept"][0] == pytest.approx(ridge.intercept_)
+    y_test = df_data.loc[split_rows(df_data["Id"], 0.3, 5) < 0, "Sales"]
+    residual = y_test - ridge.predict(x_test)
+    assert result.test_rows == len(y_test)
+    assert result.test_rmse == pytest.approx(np.sqrt(np.mean(residual**2)))
+
+
+def test_train_model_independent_of_chunksize(processed_data):
+    data_file = processed_data[0]
+
+    small = train_model(data_file, chunksize=101, alphas=ALPHAS, folds=4)
+    large = train_model(data_file, chunksize=10000, alphas=ALPHAS, folds=4)
+
+    assert small.alpha == large.alpha
+    assert_allclose(small.arrays["coef"], large.arrays["coef"], rtol=1e-9)
+    assert small.test_r2 == pytest.approx(large.test_r2)
+
+
+def test_train_model_rejects_missing_features(processed_data, tmp_path):
+    data_file = tmp_path / "processed_data.csv"
+    processed_data[1].drop(columns="Customers").to_csv(data_file, index=False)
+
+    with pytest.raises(ValueError, match="missing feature columns: Customers"):
+        train_model(data_file)
+    with pytest.raises(ValueError, match="at least 2 folds"):
+        train_model(processed_data[0], folds=1)
+
+
+def test_main_writes_loadable_bundle(processed_data, tmp_path):
+    output = tmp_path / "model_bundle.bin"
+
+    main(["--data", str(processed_data[0]), "--output", str(output), "--alphas", "1"])
+
+    bundle = load_bundle(output)
+    assert_array_equal(bundle.feature_names, processed_data[2])
+    assert bundle.vocabularies == MODEL_REGISTRY.get("bundle").vocabularies
+    assert bundle.intercept != 0
@@ -2,9 +2,9 @@ import pandas as pd
 import pytest
 
 
-from ..model_api.model_functions import compute_duration, scale_inputs, classify_match
+from model_api.model_functions import compute_duration, scale_inputs, classify_match
 
-from ..model_api.constants import (
+from model_api.constants import (
     STATE_HOLIDAYS,
     STORE_TYPE,
     ASSORT_TYPE,
@@ -12,10 +12,10 @@ from ..model_api.constants import (
     NUMERICAL_FEATURES,
     PROMO_TWO_WEEKYEAR,
     COMPET_OPEN_MONTHYEAR,
-    BASE_DIR,
 )
 
-from ..model_api.model_pipeline import (
+from model_api.model_utils import MODEL_REGISTRY
+from model_api.model_pipeline import (
     reshape_inputs_pipeline,
     model_prediction_pipeline,
 )
@@ -308,10 +308,7 @@ def test_scale_inputs(df_vals, feature_list, scaler_type, expected_results):
     ],
 )
 def test_integration_modelling_pipeline(post_request, expected_results):
-    df = pd.read_csv(BASE_DIR / "data" / "processed_data.csv", nrows=1).drop(
-        ["Id", "Sales"], axis=1
-    )
-    df_request = pd.Series(index=df.columns)
+    df_request = pd.Series(index=MODEL_REGISTRY.get("bundle").feature_names)
 
     df_request["Store"] = post_request["Store"]
     df_request["DayOfWeek"] = post_request["DayOfWeek"]
@@ -0,0 +1,43 @@
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from model_api.validation import validate_sales_frame
+from .test_batch_pipeline import POST_REQUESTS
+
+
+def test_validate_sales_frame_reports_every_failing_row():
+    df_request = pd.DataFrame(
+        [
+            POST_REQUESTS[0],
+            {**POST_REQUESTS[0], "Store": 1116, "DayOfWeek": 8},
+            {**POST_REQUESTS[0], "Customers": -1, "SchoolHoliday": 2},
+            {**POST_REQUESTS[0], "Date": "2014-13-45", "StateHoliday": "d"},
+            {**POST_REQUESTS[0], "Open": 3, "Promo": -1},
+            {**POST_REQUESTS[0], "Store": 291},
+        ]
+    )
+    results = validate_sales_frame(df_request)
+
+    assert_array_equal(results.valid, [True, False, False, False, False, False])
+    assert [(error["row"], error["field"]) for error in results.errors] == [
+        (1, "Store"),
+        (1, "DayOfWeek"),
+        (2, "Customers"),
+        (2, "SchoolHoliday"),
+        (3, "Date"),
+        (3, "StateHoliday"),
+        (4, "Open"),
+        (4, "Promo"),
+        (5, "Store"),
+    ]
+    assert results.errors[0]["detail"] == "Store number must be from 1 to 1115"
+
+
+def test_validate_sales_frame_all_valid():
+    results = validate_sales_frame(pd.DataFrame(POST_REQUESTS))
+
+    assert results.valid.all()
+    assert results.errors == []
+    assert results.warnings == [
+        {"row": 4, "field": "DayOfWeek", "detail": "DayOfWeek does not match Date"}
+    ]
@@ -0,0 +1,81 @@
+import os
+
+from fastapi.testclient import TestClient
+
+from main import app
+from model_api.workers import (
+    MemoryTracker,
+    available_cpus,
+    cgroup_cpu_limit,
+    process_memory,
+    worker_count,
+)
+
+SMAPS_ROLLUP = """55d4c8a2e000-7ffd4a5f1000 ---p 00000000 00:00 0    [rollup]
+Rss:               69052 kB
+Pss:               27305 kB
+Shared_Clean:      55000 kB
+Shared_Dirty:        516 kB
+Private_Clean:      1000 kB
+Private_Dirty:     12536 kB
+Swap:                  0 kB
+"""
+
+
+def test_cgroup_cpu_limit(tmp_path):
+    assert cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("150000\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 0.5
+    assert available_cpus(tmp_path) == 1
+
+
+def test_worker_count():
+    assert worker_count(configured=3) == 3
+    assert worker_count(configured=None, cpus=4, workers_per_cpu=1.0) == 4
+    assert worker_count(configured=None, cpus=4, workers_per_cpu=0.5) == 2
+    assert worker_count(configured=None, cpus=1, workers_per_cpu=0.5) == 1
+    assert 1 <= worker_count(configured=None) <= (os.cpu_count() or 1)
+
+
+def test_process_memory(tmp_path):
+    smaps_file = tmp_path / "smaps_rollup"
+    smaps_file.write_text(SMAPS_ROLLUP)
+
+    memory = process_memory(smaps_file)
+
+    assert memory["rss"] == 69052 * 1024
+    assert memory["pss"] == 27305 * 1024
+    assert memory["private"] == 13536 * 1024
+    assert memory["shared"] == 55516 * 1024
+    assert list(process_memory(tmp_path / "missing")) == ["max_rss"]
+
+
+def test_memory_growth():
+    tracker = MemoryTracker()
+    tracker.mark_baseline()
+    ballast = b"x" * (32 * 1024 * 1024)
+
+    report = tracker.report()
+
+    assert report["pid"] == os.getpid()
+    assert report["growth_bytes"]
+    assert max(report["growth_bytes"].values()) >= 16 * 1024 * 1024
+    del ballast
+
+
+def test_memory_reported():
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+        metrics = client.get("/metrics").text
+
+    assert stats["memory"]["pid"] == os.getpid()
+    assert stats["memory"]["bytes"]
+    assert "sales_api_process_memory_bytes{" in metrics
@@ -0,0 +1,450 @@
+"""Fit the scalers and the Ridge model on the processed training data in chunks, writing a model bundle.
+
+Usage: PYTHONPATH=src python -m train_model [--data data/processed_data.csv] [--output models/model_bundle.bin]
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from model_api.constants import (
+    MODEL_BUNDLE_FILE,
+    MODEL_DIR,
+    NUMERICAL_FEATURES,
+    ORDINAL_FEATURES,
+    PROCESSED_DATA_FILE,
+)
+from model_api.model_bundle import fitted_bundle_arrays, write_bundle
+
+logger = logging.getLogger("train_model")
+
+ID_COLUMN = "Id"
+TARGET_COLUMN = "Sales"
+DEFAULT_ALPHAS = [1e-4, 1e-3, 1e-2, 1e-1, 1, 5, 10]
+DEFAULT_FOLDS = 10
+DEFAULT_TEST_SIZE = 0.3
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class MomentStatistics:
+    """Row count, column sums and cross products of rows shifted by a fixed vector.
+
+    These are the sufficient statistics of a linear least squares fit. Statistics of disjoint row sets add up, so they are accumulated chunk by chunk and combined without revisiting the rows. Shifting the rows by a value close to their mean keeps the cross products from losing precision.
+    """
+
+    def __init__(self, width: int):
+        """Initialize the statistics of an empty row set.
+
+        :param width: number of columns
+        :type width: int
+        """
+        self.count = 0
+        self.total = np.zeros(width)
+        self.cross = np.zeros((width, width))
+
+    def update(self, rows: np.ndarray):
+        """Add shifted rows to the statistics.
+
+        :param rows: shifted rows, one per sample
+        :type rows: np.ndarray
+        """
+        self.count += len(rows)
+        self.total += rows.sum(axis=0)
+        self.cross += rows.T @ rows
+
+    def __add__(self, other: "MomentStatistics") -> "MomentStatistics":
+        """Combine the statistics of two disjoint row sets.
+
+        :param other: statistics of the other rows
+        :type other: MomentStatistics
+        :return: statistics of both row sets
+        :rtype: MomentStatistics
+        """
+        combined = MomentStatistics(len(self.total))
+        combined.count = self.count + other.count
+        combined.total = self.total + other.total
+        combined.cross = self.cross + other.cross
+
+        return combined
+
+    def centered(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the mean and the scatter matrix around the mean.
+
+        :return: shifted column means and the centered cross products
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        mean = self.total / self.count
+        return mean, self.cross - np.outer(self.total, mean)
+
+
+class AffineScaling(NamedTuple):
+    """Per feature scaling x * scale + offset, 1 and 0 for the features that are not scaled"""
+
+    scale: np.ndarray
+    offset: np.ndarray
+
+
+class TrainingResult(NamedTuple):
+    """Fitted model bundle arrays, chosen alpha and evaluation scores"""
+
+    arrays: Dict[str, np.ndarray]
+    alpha: float
+    cv_scores: Dict[float, float]
+    test_rmse: Optional[float]
+    test_r2: Optional[float]
+    train_rows: int
+    test_rows: int
+
+
+def split_rows(ids: pd.Series, test_size: float, folds: int) -> np.ndarray:
+    """Assign rows to the test split or a cross validation fold by a hash of their Id.
+
+    The assignment of a row only depends on its Id, so it is the same for any chunking and across runs.
+
+    :param ids: row Ids
+    :type ids: pd.Series
+    :param test_size: fraction of rows held out for testing
+    :type test_size: float
+    :param folds: number of cross validation folds of the training rows
+    :type folds: int
+    :return: fold of every row, -1 for test rows
+    :rtype: np.ndarray
+    """
+    hashes = pd.util.hash_pandas_object(ids, index=False).to_numpy()
+    unit = (hashes >> np.uint64(11)).astype(np.float64) / 2.0**53
+    fold = np.floor((unit - test_size) / (1 - test_size) * folds).astype(np.int64)
+
+    return np.where(unit < test_size, -1, np.minimum(fold, folds - 1))
+
+
+class TrainingStatistics:
+    """Sufficient statistics of the training folds and the test split, and the feature ranges of the training rows"""
+
+    def __init__(self, feature_names: Sequence[str], folds: int, test_size: float):
+        """Initialize empty statistics.
+
+        :param feature_names: model features, in the column order of the data
+        :type feature_names: Sequence[str]
+        :param folds: number of cross validation folds
+        :type folds: int
+        :param test_size: fraction of rows held out for testing
+        :type test_size: float
+        """
+        self.feature_names = list(feature_names)
+        self.test_size = test_size
+        width = len(self.feature_names) + 1
+        self.folds = [MomentStatistics(width) for _ in range(folds)]
+        self.test = MomentStatistics(width)
+        self.shift: Optional[np.ndarray] = None
+        self.data_min = np.full(width - 1, np.inf)
+        self.data_max = np.full(width - 1, -np.inf)
+
+    def update(self, df_chunk: pd.DataFrame):
+        """Add a chunk of processed rows to the statistics.
+
+        :param df_chunk: processed rows with the Id, the features and Sales
+        :type df_chunk: pd.DataFrame
+        """
+        rows = np.column_stack(
+            [
+                df_chunk[self.feature_names].to_numpy(dtype=np.float64),
+                df_chunk[TARGET_COLUMN].to_numpy(dtype=np.float64),
+            ]
+        )
+        if self.shift is None:
+            self.shift = rows.mean(axis=0)
+        fold = split_rows(df_chunk[ID_COLUMN], self.test_size, len(self.folds))
+
+        train = fold >= 0
+        if train.any():
+            features = rows[train, :-1]
+            self.data_min = np.minimum(self.data_min, features.min(axis=0))
+            self.data_max = np.maximum(self.data_max, features.max(axis=0))
+
+        rows -= self.shift
+        self.test.update(rows[~train])
+        for idx, statistics in enumerate(self.folds):
+            statistics.update(rows[fold == idx])
+
+    def train(self, exclude: Optional[int] = None) -> MomentStatistics:
+        """Combine the statistics of the training folds.
+
+        :param exclude: fold left out, e.g. the validation fold of a cross validation split
+        :type exclude: Optional[int]
+        :return: statistics of the training rows
+        :rtype: MomentStatistics
+        """
+        combined = MomentStatistics(len(self.shift))
+        for idx, statistics in enumerate(self.folds):
+            if idx != exclude:
+                combined = combined + statistics
+
+        return combined
+
+    def scaling(self) -> Tuple[AffineScaling, Dict[str, np.ndarray]]:
+        """Fit the MinMax scaling of the ordinal and the Standard scaling of the numerical features on the training rows, like the sklearn scalers.
+
+        :return: scaling of every feature and the fitted scaler parameters
+        :rtype: Tuple[AffineScaling, Dict[str, np.ndarray]]
+        """
+        position = {feature: idx for idx, feature in enumerate(self.feature_names)}
+        minmax = [position[feature] for feature in ORDINAL_FEATURES]
+        standard = [position[feature] for feature in NUMERICAL_FEATURES]
+
+        data_range = self.data_max[minmax] - self.data_min[minmax]
+        minmax_scale = 1 / np.where(data_range == 0, 1, data_range)
+        minmax_min = -self.data_min[minmax] * minmax_scale
+
+        train = self.train()
+        mean, scatter = train.centered()
+        standard_mean = mean[standard] + self.shift[standard]
+        standard_var = np.diag(scatter)[standard] / train.count
+        standard_scale = np.sqrt(standard_var)
+        standard_scale = np.where(standard_scale == 0, 1, standard_scale)
+
+        scale = np.ones(len(self.feature_names))
+        offset = np.zeros(len(self.feature_names))
+        scale[minmax] = minmax_scale
+        offset[minmax] = minmax_min
+        scale[standard] = 1 / standard_scale
+        offset[standard] = -standard_mean / standard_scale
+
+        return AffineScaling(scale, offset), {
+            "minmax_features": ORDINAL_FEATURES,
+            "minmax_scale": minmax_scale,
+            "minmax_min": minmax_min,
+            "minmax_data_min": self.data_min[minmax],
+            "minmax_data_max": self.data_max[minmax],
+            "standard_features": NUMERICAL_FEATURES,
+            "standard_mean": standard_mean,
+            "standard_scale": standard_scale,
+        }
+
+
+def solve_ridge(
+    statistics: MomentStatistics,
+    shift: np.ndarray,
+    scaling: AffineScaling,
+    alpha: float,
+) -> Tuple[np.ndarray, float]:
+    """Fit a Ridge model with intercept on scaled features from the sufficient statistics of the rows.
+
+    Solves (Xc'Xc + alpha I) coef = Xc'yc on the centered scaled features, like the sklearn Ridge cholesky solver.
+
+    :param statistics: statistics of the training rows
+    :type statistics: MomentStatistics
+    :param shift: shift of the rows
+    :type shift: np.ndarray
+    :param scaling: feature scaling
+    :type scaling: AffineScaling
+    :param alpha: regularization strength
+    :type alpha: float
+    :return: coefficients of the scaled features and the intercept
+    :rtype: Tuple[np.ndarray, float]
+    """
+    mean, scatter = statistics.centered()
+    scale = scaling.scale
+    width = len(scale)
+    gram = scatter[:width, :width] * np.outer(scale, scale)
+    coef = np.linalg.solve(gram + alpha * np.eye(width), scatter[:width, width] * scale)
+    feature_mean = (mean[:width] + shift[:width]) * scale + scaling.offset
+    intercept = mean[width] + shift[width] - feature_mean @ coef
+
+    return coef, float(intercept)
+
+
+def residual_sums(
+    statistics: MomentStatistics,
+    shift: np.ndarray,
+    scaling: AffineScaling,
+    coef: np.ndarray,
+    intercept: float,
+) -> Tuple[float, float]:
+    """Compute the residual and total sums of squares of a fitted model on rows, from their sufficient statistics.
+
+    :param statistics: statistics of the evaluated rows
+    :type statistics: MomentStatistics
+    :param shift: shift of the rows
+    :type shift: np.ndarray
+    :param scaling: feature scaling
+    :type scaling: AffineScaling
+    :param coef: coefficients of the scaled features
+    :type coef: np.ndarray
+    :param intercept: model intercept
+    :type intercept: float
+    :return: residual sum of squares and total sum of squares around the mean Sales of the rows
+    :rtype: Tuple[float, float]
+    """
+    mean, scatter = statistics.centered()
+    width = len(coef)
+    weights = coef * scaling.scale
+    centered = (
+        scatter[width, width]
+        - 2 * weights @ scatter[:width, width]
+        + weights @ scatter[:width, :width] @ weights
+    )
+    feature_mean = (mean[:width] + shift[:width]) * scaling.scale + scaling.offset
+    residual_mean = mean[width] + shift[width] - feature_mean @ coef - intercept
+
+    return (
+        max(float(centered + statistics.count * residual_mean**2), 0.0),
+        float(scatter[width, width]),
+    )
+
+
+def processed_chunks(data: Union[str, Path], chunksize: int) -> Iterator[pd.DataFrame]:
+    """Stream the processed data in chunks, from a csv file or from the Parquet partitions written by build_features.
+
+    :param data: processed data csv or directory of Parquet partitions
+    :type data: Union[str, Path]
+    :param chunksize: largest number of rows per chunk
+    :type chunksize: int
+    :return: chunks of processed rows
+    :rtype: Iterator[pd.DataFrame]
+    """
+    data = Path(data)
+    if not data.is_dir():
+        yield from pd.read_csv(data, chunksize=chunksize)
+        return
+
+    import pyarrow.parquet as pq
+
+    for partition in sorted(data.glob("*.parquet")):
+        for batch in pq.ParquetFile(partition).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+
+def train_model(
+    data_file: Union[str, Path] = PROCESSED_DATA_FILE,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    alphas: Sequence[float] = DEFAULT_ALPHAS,
+    folds: int = DEFAULT_FOLDS,
+    test_size: float = DEFAULT_TEST_SIZE,
+) -> TrainingResult:
+    """Fit the scalers and the Ridge model on processed data streamed in chunks.
+
+    The data is read once. The scaler statistics and the sufficient statistics of every cross validation fold and of the test split are accumulated chunk by chunk, so the memory depends on the chunk size and the number of features, not on the number of rows. The alpha with the best mean R2 over the folds is chosen, like RidgeCV, and the final model is fit on all training rows.
+
+    :param data_file: processed data csv or directory of Parquet partitions, with the Id, the model features and Sales
+    :type data_file: Union[str, Path]
+    :param chunksize: number of rows per chunk
+    :type chunksize: int
+    :param alphas: candidate regularization strengths
+    :type alphas: Sequence[float]
+    :param folds: number of cross validation folds, at least 2 to choose between several alphas
+    :type folds: int
+    :param test_size: fraction of rows held out for testing, may be 0
+    :type test_size: float
+    :raises ValueError: data without the scaled features, or too few rows for the folds
+    :return: model bundle arrays, chosen alpha and evaluation scores
+    :rtype: TrainingResult
+    """
+    if len(alphas) > 1 and folds < 2:
+        raise ValueError("choosing between several alphas needs at least 2 folds")
+
+    statistics: Optional[TrainingStatistics] = None
+    rows = 0
+    start = time.perf_counter()
+    for df_chunk in processed_chunks(data_file, chunksize):
+        if statistics is None:
+            feature_names = [
+                column
+                for column in df_chunk.columns
+                if column not in (ID_COLUMN, TARGET_COLUMN)
+            ]
+            missing = set(ORDINAL_FEATURES + NUMERICAL_FEATURES) - set(feature_names)
+            if missing:
+                raise ValueError(
+                    f"missing feature columns: {', '.join(sorted(missing))}"
+                )
+            statistics = TrainingStatistics(feature_names, max(folds, 1), test_size)
+        statistics.update(df_chunk)
+        rows += len(df_chunk)
+        logger.info(
+            "%d rows read, %.0f rows/s", rows, rows / (time.perf_counter() - start)
+        )
+
+    if statistics is None or any(fold.count < 2 for fold in statistics.folds):
+        raise ValueError("too few training rows for the number of folds")
+
+    shift = statistics.shift
+    scaling, scaler_parameters = statistics.scaling()
+    cv_scores: Dict[float, float] = {}
+    if len(alphas) > 1:
+        for alpha in alphas:
+            scores: List[float] = []
+            for idx, validation in enumerate(statistics.folds):
+                coef, intercept = solve_ridge(
+                    statistics.train(exclude=idx), shift, scaling, alpha
+                )
+                residual, total = residual_sums(
+                    validation, shift, scaling, coef, intercept
+                )
+                scores.append(1 - residual / total)
+            cv_scores[alpha] = float(np.mean(scores))
+        alpha = max(cv_scores, key=cv_scores.get)
+    else:
+        alpha = alphas[0]
+
+    train = statistics.train()
+    coef, intercept = solve_ridge(train, shift, scaling, alpha)
+    test_rmse = test_r2 = None
+    if statistics.test.count:
+        residual, total = residual_sums(
+            statistics.test, shift, scaling, coef, intercept
+        )
+        test_rmse = float(np.sqrt(residual / statistics.test.count))
+        test_r2 = 1 - residual / total if total else None
+
+    arrays = fitted_bundle_arrays(
+        feature_names=statistics.feature_names,
+        coef=coef,
+        intercept=intercept,
+        **scaler_parameters,
+    )
+    return TrainingResult(
+        arrays=arrays,
+        alpha=alpha,
+        cv_scores=cv_scores,
+        test_rmse=test_rmse,
+        test_r2=test_r2,
+        train_rows=train.count,
+        test_rows=statistics.test.count,
+    )
+
+
+def main(argv=None):
+    """Parse the command line arguments, train the model and write the model bundle"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", type=Path, default=PROCESSED_DATA_FILE)
+    parser.add_argument("--output", type=Path, default=MODEL_DIR / MODEL_BUNDLE_FILE)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--alphas", type=float, nargs="+", default=DEFAULT_ALPHAS)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--test-size", type=float, default=DEFAULT_TEST_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    result = train_model(
+        args.data, args.chunksize, args.alphas, args.folds, args.test_size
+    )
+    for alpha, score in result.cv_scores.items():
+        logger.info("alpha %g: mean cross validation R2 %.6f", alpha, score)
+    logger.info(
+        "alpha %g fit on %d rows, test RMSE %s, test R2 %s on %d rows",
+        result.alpha,
+        result.train_rows,
+        result.test_rmse,
+        result.test_r2,
+        result.test_rows,
+    )
+    logger.info("model bundle written to %s", write_bundle(result.arrays, args.output))
+
+
+if __name__ == "__main__":
+    main()